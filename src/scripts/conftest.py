@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Callable
+import pytest
+
+# Files are written with a fixed mtime, so the directories they're organized into don't depend on the day tests run
+DEFAULT_MTIME = 1_700_000_000
+
+
+@pytest.fixture
+def write_file() -> Callable[..., Path]:
+    """
+    Write a file (and its parent directories) with a fixed mtime, returning its path.
+    """
+    def write(path: Path, content: bytes = b"content", mtime: int = DEFAULT_MTIME) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    return write
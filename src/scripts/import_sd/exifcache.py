@@ -0,0 +1,126 @@
+"""
+
+	Metadata:
+
+		File: exifcache.py
+		Project: imageinn
+		Created Date: 16 Oct 2026
+		Author: Jess Mann
+		Email: jess.a.mann@gmail.com
+
+		-----
+
+		Last Modified: Fri Oct 16 2026
+		Modified By: Jess Mann
+
+		-----
+
+		Copyright (c) 2026 Jess Mann
+"""
+from __future__ import annotations
+from decimal import Decimal
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# The values Photo.attr can return
+type ExifValue = str | Decimal | int | None
+
+
+class ExifCache:
+	"""
+	A persistent cache of parsed EXIF records, so a card only has to be parsed by exifread once.
+
+	Records are keyed by path, and are only returned while the file's size and mtime are unchanged.
+	"""
+
+	def __init__(self, db_path: str | os.PathLike):
+		"""
+		Args:
+			db_path (str): The sqlite file to store records in. It will be created if it does not exist.
+		"""
+		self.db_path = str(db_path)
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+		self._conn.execute('PRAGMA journal_mode=WAL')
+		self._conn.execute('PRAGMA synchronous=NORMAL')
+		self._conn.execute('''
+			CREATE TABLE IF NOT EXISTS exif_records (
+				path TEXT PRIMARY KEY,
+				size INTEGER NOT NULL,
+				mtime_ns INTEGER NOT NULL,
+				record TEXT NOT NULL
+			)
+		''')
+		self._conn.commit()
+
+	def get(self, path: str, stat: os.stat_result) -> dict[str, ExifValue] | None:
+		"""
+		Get the cached record for a file.
+
+		Args:
+			path (str): The path to the file.
+			stat (os.stat_result): The current stat of the file.
+
+		Returns:
+			dict: The record, or None if there is no record or the file has changed since it was stored.
+		"""
+		with self._lock:
+			row = self._conn.execute(
+				'SELECT size, mtime_ns, record FROM exif_records WHERE path = ?', (path,)
+			).fetchone()
+
+		if not row or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+			return None
+
+		return self.decode(row[2])
+
+	def set(self, path: str, stat: os.stat_result, record: dict[str, ExifValue]) -> None:
+		"""
+		Store the record for a file.
+
+		Args:
+			path (str): The path to the file.
+			stat (os.stat_result): The stat of the file at the time it was parsed.
+			record (dict): The parsed record.
+		"""
+		with self._lock:
+			self._conn.execute(
+				'INSERT OR REPLACE INTO exif_records (path, size, mtime_ns, record) VALUES (?, ?, ?, ?)',
+				(path, stat.st_size, stat.st_mtime_ns, self.encode(record))
+			)
+			self._conn.commit()
+
+	def close(self) -> None:
+		"""
+		Close the database connection.
+		"""
+		with self._lock:
+			self._conn.close()
+
+	@staticmethod
+	def encode(record: dict[str, ExifValue]) -> str:
+		"""
+		Encode a record as JSON, preserving Decimals (which json would otherwise turn into floats).
+		"""
+		encoded = {}
+		for key, value in record.items():
+			if isinstance(value, Decimal):
+				encoded[key] = ['d', str(value)]
+			else:
+				encoded[key] = ['v', value]
+		return json.dumps(encoded)
+
+	@staticmethod
+	def decode(data: str) -> dict[str, ExifValue]:
+		"""
+		Decode a record created by encode().
+		"""
+		record = {}
+		for key, (kind, value) in json.loads(data).items():
+			record[key] = Decimal(value) if kind == 'd' else value
+		return record
@@ -25,12 +25,13 @@ import os
 import re
 import logging
 from decimal import Decimal
-from typing import Dict, Optional
+from typing import ClassVar, Dict, Optional
 import exifread
 import exifread.utils
 import exifread.tags.exif
 import exifread.classes
 from scripts.import_sd.exif import ExifTag
+from scripts.import_sd.exifcache import ExifCache, ExifValue
 from scripts.import_sd.validator import Validator
 from scripts.lib.path import FilePath, Path
 
@@ -43,6 +44,10 @@ class Photo(FilePath):
 	"""
 	_path: str
 	_number: int
+	_exif: dict[str, ExifValue] | None = None
+
+	# Optional persistent cache shared by every photo. See ExifCache.
+	exif_cache: ClassVar[ExifCache | None] = None
 
 	def __init__(self, path: list[str] | str, number: Optional[int] = None):
 		"""
@@ -76,6 +81,7 @@ class Photo(FilePath):
 			raise ValueError("The path must be a string or a list of strings")
 
 		self._path = os.path.normpath(joined_path)
+		self._exif = None
 
 		self.validate()
 
@@ -640,6 +646,80 @@ class Photo(FilePath):
 		"""
 		return Validator.calculate_checksum(self.path)
 
+	@property
+	def exif(self) -> dict[str, ExifValue]:
+		"""
+		The EXIF tags we use, parsed from the file once and converted to plain values.
+
+		exifread is slow, and PhotoStack compares about eight attributes per photo, so the file is only parsed the
+		first time this is accessed. If Photo.exif_cache is set, records are also shared between runs.
+
+		Returns:
+			dict: The converted value of every ExifTag present in the file, keyed by tag name.
+		"""
+		if self._exif is not None:
+			return self._exif
+
+		stat = os.stat(self.path)
+		if self.exif_cache and (record := self.exif_cache.get(self.path, stat)) is not None:
+			self._exif = record
+			return record
+
+		with open(self.path, 'rb') as image_file:
+			tags = exifread.process_file(image_file, details=False)
+
+		record = {}
+		for tag in ExifTag:
+			if tag.value not in tags:
+				continue
+			try:
+				record[tag.value] = self._convert_tag(tags[tag.value])
+			except (IndexError, ValueError, ArithmeticError) as e:
+				logger.debug('Unable to convert attribute %s in %s: %s', tag.value, self.path, e)
+
+		if self.exif_cache:
+			self.exif_cache.set(self.path, stat, record)
+
+		self._exif = record
+		return record
+
+	@staticmethod
+	def _convert_tag(value) -> ExifValue:
+		"""
+		Convert a tag returned by exifread to a plain value.
+
+		Args:
+			value: The tag, as returned by exifread.
+
+		Returns:
+			str | Decimal | int: The converted value.
+		"""
+		# Convert from ASCII and Signed Ratio to string and Decimal
+		# address problems such as "AssertionError: (0x0110) ASCII=ILCE-7RM4 @ 340 != 'ILCE-7MR4'"
+		if isinstance(value, exifread.utils.Ratio):
+			return Decimal(value.decimal())
+		if isinstance(value, exifread.classes.IfdTag):
+			# If field type is an int, return an int
+			if value.field_type in [3, 4, 8, 9]:
+				return int(value.values[0])
+			# If field type is a Decimal, return a Decimal
+			if value.field_type in [11, 12]:
+				return Decimal(value.values[0])
+			# If field type is a ratio or signed ratio, perform the division and reeturn a Decimal
+			if value.field_type in [5, 10]:
+				return Decimal(value.values[0].num) / Decimal(value.values[0].den)
+			return value.printable
+		if isinstance(value, bytes):
+			result = value.decode('utf-8')
+			if isinstance(result, float):
+				return Decimal(result)
+			return result
+
+		if value is None:
+			return None
+
+		return exifread.utils.make_string(value)
+
 	def attr(self, key: ExifTag) -> str | Decimal | int | None:
 		"""
 		Get the EXIF data from the given file.
@@ -654,41 +734,14 @@ class Photo(FilePath):
 			>>> get_exif_data(ExifTag.EXPOSURE_TIME)
 			{'EXIF ExposureTime': (1, 100)}
 		"""
-		try:
-			with open(self.path, 'rb') as image_file:
-				tags = exifread.process_file(image_file, details=False)
-
-			# Convert from ASCII and Signed Ratio to string and Decimal
-			# address problems such as "AssertionError: (0x0110) ASCII=ILCE-7RM4 @ 340 != 'ILCE-7MR4'"
-			value = tags[key]
-			if isinstance(value, exifread.utils.Ratio):
-				return Decimal(value.decimal())
-			if isinstance(value, exifread.classes.IfdTag):
-				# If field type is an int, return an int
-				if value.field_type in [3, 4, 8, 9]:
-					return int(value.values[0])
-				# If field type is a Decimal, return a Decimal
-				if value.field_type in [11, 12]:
-					return Decimal(value.values[0])
-				# If field type is a ratio or signed ratio, perform the division and reeturn a Decimal
-				if value.field_type in [5, 10]:
-					return Decimal(value.values[0].num) / Decimal(value.values[0].den)
-				return value.printable
-			if isinstance(value, bytes):
-				result = value.decode('utf-8')
-				if isinstance(result, float):
-					return Decimal(result)
-				return result
-
-			if value is None:
-				return None
-
-			return exifread.utils.make_string(value)
-		except KeyError:
+		record = self.exif
+		if key not in record:
 			logger.warning('Unable to find attribute %s in %s', key, self.path)
-			logger.warning('Tags are %s', tags)
+			logger.debug('Tags are %s', record)
 			return None
 
+		return record[key]
+
 	def is_jpg(self) -> bool:
 		"""
 		Checks if the given file is a JPG.
@@ -30,6 +30,7 @@ from typing import Optional
 from scripts.lib.choices import Choices
 from scripts.lib.path import FilePath, DirPath
 from scripts.import_sd.photo import Photo, FakePhoto
+from scripts.import_sd.exifcache import ExifCache
 from scripts.import_sd.photostack import PhotoStack
 from scripts.import_sd.workflow import Workflow
 from scripts.import_sd.stackcollection import StackCollection
@@ -600,11 +601,15 @@ def main():
 	                    help='''How to handle temporary files that already exist.
 																						  This will not alter original RAW files. Only files that this process
 																						  created in a previous run.''')
+	parser.add_argument('--exif-cache', type=str, default=None, help='A sqlite file to cache parsed EXIF data in, so later runs on the same files skip parsing.')
 	parser.add_argument('--dry-run', action='store_true', help='Whether to do a dry run, where no files are actually changed.')
 
 	# Parse the arguments passed in from the user
 	args = parser.parse_args()
 
+	if args.exif_cache:
+		Photo.exif_cache = ExifCache(args.exif_cache)
+
 	# Copy the SD card
 	workflow = HDRWorkflow(args.path, args.extension, args.onconflict, args.dry_run)
 	result = workflow.run()
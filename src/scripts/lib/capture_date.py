@@ -0,0 +1,236 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    capture_date.py                                                                                      *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import datetime
+import logging
+import os
+from pathlib import Path
+import struct
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the start of a file. The EXIF block of a JPEG is limited to 64KB, and raw formats keep their
+# first IFDs near the start.
+HEADER_BYTES = 128 * 1024
+
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+
+# ftyp brands of HEIF images. Anything else with an ftyp box is treated as an MP4/MOV video.
+HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1', b'avif'}
+
+# mvhd times are seconds since midnight, January 1, 1904 UTC
+MP4_EPOCH = datetime.datetime(1904, 1, 1, tzinfo=datetime.timezone.utc)
+
+def read_capture_date(path : Path) -> datetime.datetime | None:
+    """
+    Read the date a photo or video was taken from its header, without a full metadata parse.
+
+    JPEG, TIFF-based raw files (ARW, DNG, NEF, TIFF) and HEIC return DateTimeOriginal, falling back to
+    DateTimeDigitized, then DateTime. MP4 and MOV files return the creation time of the mvhd box, converted to local
+    time. Only the first HEADER_BYTES of an image are read. Videos are read box header by box header, as the moov box
+    is often at the end of the file.
+
+    Args:
+        path: The file to read.
+
+    Returns:
+        The capture date as a naive local datetime, or None if the file has no readable date.
+    """
+    try:
+        with open(path, 'rb') as handle:
+            header = handle.read(HEADER_BYTES)
+            if header[:2] == b'\xff\xd8':
+                return _read_jpeg(header)
+            if header[:4] in (b'II*\x00', b'MM\x00*'):
+                return _read_tiff(header, 0)
+            if header[4:8] == b'ftyp':
+                if header[8:12] in HEIF_BRANDS:
+                    return _read_embedded_exif(header)
+                return _read_mvhd(handle)
+    except OSError as e:
+        logger.debug('Unable to read the capture date of %s: %s', path, e)
+    except (struct.error, IndexError, ValueError, OverflowError) as e:
+        logger.debug('Malformed header in %s: %s', path, e)
+
+    return None
+
+def _parse_exif_date(value : bytes) -> datetime.datetime | None:
+    """
+    Parse an EXIF "YYYY:MM:DD HH:MM:SS" date. Blank dates (i.e. "0000:00:00 00:00:00") return None.
+    """
+    try:
+        return datetime.datetime.strptime(value[:19].decode('ascii'), '%Y:%m:%d %H:%M:%S')
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+def _read_jpeg(data : bytes) -> datetime.datetime | None:
+    """
+    Find the EXIF APP1 segment of a JPEG, and read the date from it.
+    """
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            return None
+
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image, or start of the image data: there are no more metadata segments
+            return None
+
+        length, = struct.unpack_from('>H', data, position + 2)
+        if marker == 0xE1 and data[position + 4:position + 10] == b'Exif\x00\x00':
+            return _read_tiff(data, position + 10)
+        position += 2 + length
+
+    return None
+
+def _read_embedded_exif(data : bytes) -> datetime.datetime | None:
+    """
+    Find an EXIF block by its signature, for containers (like HEIC) that store it as an item of their own.
+    """
+    position = data.find(b'Exif\x00\x00')
+    while position != -1:
+        start = position + 6
+        if data[start:start + 4] in (b'II*\x00', b'MM\x00*'):
+            return _read_tiff(data, start)
+        position = data.find(b'Exif\x00\x00', start)
+    return None
+
+def _read_ifd(data : bytes, start : int, offset : int, endian : str) -> dict[int, int]:
+    """
+    Read the entries of a TIFF IFD.
+
+    Args:
+        data: The buffer holding the TIFF structure.
+        start: The position of the TIFF header in data. Offsets in the structure are relative to it.
+        offset: The offset of the IFD.
+        endian: The struct byte order.
+
+    Returns:
+        A dict of tag -> position of the entry in data.
+    """
+    count, = struct.unpack_from(f'{endian}H', data, start + offset)
+    entries = start + offset + 2
+    return {
+        struct.unpack_from(f'{endian}H', data, entries + i * 12)[0]: entries + i * 12
+        for i in range(count)
+    }
+
+def _read_tiff(data : bytes, start : int) -> datetime.datetime | None:
+    """
+    Read the capture date from a TIFF structure, which holds the EXIF data of every supported image format.
+    """
+    match data[start:start + 2]:
+        case b'II':
+            endian = '<'
+        case b'MM':
+            endian = '>'
+        case _:
+            return None
+
+    ifd0_offset, = struct.unpack_from(f'{endian}I', data, start + 4)
+    ifd0 = _read_ifd(data, start, ifd0_offset, endian)
+
+    ifds = []
+    if TAG_EXIF_IFD in ifd0:
+        exif_offset, = struct.unpack_from(f'{endian}I', data, ifd0[TAG_EXIF_IFD] + 8)
+        if start + exif_offset < len(data):
+            ifds.append((_read_ifd(data, start, exif_offset, endian), (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED)))
+    ifds.append((ifd0, (TAG_DATETIME,)))
+
+    for ifd, tags in ifds:
+        for tag in tags:
+            if tag not in ifd:
+                continue
+            count, = struct.unpack_from(f'{endian}I', data, ifd[tag] + 4)
+            if count < 19:
+                continue
+            value_offset, = struct.unpack_from(f'{endian}I', data, ifd[tag] + 8)
+            if (date := _parse_exif_date(data[start + value_offset:start + value_offset + count])):
+                return date
+
+    return None
+
+def _find_box(handle : BinaryIO, start : int, end : int, box_type : bytes) -> tuple[int, int] | None:
+    """
+    Find an ISO BMFF box between two positions of a file, reading only box headers.
+
+    Returns:
+        The (start, end) of the box's payload, or None if it wasn't found.
+    """
+    position = start
+    while position + 8 <= end:
+        handle.seek(position)
+        header = handle.read(16)
+        if len(header) < 8:
+            return None
+
+        size, = struct.unpack_from('>I', header)
+        header_size = 8
+        if size == 1:
+            size, = struct.unpack_from('>Q', header, 8)
+            header_size = 16
+        elif size == 0:
+            # The box extends to the end of the file
+            size = end - position
+
+        if size < header_size:
+            return None
+        if header[4:8] == box_type:
+            return position + header_size, position + size
+        position += size
+
+    return None
+
+def _read_mvhd(handle : BinaryIO) -> datetime.datetime | None:
+    """
+    Read the creation time from the mvhd box of an MP4 or MOV file.
+    """
+    file_size = os.fstat(handle.fileno()).st_size
+    if not (moov := _find_box(handle, 0, file_size, b'moov')):
+        return None
+    if not (mvhd := _find_box(handle, moov[0], moov[1], b'mvhd')):
+        return None
+
+    handle.seek(mvhd[0])
+    payload = handle.read(12)
+    if payload[0] == 1:
+        creation_time, = struct.unpack_from('>Q', payload, 4)
+    else:
+        creation_time, = struct.unpack_from('>I', payload, 4)
+
+    if not creation_time:
+        return None
+
+    created = MP4_EPOCH + datetime.timedelta(seconds=creation_time)
+    return datetime.datetime.fromtimestamp(created.timestamp())
@@ -22,4 +22,8 @@
 *        2024-10-28     By Jess Mann                                                                                   *
 *                                                                                                                      *
 *********************************************************************************************************************"""
-from scripts.lib.db.images import ImagesDatabase
\ No newline at end of file
+from scripts.lib.db.images import ImagesDatabase
+from scripts.lib.db.hashes import HashIndex, DEFAULT_HASH_INDEX_PATH
+from scripts.lib.db.duplicates import DuplicateIndex, DEFAULT_DUPLICATE_INDEX_PATH
+from scripts.lib.db.imports import ImportManifest, DEFAULT_IMPORT_MANIFEST_PATH
+from scripts.lib.db.plans import OrganizePlan, PlanEntry, PlanActions, PlanStatus
@@ -0,0 +1,263 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    duplicates.py                                                                                        *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import os
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator
+
+from scripts.lib.db.hashes import PROJECT_ROOT
+
+# Set up module-level logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_DUPLICATE_INDEX_PATH = PROJECT_ROOT / 'archive_files.db'
+
+# Rows fetched per query while paging through the index. Keeps memory flat no matter how large the archive is.
+PAGE_SIZE = 1000
+
+class DuplicateIndex:
+    """
+    Persistent index of every file in an archive, used to find duplicates by content.
+
+    Each record stores the size, mtime_ns and inode of a file, along with its partial and full hash once they are
+    known. Re-scanning a file whose stat data is unchanged keeps its hashes, so a later run only reads files that are
+    new or changed. Files are compared in stages: size, then partial hash, then full hash, and each stage only
+    considers files that still collide after the one before.
+
+    All queries page through the table by path, so callers can stream results without holding them in memory.
+
+    A single connection is shared between threads, guarded by a lock.
+    """
+    db_path : Path
+
+    def __init__(self, db_path: Path | str | None = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_DUPLICATE_INDEX_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._create_table()
+
+    def _create_table(self) -> None:
+        logger.debug("Opening duplicate index in %s", self.db_path)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS archive_files
+                                  (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                                   inode INTEGER NOT NULL, partial_hash TEXT, full_hash TEXT,
+                                   scan_id INTEGER NOT NULL)''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS archive_files_size ON archive_files (size, partial_hash)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS archive_files_full ON archive_files (size, full_hash)')
+
+    @staticmethod
+    def _path_range(root: Path) -> tuple[str, str]:
+        """
+        Bounds that match every path below root, so range queries can use the primary key index.
+        """
+        prefix = str(root).rstrip(os.sep) + os.sep
+        return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+    def next_scan_id(self) -> int:
+        """
+        Get an id for a new scan, used to find records of files that no longer exist once the scan is complete.
+        """
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(scan_id), 0) + 1 FROM archive_files').fetchone()[0]
+
+    def record_files(self, files: list[tuple[Path, os.stat_result]], scan_id: int) -> None:
+        """
+        Add or refresh the records for a batch of scanned files.
+
+        Hashes are kept when the size, mtime_ns and inode still match the record, and cleared otherwise.
+
+        Args:
+            files: The (absolute path, stat) of each file.
+            scan_id: The id of the current scan.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                '''INSERT INTO archive_files (path, size, mtime_ns, inode, scan_id) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (path) DO UPDATE SET
+                       partial_hash = CASE WHEN (size, mtime_ns, inode) = (excluded.size, excluded.mtime_ns, excluded.inode)
+                                      THEN partial_hash ELSE NULL END,
+                       full_hash    = CASE WHEN (size, mtime_ns, inode) = (excluded.size, excluded.mtime_ns, excluded.inode)
+                                      THEN full_hash ELSE NULL END,
+                       size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode,
+                       scan_id = excluded.scan_id''',
+                [(str(path), stat.st_size, stat.st_mtime_ns, stat.st_ino, scan_id) for path, stat in files]
+            )
+
+    def forget_missing(self, root: Path, scan_id: int) -> int:
+        """
+        Remove records below root that were not seen by the given scan.
+
+        Args:
+            root: The directory that was scanned.
+            scan_id: The id of the completed scan.
+
+        Returns:
+            The number of records removed.
+        """
+        low, high = self._path_range(root)
+        with self._lock, self._conn:
+            return self._conn.execute(
+                'DELETE FROM archive_files WHERE path >= ? AND path < ? AND scan_id != ?', (low, high, scan_id)
+            ).rowcount
+
+    def _page(self, query: str, params: tuple = ()) -> Iterator[tuple]:
+        """
+        Run a query one page at a time, keyed on path. The query must select path first and end with 'path > ?'.
+        """
+        last_path = ''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f'{query} ORDER BY path LIMIT {PAGE_SIZE}', (*params, last_path)
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last_path = rows[-1][0]
+
+    def _collect_candidates(self, table: str, columns: str, query: str, params: tuple) -> None:
+        """
+        Fill a temporary table with the keys that collide, so paging only looks them up instead of grouping the
+        whole archive again for every page.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(f'DROP TABLE IF EXISTS temp.{table}')
+            self._conn.execute(f'CREATE TEMP TABLE {table} ({columns}, PRIMARY KEY ({columns})) WITHOUT ROWID')
+            self._conn.execute(f'INSERT INTO temp.{table} {query}', params)
+
+    def iter_missing_partial(self, root: Path) -> Iterator[tuple[str, int]]:
+        """
+        Yield (path, size) of files below root that share their size with another file, and have no partial hash.
+
+        Empty files are never yielded. They are all identical, and never worth deduplicating.
+        """
+        low, high = self._path_range(root)
+        self._collect_candidates(
+            'partial_candidates', 'size',
+            '''SELECT size FROM archive_files WHERE path >= ? AND path < ? AND size > 0
+               GROUP BY size HAVING COUNT(*) > 1''',
+            (low, high)
+        )
+        yield from self._page(
+            '''SELECT path, size FROM archive_files
+               WHERE path >= ? AND path < ? AND partial_hash IS NULL
+               AND size IN (SELECT size FROM temp.partial_candidates)
+               AND path > ?''',
+            (low, high)
+        )
+
+    def iter_missing_full(self, root: Path) -> Iterator[tuple[str, int]]:
+        """
+        Yield (path, size) of files below root that share their size and partial hash with another file, and have no
+        full hash.
+        """
+        low, high = self._path_range(root)
+        self._collect_candidates(
+            'full_candidates', 'size, partial_hash',
+            '''SELECT size, partial_hash FROM archive_files
+               WHERE path >= ? AND path < ? AND partial_hash IS NOT NULL
+               GROUP BY size, partial_hash HAVING COUNT(*) > 1''',
+            (low, high)
+        )
+        yield from self._page(
+            '''SELECT path, size FROM archive_files
+               WHERE path >= ? AND path < ? AND full_hash IS NULL
+               AND (size, partial_hash) IN (SELECT size, partial_hash FROM temp.full_candidates)
+               AND path > ?''',
+            (low, high)
+        )
+
+    def set_hashes(self, hashes: list[tuple[str, str]], *, partial: bool) -> None:
+        """
+        Store a batch of hashes.
+
+        Args:
+            hashes: The (path, hash) of each file.
+            partial: Whether the hashes are partial hashes.
+        """
+        column = 'partial_hash' if partial else 'full_hash'
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'UPDATE archive_files SET {column}=? WHERE path=?',
+                [(file_hash, path) for path, file_hash in hashes]
+            )
+
+    def iter_duplicate_groups(self, root: Path) -> Iterator[list[tuple[str, int, int, int]]]:
+        """
+        Yield each group of files below root with the same size and full hash.
+
+        Groups are paged by (size, full_hash), so only one page of group keys and one group are held at a time.
+
+        Yields:
+            A list of (path, size, mtime_ns, inode) for the files in each group.
+        """
+        low, high = self._path_range(root)
+        last_key : tuple[int, str] = (-1, '')
+        while True:
+            with self._lock:
+                keys = self._conn.execute(
+                    f'''SELECT size, full_hash FROM archive_files
+                        WHERE path >= ? AND path < ? AND full_hash IS NOT NULL AND (size, full_hash) > (?, ?)
+                        GROUP BY size, full_hash HAVING COUNT(*) > 1
+                        ORDER BY size, full_hash LIMIT {PAGE_SIZE}''',
+                    (low, high, *last_key)
+                ).fetchall()
+            if not keys:
+                return
+
+            for size, full_hash in keys:
+                with self._lock:
+                    members = self._conn.execute(
+                        '''SELECT path, size, mtime_ns, inode FROM archive_files
+                           WHERE size=? AND full_hash=? AND path >= ? AND path < ? ORDER BY path''',
+                        (size, full_hash, low, high)
+                    ).fetchall()
+                if len(members) > 1:
+                    yield members
+            last_key = keys[-1]
+
+    def forget(self, path: Path | str) -> None:
+        """
+        Remove the record for a file.
+
+        Args:
+            path: The absolute path to the file.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM archive_files WHERE path=?', (str(path),))
+
+    def count_records(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM archive_files').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,145 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    hashes.py                                                                                            *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import os
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+# Set up module-level logger
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+
+DEFAULT_HASH_INDEX_PATH = PROJECT_ROOT / 'file_hashes.db'
+
+class HashIndex:
+    """
+    Persistent index of file hashes.
+
+    Each record is keyed on the path, the hashing mode and the algorithm, and stores the size, mtime_ns and inode
+    the hash was calculated against. A lookup only returns a hash when that stat data still matches, so a file that
+    changes on disk is rehashed automatically.
+
+    A single connection is shared between threads, guarded by a lock.
+    """
+    db_path : Path
+
+    def __init__(self, db_path: Path | str | None = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_HASH_INDEX_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._create_table()
+
+    def _create_table(self) -> None:
+        logger.debug("Opening hash index in %s", self.db_path)
+        with self._lock, self._conn:
+            # WAL allows concurrent readers (i.e. several organize runs) while one process writes
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS file_hashes
+                                  (path TEXT NOT NULL, partial INTEGER NOT NULL, algorithm TEXT NOT NULL,
+                                   size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,
+                                   hash TEXT NOT NULL,
+                                   PRIMARY KEY (path, partial, algorithm))''')
+
+    def get(self, path: Path, stat: os.stat_result, partial: bool, algorithm: str) -> str | None:
+        """
+        Look up the hash of a file.
+
+        Args:
+            path: The absolute path to the file.
+            stat: The current stat data for the file.
+            partial: Whether the partial hash is requested.
+            algorithm: The hashing algorithm.
+
+        Returns:
+            The stored hash, or None if no record exists or the file changed since it was hashed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT size, mtime_ns, inode, hash FROM file_hashes WHERE path=? AND partial=? AND algorithm=?',
+                (str(path), int(partial), algorithm)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        size, mtime_ns, inode, file_hash = row
+        if (size, mtime_ns, inode) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            logger.debug('Hash index entry is stale: %s', path)
+            return None
+
+        return file_hash
+
+    def set(self, path: Path, stat: os.stat_result, partial: bool, algorithm: str, file_hash: str) -> None:
+        """
+        Record the hash of a file, replacing any previous record.
+
+        Args:
+            path: The absolute path to the file.
+            stat: The stat data the hash was calculated against.
+            partial: Whether the hash is a partial hash.
+            algorithm: The hashing algorithm.
+            file_hash: The hash to store.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO file_hashes (path, partial, algorithm, size, mtime_ns, inode, hash) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (str(path), int(partial), algorithm, stat.st_size, stat.st_mtime_ns, stat.st_ino, file_hash)
+            )
+
+    def move(self, source: Path, destination: Path) -> None:
+        """
+        Carry the records for a file over to a new path after a rename.
+
+        A rename keeps the size, mtime and inode, so the records remain valid at the destination.
+
+        Args:
+            source: The old absolute path.
+            destination: The new absolute path.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM file_hashes WHERE path=?', (str(destination),))
+            self._conn.execute('UPDATE file_hashes SET path=? WHERE path=?', (str(destination), str(source)))
+
+    def forget(self, path: Path) -> None:
+        """
+        Remove all records for a file.
+
+        Args:
+            path: The absolute path to the file.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM file_hashes WHERE path=?', (str(path),))
+
+    def count_records(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM file_hashes').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,153 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    imports.py                                                                                           *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import os
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from scripts.lib.db.hashes import PROJECT_ROOT
+
+# Set up module-level logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_MANIFEST_PATH = PROJECT_ROOT / 'import_manifest.db'
+
+class ImportManifest:
+    """
+    Persistent record of the files that were copied into an archive.
+
+    Each record is keyed on the source path and the target directory it was imported into, so importing the same
+    card into a second archive (i.e. a backup drive) copies every file again. A record stores the size and mtime_ns of
+    the source when it was imported, along with where it was copied to and its hash. A lookup only returns a record
+    when that stat data still matches, so a source file that changes is imported again.
+
+    A single connection is shared between threads, guarded by a lock.
+    """
+    db_path : Path
+
+    def __init__(self, db_path: Path | str | None = None):
+        self.db_path = Path(db_path) if db_path else DEFAULT_IMPORT_MANIFEST_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._create_table()
+
+    def _create_table(self) -> None:
+        logger.debug("Opening import manifest in %s", self.db_path)
+        with self._lock, self._conn:
+            # WAL allows concurrent readers (i.e. several organize runs) while one process writes
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(imports)')}
+            if columns and 'target' not in columns:
+                # Manifests from before records were keyed on the target. Their target is unknown, so it's left blank
+                # and get() checks their destination instead.
+                self._conn.execute('ALTER TABLE imports RENAME TO imports_untargeted')
+
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS imports
+                                  (source TEXT NOT NULL, target TEXT NOT NULL DEFAULT '', size INTEGER NOT NULL,
+                                   mtime_ns INTEGER NOT NULL, destination TEXT NOT NULL, hash TEXT,
+                                   imported_at REAL NOT NULL, PRIMARY KEY (source, target))''')
+
+            if columns and 'target' not in columns:
+                self._conn.execute('''INSERT INTO imports (source, size, mtime_ns, destination, hash, imported_at)
+                                      SELECT source, size, mtime_ns, destination, hash, imported_at
+                                      FROM imports_untargeted''')
+                self._conn.execute('DROP TABLE imports_untargeted')
+
+    def get(self, source: Path, stat: os.stat_result, target: Path) -> tuple[Path, str | None] | None:
+        """
+        Look up where a source file was imported to, within a target directory.
+
+        Args:
+            source: The absolute path to the source file.
+            stat: The current stat data for the source file.
+            target: The resolved target directory of the import.
+
+        Returns:
+            A tuple of (destination, hash), or None if the file was never imported into target, or changed since it was.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT target, size, mtime_ns, destination, hash FROM imports WHERE source=? AND target IN (?, '')",
+                (str(source), str(target))
+            ).fetchall()
+
+        # Prefer a record for this target. An older record, without one, only counts if it was copied into target.
+        rows.sort(key=lambda row: row[0] != str(target))
+        row = next((
+            row[1:] for row in rows
+            if row[0] or Path(row[3]).is_relative_to(target)
+        ), None)
+        if not row:
+            return None
+
+        size, mtime_ns, destination, file_hash = row
+        if (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            logger.debug('Source changed since it was imported: %s', source)
+            return None
+
+        return Path(destination), file_hash
+
+    def record(self, source: Path, stat: os.stat_result, destination: Path, target: Path, file_hash: str | None = None) -> None:
+        """
+        Record that a source file was imported into a target directory, replacing any previous record for that target.
+
+        Args:
+            source: The absolute path to the source file.
+            stat: The stat data of the source file when it was imported.
+            destination: The absolute path the file was imported to.
+            target: The resolved target directory of the import.
+            file_hash: The hash of the file, if it is known.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO imports (source, target, size, mtime_ns, destination, hash, imported_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (str(source), str(target), stat.st_size, stat.st_mtime_ns, str(destination), file_hash, time.time())
+            )
+
+    def forget(self, source: Path, target: Path | None = None) -> None:
+        """
+        Remove the records for a source file.
+
+        Args:
+            source: The absolute path to the source file.
+            target: Only remove the record for this target directory. By default, every record is removed.
+        """
+        with self._lock, self._conn:
+            if target is None:
+                self._conn.execute('DELETE FROM imports WHERE source=?', (str(source),))
+            else:
+                self._conn.execute('DELETE FROM imports WHERE source=? AND target=?', (str(source), str(target)))
+
+    def count_records(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM imports').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,212 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    plans.py                                                                                             *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+from dataclasses import dataclass
+from enum import Enum
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Set up module-level logger
+logger = logging.getLogger(__name__)
+
+# Entries written or read per transaction.
+PAGE_SIZE = 1000
+
+class PlanActions(Enum):
+    # Move (or copy, in copy mode) the source to the destination
+    MOVE = 'move'
+    COPY = 'copy'
+    # The destination is an identical copy; delete the source
+    DELETE = 'delete'
+    # The destination is an identical copy, and the source is kept
+    SKIP = 'skip'
+
+class PlanStatus(Enum):
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+@dataclass(frozen=True, slots=True)
+class PlanEntry:
+    source : Path
+    destination : Path
+    action : PlanActions
+    size : int
+    mtime_ns : int
+    file_hash : str | None = None
+    id : int | None = None
+
+class OrganizePlan:
+    """
+    A journal of the operations an organize run decided on, so they can be executed (and resumed) separately.
+
+    Every entry records the source, destination and action, along with the size and mtime_ns the source had when it
+    was planned, and its hash if one was calculated. Entries are marked done in batches as they are executed, so an
+    interrupted run continues from the last batch that was committed.
+
+    The settings the plan was made with are stored alongside it, so a plan is never resumed by a different run.
+
+    A single connection is shared between threads, guarded by a lock.
+    """
+    db_path : Path
+
+    def __init__(self, db_path: Path | str):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._create_table()
+
+    def _create_table(self) -> None:
+        logger.debug("Opening organize plan in %s", self.db_path)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS plan_settings
+                                  (key TEXT PRIMARY KEY, value TEXT NOT NULL)''')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS plan_entries
+                                  (id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT NOT NULL UNIQUE,
+                                   destination TEXT NOT NULL, action TEXT NOT NULL, size INTEGER NOT NULL,
+                                   mtime_ns INTEGER NOT NULL, hash TEXT, status TEXT NOT NULL, error TEXT)''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS plan_entries_status ON plan_entries (status, destination, id)')
+
+    def get_settings(self) -> dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT key, value FROM plan_settings').fetchall())
+
+    def start(self, settings: dict[str, str]) -> None:
+        """
+        Discard any previous plan, and start a new one.
+
+        Args:
+            settings: The settings of the run the plan is for.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM plan_entries')
+            self._conn.execute('DELETE FROM plan_settings')
+            self._conn.executemany('INSERT INTO plan_settings (key, value) VALUES (?, ?)', settings.items())
+
+    def finish_planning(self) -> None:
+        """
+        Mark the plan as complete. A plan that was interrupted while planning is started again, not resumed.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO plan_settings (key, value) VALUES ('planned', '1')")
+
+    def is_planned(self) -> bool:
+        return self.get_settings().get('planned') == '1'
+
+    def add_entries(self, entries: Iterable[PlanEntry]) -> None:
+        """
+        Add a batch of entries to the plan.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO plan_entries (source, destination, action, size, mtime_ns, hash, status) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (str(entry.source), str(entry.destination), entry.action.value, entry.size, entry.mtime_ns, entry.file_hash, PlanStatus.PENDING.value)
+                    for entry in entries
+                ]
+            )
+
+    def iter_pending(self, *, include_failed : bool = False) -> Iterator[list[PlanEntry]]:
+        """
+        Yield pages of entries that have not been executed, ordered by destination so that each directory is written
+        in one sequential pass.
+
+        Entries may be marked done between pages.
+
+        Args:
+            include_failed: Whether to retry entries that failed in a previous run.
+        """
+        statuses = [PlanStatus.PENDING.value]
+        if include_failed:
+            statuses.append(PlanStatus.FAILED.value)
+        placeholders = ', '.join('?' * len(statuses))
+
+        last_destination, last_id = '', 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f'''SELECT id, source, destination, action, size, mtime_ns, hash FROM plan_entries
+                        WHERE status IN ({placeholders}) AND (destination, id) > (?, ?)
+                        ORDER BY destination, id LIMIT {PAGE_SIZE}''',
+                    (*statuses, last_destination, last_id)
+                ).fetchall()
+            if not rows:
+                return
+
+            yield [
+                PlanEntry(
+                    id=entry_id, source=Path(source), destination=Path(destination), action=PlanActions(action),
+                    size=size, mtime_ns=mtime_ns, file_hash=file_hash,
+                )
+                for entry_id, source, destination, action, size, mtime_ns, file_hash in rows
+            ]
+            last_destination, last_id = rows[-1][2], rows[-1][0]
+
+    def mark_done(self, entry_ids: Iterable[int]) -> None:
+        """
+        Journal the completion of a batch of entries.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE plan_entries SET status=?, error=NULL WHERE id=?',
+                [(PlanStatus.DONE.value, entry_id) for entry_id in entry_ids]
+            )
+
+    def mark_failed(self, failures: Iterable[tuple[int, str]]) -> None:
+        """
+        Journal a batch of entries that could not be executed.
+
+        Args:
+            failures: The (id, error message) of each entry.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE plan_entries SET status=?, error=? WHERE id=?',
+                [(PlanStatus.FAILED.value, error, entry_id) for entry_id, error in failures]
+            )
+
+    def count_by_status(self) -> dict[PlanStatus, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM plan_entries GROUP BY status').fetchall()
+        counts = {status: 0 for status in PlanStatus}
+        counts.update({PlanStatus(status): count for status, count in rows})
+        return counts
+
+    def clear(self) -> None:
+        """
+        Remove the plan, once every entry has been executed.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM plan_entries')
+            self._conn.execute('DELETE FROM plan_settings')
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
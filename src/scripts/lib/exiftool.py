@@ -0,0 +1,301 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    exiftool.py                                                                                          *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import atexit
+from dataclasses import dataclass
+import itertools
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import shutil
+import subprocess
+import threading
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Starting perl costs far more than reading the tags of a single photo, so keep the process(es) alive.
+DEFAULT_PROCESSES = 1
+
+@dataclass
+class ExifToolResult:
+    """
+    The output of a single -execute request.
+    """
+    stdout : str
+    stderr : str
+
+    @property
+    def ok(self) -> bool:
+        """
+        exiftool in -stay_open mode doesn't report an exit code, so treat any "Error" line as a failure.
+        """
+        return not any(line.startswith('Error') for line in self.stderr.splitlines())
+
+class ExifToolProcess:
+    """
+    A single exiftool process running in -stay_open mode.
+
+    Requests are written to stdin as an argfile. Each is terminated with a numbered -execute, and exiftool prints a
+    matching {readyN} marker on stdout (and, via -echo4, on stderr) when it has finished.
+
+    This is not thread-safe. Use ExifToolService to share processes between threads.
+    """
+
+    def __init__(self, executable : str = 'exiftool'):
+        self.executable = executable
+        self._process : subprocess.Popen | None = None
+        self._stderr_lines : queue.Queue[str] = queue.Queue()
+        self._counter = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """
+        Start the exiftool process.
+
+        Raises:
+            FileNotFoundError: If exiftool is not installed.
+        """
+        if self.running:
+            return
+
+        self._stderr_lines = queue.Queue()
+        self._process = subprocess.Popen(
+            [self.executable, '-stay_open', 'True', '-@', '-', '-common_args', '-charset', 'filename=utf8'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # Drain stderr in the background, so a chatty batch can never fill the pipe and deadlock the stdout read.
+        threading.Thread(target=self._read_stderr, args=(self._process, self._stderr_lines), daemon=True).start()
+        logger.debug('Started exiftool process %s', self._process.pid)
+
+    @staticmethod
+    def _read_stderr(process : subprocess.Popen, lines : queue.Queue[str]) -> None:
+        assert process.stderr is not None
+        for line in iter(process.stderr.readline, b''):
+            lines.put(line.decode('utf-8', errors='replace'))
+        # Unblock anyone waiting on a marker that will never arrive
+        lines.put('')
+
+    def execute(self, args : Iterable[str]) -> ExifToolResult:
+        """
+        Run one exiftool command in the running process.
+
+        Args:
+            args: The arguments to pass to exiftool, i.e. ['-j', '-DateTimeOriginal', 'photo.jpg']
+
+        Returns:
+            The stdout and stderr of the command.
+
+        Raises:
+            BrokenPipeError: If the process exits before the command finishes.
+        """
+        self.start()
+        assert self._process is not None and self._process.stdin is not None and self._process.stdout is not None
+
+        marker = f'{{ready{next(self._counter)}}}'
+        request = [*args, '-echo4', marker, f'-execute{marker[6:-1]}']
+        for arg in request:
+            if '\n' in arg:
+                raise ValueError(f'exiftool arguments cannot contain newlines: {arg!r}')
+        self._process.stdin.write(('\n'.join(request) + '\n').encode('utf-8'))
+        self._process.stdin.flush()
+
+        stdout : list[str] = []
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise BrokenPipeError('exiftool exited unexpectedly')
+            decoded = line.decode('utf-8', errors='replace')
+            if decoded.rstrip('\r\n') == marker:
+                break
+            stdout.append(decoded)
+
+        stderr : list[str] = []
+        while True:
+            decoded = self._stderr_lines.get()
+            if not decoded or decoded.rstrip('\r\n') == marker:
+                break
+            stderr.append(decoded)
+
+        return ExifToolResult(''.join(stdout), ''.join(stderr))
+
+    def close(self) -> None:
+        """
+        Ask exiftool to exit, and wait for it.
+        """
+        if not self._process:
+            return
+
+        process, self._process = self._process, None
+        try:
+            if process.poll() is None and process.stdin:
+                process.stdin.write(b'-stay_open\nFalse\n')
+                process.stdin.flush()
+            process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+class ExifToolService:
+    """
+    A thread-safe pool of persistent exiftool processes.
+
+    Each request is handed to whichever process is idle, so up to `processes` requests run at once.
+
+    Examples:
+        >>> with ExifToolService() as exiftool:
+        ...     exiftool.read_tags([Path('IMG_0001.jpg')], ['DateTimeOriginal'])
+        {PosixPath('IMG_0001.jpg'): {'SourceFile': 'IMG_0001.jpg', 'DateTimeOriginal': '2024:01:01 12:00:00'}}
+    """
+
+    def __init__(self, processes : int = DEFAULT_PROCESSES, executable : str = 'exiftool'):
+        self.executable = executable
+        self._idle : queue.Queue[ExifToolProcess] = queue.Queue()
+        self._processes = [ExifToolProcess(executable) for _ in range(max(1, processes))]
+        for process in self._processes:
+            self._idle.put(process)
+
+    @classmethod
+    def available(cls, executable : str = 'exiftool') -> bool:
+        return shutil.which(executable) is not None
+
+    def execute(self, args : Iterable[str], *, retries : int = 1) -> ExifToolResult:
+        """
+        Run one exiftool command on an idle process, restarting it if it has died.
+
+        Args:
+            args: The arguments to pass to exiftool.
+            retries: How many times to restart the process and retry if it exits mid-request.
+
+        Returns:
+            The stdout and stderr of the command.
+        """
+        args = list(args)
+        process = self._idle.get()
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    return process.execute(args)
+                except BrokenPipeError:
+                    logger.warning('exiftool exited unexpectedly. Attempt %d/%d', attempt + 1, retries + 1)
+                    process.close()
+                    if attempt == retries:
+                        raise
+            raise BrokenPipeError('exiftool exited unexpectedly')
+        finally:
+            self._idle.put(process)
+
+    def read_tags(self, files : Iterable[Path], tags : Iterable[str], *, numeric : bool = False) -> dict[Path, dict[str, Any]]:
+        """
+        Read tags from many files with a single request.
+
+        Args:
+            files: The files to read.
+            tags: The tags to read, without the leading dash (i.e. 'DateTimeOriginal').
+            numeric: If True, pass -n so values are not converted to human readable strings.
+
+        Returns:
+            A dict of file -> tags. Files that exiftool could not read are omitted.
+        """
+        files = list(files)
+        if not files:
+            return {}
+
+        args = ['-j']
+        if numeric:
+            args.append('-n')
+        args.extend(f'-{tag}' for tag in tags)
+        args.extend(str(file) for file in files)
+
+        result = self.execute(args)
+        if result.stderr.strip():
+            logger.debug('exiftool read reported: %s', result.stderr.strip())
+
+        try:
+            rows = json.loads(result.stdout or '[]')
+        except json.JSONDecodeError as e:
+            logger.error('Unable to parse exiftool output: %s', e)
+            return {}
+
+        by_name = {os.path.normpath(str(file)): file for file in files}
+        output : dict[Path, dict[str, Any]] = {}
+        for row in rows:
+            source = os.path.normpath(str(row.get('SourceFile', '')))
+            if source in by_name:
+                output[by_name[source]] = row
+        return output
+
+    def write_tags(self, file : Path, tags : dict[str, str], *, overwrite_original : bool = True) -> ExifToolResult:
+        """
+        Write tags to a file.
+
+        Args:
+            file: The file to update.
+            tags: A dict of tag -> value, i.e. {'DateTimeOriginal': '2024:01:01 12:00:00'}
+            overwrite_original: If True, don't leave a *_original backup behind.
+
+        Returns:
+            The result, which should be checked with ExifToolResult.ok
+        """
+        args = ['-overwrite_original'] if overwrite_original else []
+        args.extend(f'-{tag}={value}' for tag, value in tags.items())
+        args.append(str(file))
+        return self.execute(args)
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.close()
+
+    def __enter__(self) -> ExifToolService:
+        return self
+
+    def __exit__(self, *exc : Any) -> None:
+        self.close()
+
+_shared_service : ExifToolService | None = None
+_shared_lock = threading.Lock()
+
+def get_exiftool(processes : int = DEFAULT_PROCESSES) -> ExifToolService:
+    """
+    Get the exiftool service shared by this process, starting it on first use.
+
+    Args:
+        processes: How many exiftool processes to run. Only used the first time this is called.
+
+    Returns:
+        The shared service. It is closed automatically at exit.
+    """
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is None:
+            _shared_service = ExifToolService(processes)
+            atexit.register(_shared_service.close)
+        return _shared_service
@@ -23,13 +23,18 @@
 *                                                                                                                      *
 *********************************************************************************************************************"""
 from __future__ import annotations
-from typing import Iterator, Literal, Any
+from typing import Callable, Iterator, Literal, Any
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+import errno
+import fnmatch
+import mmap
 import os
 import re
 import subprocess
 import sys
+import tempfile
 import threading
 import time
 
@@ -41,16 +46,23 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 import logging
 from collections import defaultdict
 from pathlib import Path
-from functools import lru_cache
+from functools import lru_cache, partial
 import hashlib
 import xxhash
 import shutil
+import stat
 from cachetools import LRUCache
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
 from threading import Lock
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 from scripts.setup_logging import setup_logging
 from scripts.exceptions import ShouldTerminateError, ChecksumMismatchError, UnexpectedStateError
 from scripts.lib.script import Script
+from scripts.lib.db.hashes import HashIndex
+from scripts.lib.io_scheduler import IOScheduler, DeviceKinds
 from scripts.lib.types import YELLOW, RESET, GREEN
 
 logger = logging.getLogger(__name__)
@@ -85,11 +97,50 @@ PATTERNS = {
     'windows_drive': re.compile(r'[A-Za-z]:[\\/]')
 }
 
-# Tool options (rsync, shutil, teracopy)
+# Filesystem types that are served over the network. mmap is avoided on these, because a file truncated by
+# another client raises SIGBUS instead of an OSError, and page-fault sized reads make poor use of the link.
+NETWORK_FILESYSTEMS = {
+    'nfs',
+    'nfs4',
+    'cifs',
+    'smb3',
+    'smbfs',
+    'fuse.sshfs',
+    'fuse.rclone',
+    '9p',
+    'drvfs',
+}
+
+# How often to check /proc/self/mountinfo for changes before trusting the directory caches, in seconds
+MOUNT_CHECK_INTERVAL = 1.0
+
+# Escaped characters in /proc/self/mountinfo, i.e. \040 for a space
+MOUNTINFO_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+# Tool options (rsync, shutil, teracopy, native)
 class CopyTools(Enum):
     RSYNC = 'rsync'
     SHUTIL = 'shutil'
     TERACOPY = 'teracopy'
+    # Streams the source once, hashing while writing, then verifies with a single read-back
+    NATIVE = 'native'
+    # Clones the file on copy-on-write filesystems, or copies it within the kernel, falling back to the tools above
+    REFLINK = 'reflink'
+
+# ioctl(FICLONE) from linux/fs.h: share the source's extents with the destination
+FICLONE = 0x40049409
+
+# Errors that mean a filesystem (or pair of filesystems) can't clone or copy_file_range, rather than a failed copy
+REFLINK_UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS, errno.EBADF}
+
+# Strategies for reading whole files while hashing
+class ReadStrategies(Enum):
+    # mmap for local filesystems, buffered for network filesystems
+    AUTO = 'auto'
+    # readinto() a large, reusable, per-thread buffer
+    BUFFERED = 'buffered'
+    # map the file into memory and hash it in slices
+    MMAP = 'mmap'
 
 class FileManager(Script):
     directory: Path = Field(default=Path('.'))
@@ -100,12 +151,29 @@ class FileManager(Script):
     extensions : list[str] = Field(default=None, validate_default=True)
     filename_pattern : re.Pattern = Field(default=None, validate_default=True)
     skip_mtime_compare : bool = False
+    hash_index_path : Path | None = None
+    read_strategy : ReadStrategies = ReadStrategies.AUTO
+    read_chunk_size : int = 8 * 1024 * 1024
+    preferred_copy_tool : CopyTools | None = None
+    device_limits : dict[DeviceKinds, int] = Field(default_factory=dict)
+    parallel_cleanup : bool = False
 
     _stats : dict[str, int] = PrivateAttr(default_factory=lambda: defaultdict(int))
     _stats_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
     _hash_cache: LRUCache = PrivateAttr(default_factory=lambda: LRUCache(maxsize=10000))
     _cache_lock: Lock = PrivateAttr(default_factory=Lock)
+    _hash_index : HashIndex | None = PrivateAttr(default=None)
+    _read_buffers : threading.local = PrivateAttr(default_factory=threading.local)
+    _filesystem_types : dict[int, str] = PrivateAttr(default_factory=dict)
+    _reflink_unsupported : set[int] = PrivateAttr(default_factory=set)
+    _known_directories : set[Path] = PrivateAttr(default_factory=set)
+    _directory_devices : dict[Path, int] = PrivateAttr(default_factory=dict)
+    _mount_points : set[Path] = PrivateAttr(default_factory=set)
+    _mountinfo : str | None = PrivateAttr(default=None)
+    _mounts_checked_at : float = PrivateAttr(default=0.0)
+    _directory_cache_lock : Lock = PrivateAttr(default_factory=Lock)
     _glob_patterns : list[str] = PrivateAttr(default_factory=list)
+    _glob_regex : re.Pattern | None = PrivateAttr(default=None)
     _trash_subdir : Path | None = None
     _copy_tool : str | None = None
 
@@ -119,6 +187,34 @@ class FileManager(Script):
     def validate_directory(cls, v) -> Path:
         return Path(v)
 
+    @field_validator('hash_index_path', mode='before')
+    def validate_hash_index_path(cls, v) -> Path | None:
+        # None or empty disables the persistent index
+        if not v:
+            return None
+        return Path(v)
+
+    @field_validator('read_strategy', mode='before')
+    def validate_read_strategy(cls, v) -> ReadStrategies:
+        if not v:
+            return ReadStrategies.AUTO
+        return ReadStrategies(v)
+
+    @field_validator('preferred_copy_tool', mode='before')
+    def validate_preferred_copy_tool(cls, v) -> CopyTools | None:
+        if not v:
+            return None
+        return CopyTools(v)
+
+    @field_validator('device_limits', mode='before')
+    def validate_device_limits(cls, v) -> dict[DeviceKinds, int]:
+        # Accept a dict, or a list of 'kind=limit' strings from the command line
+        if not v:
+            return {}
+        if not isinstance(v, dict):
+            v = dict(str(item).split('=', 1) for item in v)
+        return {DeviceKinds(str(getattr(kind, 'value', kind)).lower()): int(limit) for kind, limit in v.items()}
+
     @field_validator('filename_pattern', mode='before')
     def validate_filename_pattern(cls, v) -> re.Pattern:
         # None or empty results in None
@@ -182,11 +278,36 @@ class FileManager(Script):
             self._sony_clip_pattern = re.compile(r'.*/M4ROOT/CLIP/\w+[.](xml|XML)$')
         return self._sony_clip_pattern
 
+    @property
+    def hash_index(self) -> HashIndex | None:
+        if not self.hash_index_path:
+            return None
+
+        with self._cache_lock:
+            if not self._hash_index:
+                self._hash_index = HashIndex(self.hash_index_path)
+        return self._hash_index
+
+    def create_io_scheduler(self) -> IOScheduler:
+        """
+        Create a scheduler that limits concurrent file operations per pair of devices.
+
+        Devices whose kind can't be detected are limited to max_threads. Any limits in device_limits override the
+        defaults for that kind of device.
+        """
+        return IOScheduler(self, limits={DeviceKinds.UNKNOWN: self.max_threads, **self.device_limits})
+
     @property
     def copy_tool(self) -> str:
+        """
+        The tool that copies bytes. Clones are attempted before it where possible (see should_try_reflink), so this
+        is never reflink itself.
+        """
         if not self._copy_tool:
             # Check if rsync is available
-            if shutil.which('rsync'):
+            if self.preferred_copy_tool and self.preferred_copy_tool != CopyTools.REFLINK:
+                self._copy_tool = self.preferred_copy_tool.value
+            elif shutil.which('rsync'):
                 self._copy_tool = CopyTools.RSYNC.value
             elif shutil.which('teracopy'):
                 self._copy_tool = CopyTools.TERACOPY.value
@@ -221,6 +342,23 @@ class FileManager(Script):
 
         return self._glob_patterns
 
+    def get_glob_regex(self) -> re.Pattern | None:
+        """
+        Get a single case-insensitive regex that matches a filename against every glob pattern at once.
+
+        Returns:
+            The compiled regex, or None if a pattern matches against directories (i.e. contains a slash), which a
+            filename alone can't be checked against.
+        """
+        if self._glob_regex is None:
+            globs = self.get_glob_patterns()
+            if any('/' in glob or os.sep in glob for glob in globs):
+                return None
+            # An empty alternation would match everything, but no patterns should match nothing (as glob() does)
+            combined = '|'.join(f'(?:{fnmatch.translate(glob)})' for glob in globs) or r'(?!)'
+            self._glob_regex = re.compile(combined, re.IGNORECASE)
+        return self._glob_regex
+
     def guess_drive_root(self, filepath: Path | None = None) -> Path:
         """
         Attempt to get the drive root for the given filepath. 
@@ -374,34 +512,46 @@ class FileManager(Script):
 
         return False
 
-    def hash_file(self, filename: str | Path, partial: bool = False, hashing_algorithm : str = 'xxhash') -> str:
+    def hash_file(self, filename: str | Path, partial: bool = False, hashing_algorithm : str = 'xxhash', *, use_cache : bool = True) -> str:
         """
         Calculate the hash of a file. Optionally perform partial hashing.
 
+        Hashes are cached in memory and, if hash_index_path is set, in a persistent index. Both caches are keyed on the
+        file's stat data (size, mtime_ns, inode), so a file that changed since it was hashed is read again.
+
         Args:
             filename: The path to the file to hash.
             partial: If True, only hash the first and last 1MB of the file.
             hashing_algorithm: The hashing algorithm to use. Use xxhash for faster hashing.
+            use_cache: If False, always read the file (i.e. to verify a copy). The result is still cached.
 
         Returns:
             The hash of the file.
         """
-        cache_key = (str(filename), partial)
-
-        with self._cache_lock:
-            if cache_key in self._hash_cache:
-                return self._hash_cache[cache_key]
-
         filepath = Path(filename)
         if not filepath.is_absolute():
             filepath = self.directory / filepath
 
-        if not filepath.exists():
-            raise FileNotFoundError(f"File not found to hash: {filepath}")
+        try:
+            file_stat = filepath.stat()
+        except FileNotFoundError as fnf:
+            raise FileNotFoundError(f"File not found to hash: {filepath}") from fnf
+
+        cache_key = (str(filepath), partial, hashing_algorithm, file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+        if use_cache:
+            with self._cache_lock:
+                if cache_key in self._hash_cache:
+                    return self._hash_cache[cache_key]
+
+            if self.hash_index and (result := self.hash_index.get(filepath, file_stat, partial, hashing_algorithm)):
+                with self._cache_lock:
+                    self._hash_cache[cache_key] = result
+                return result
 
         hasher = self.get_hasher(hashing_algorithm)
 
-        file_size = self.file_size(filepath)
+        file_size = file_stat.st_size
 
         # Define the size of the chunks to read
         chunk_size = 1024 * 1024  # 1MB
@@ -414,16 +564,124 @@ class FileManager(Script):
                 f.seek(-chunk_size, os.SEEK_END)
                 hasher.update(f.read(chunk_size))
             else:
-                # File is small, read the whole file
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hasher.update(chunk)
+                # File is small, or a full hash was requested, so read the whole file
+                self._hash_whole_file(f, hasher, file_size, self.get_read_strategy(filepath))
 
         result = hasher.hexdigest()
+        self._remember_hash(filepath, file_stat, partial, hashing_algorithm, result)
+        return result
 
+    def _remember_hash(self, filepath : Path, file_stat : os.stat_result, partial : bool, hashing_algorithm : str, result : str) -> None:
+        """
+        Store a hash in the in-memory cache and the on-disk index.
+
+        Args:
+            filepath: The file that was hashed.
+            file_stat: The stat of the file at the time it was read.
+            partial: Whether the hash was partial.
+            hashing_algorithm: The algorithm used.
+            result: The hex digest.
+        """
+        cache_key = (str(filepath), partial, hashing_algorithm, file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
         with self._cache_lock:
             self._hash_cache[cache_key] = result
 
-        return result
+        if self.hash_index:
+            self.hash_index.set(filepath, file_stat, partial, hashing_algorithm, result)
+
+    def _hash_whole_file(self, handle : Any, hasher : Any, file_size : int, strategy : ReadStrategies) -> None:
+        """
+        Feed an entire open file into a hasher.
+
+        Both strategies avoid a Python-level loop over small chunks, which dominates the cost of hashing large RAW files.
+
+        Args:
+            handle: A file opened in binary mode, positioned at the start.
+            hasher: The hasher to update.
+            file_size: The size of the file, in bytes.
+            strategy: How to read the file. Must not be AUTO.
+        """
+        chunk_size = self.read_chunk_size
+
+        if strategy == ReadStrategies.MMAP and file_size > 0:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for offset in range(0, file_size, chunk_size):
+                    hasher.update(view[offset:offset + chunk_size])
+            return
+
+        # Reuse one buffer per thread, so hashing many files doesn't allocate chunk_size bytes for each one
+        buffer = getattr(self._read_buffers, 'buffer', None)
+        if buffer is None or len(buffer) != chunk_size:
+            buffer = bytearray(chunk_size)
+            self._read_buffers.buffer = buffer
+
+        with memoryview(buffer) as view:
+            while (count := handle.readinto(buffer)):
+                hasher.update(view[:count])
+
+    def get_read_strategy(self, filepath : Path) -> ReadStrategies:
+        """
+        Resolve the read strategy to use when hashing a file.
+
+        Args:
+            filepath: The file that will be read.
+
+        Returns:
+            MMAP or BUFFERED. AUTO resolves to BUFFERED on network filesystems and MMAP everywhere else.
+        """
+        if self.read_strategy != ReadStrategies.AUTO:
+            return self.read_strategy
+
+        if self.get_filesystem_type(filepath) in NETWORK_FILESYSTEMS:
+            return ReadStrategies.BUFFERED
+
+        return ReadStrategies.MMAP
+
+    def get_filesystem_type(self, filepath : Path) -> str:
+        """
+        Get the type of the filesystem a path is stored on (i.e. ext4, nfs4, cifs).
+
+        Results are cached by device id, so /proc/self/mounts is only read once per filesystem.
+
+        Args:
+            filepath: The path to check.
+
+        Returns:
+            The filesystem type, or an empty string if it cannot be determined.
+        """
+        try:
+            device = self.get_filesystem(filepath)
+        except OSError:
+            return ''
+
+        with self._cache_lock:
+            if device in self._filesystem_types:
+                return self._filesystem_types[device]
+
+        fs_type = ''
+        longest_mount = -1
+        resolved = str(filepath.absolute())
+        try:
+            with open('/proc/self/mounts', 'r', encoding='utf-8') as mounts:
+                for line in mounts:
+                    parts = line.split()
+                    if len(parts) < 3:
+                        continue
+                    # Spaces in mount points are escaped as \040
+                    mount_point = parts[1].replace('\\040', ' ')
+                    if resolved != mount_point and not resolved.startswith(mount_point.rstrip('/') + '/'):
+                        continue
+                    if len(mount_point) > longest_mount:
+                        longest_mount = len(mount_point)
+                        fs_type = parts[2]
+        except OSError:
+            # Not linux, or /proc is unavailable. Treat as local.
+            logger.debug('Unable to read /proc/self/mounts to determine filesystem type of %s', filepath)
+
+        with self._cache_lock:
+            self._filesystem_types[device] = fs_type
+
+        return fs_type
 
     def should_ignore_directory(self, directory: Path | str, *, allow_hidden : bool = False) -> bool:
         """
@@ -524,7 +782,10 @@ class FileManager(Script):
         Yields:
             The next file in the directory.
         """
-        if recursive or len(self.get_glob_patterns()) <= 2:
+        if self.get_glob_regex():
+            for entry in self.scan_files(directory, recursive=recursive):
+                yield Path(entry.path)
+        elif recursive or len(self.get_glob_patterns()) <= 2:
             # Recursive always requires rglob
             # OR Small number of patterns, so use glob to avoid manual pruning
             yield from self.glob(directory, recursive=recursive)
@@ -532,6 +793,43 @@ class FileManager(Script):
             # Hopefully get better performance from manually iterating over files
             yield from self.iterfiles(directory)
             
+    def scan_files(self, directory : Path | None = None, *, recursive : bool = True, pattern : re.Pattern | None = None) -> Iterator[os.DirEntry]:
+        """
+        Yield matching files in a directory, walking the tree once with os.scandir.
+
+        Every glob pattern is checked at once against each filename, and the type of each entry comes from the
+        directory listing, so no extra stat is needed to walk the tree. Ignored directories (see
+        should_ignore_directory) and the trash are never entered.
+
+        The entries cache their stat data, so callers that need the size or mtime should use entry.stat() rather
+        than statting the path again.
+
+        Args:
+            directory: The directory to search. Defaults to self.directory.
+            recursive: Whether to search subdirectories.
+            pattern: A regex to match filenames against, instead of the glob patterns.
+
+        Yields:
+            A DirEntry for the next file.
+        """
+        glob_regex = pattern or self.get_glob_regex()
+        if glob_regex is None:
+            raise ValueError(f'Glob patterns cannot be matched against filenames alone: {self.get_glob_patterns()}')
+
+        pending = [directory or self.directory]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and entry.name != '.trash' and not self.should_ignore_directory(entry.path):
+                                pending.append(entry.path)
+                        elif glob_regex.match(entry.name) and entry.is_file() and self.filename_match(entry.name):
+                            yield entry
+            except OSError as ose:
+                logger.warning('Unable to search %s: %s', current, ose)
+
     def glob(self, directory : Path | None = None, recursive : bool = True) -> Iterator[Path]:
         """
         Yield files in a directory using rglob for each glob pattern.
@@ -803,13 +1101,93 @@ class FileManager(Script):
         Returns:
             The directory path.
         """
+        if exist_ok and self.directory_exists(directory):
+            return directory
+
         if not self.check_dry_run(f'creating directory {directory}'):
             directory.mkdir(parents=parents, exist_ok=exist_ok)
+            self.remember_directory(directory)
 
         self.record_create_directory()
 
         return directory
 
+    def _refresh_directory_caches(self) -> None:
+        """
+        Clear the directory and device caches if anything was mounted or unmounted since they were filled.
+
+        /proc/self/mountinfo is read at most once every MOUNT_CHECK_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        if now - self._mounts_checked_at < MOUNT_CHECK_INTERVAL:
+            return
+        self._mounts_checked_at = now
+
+        try:
+            with open('/proc/self/mountinfo', 'r', encoding='utf-8') as f:
+                mountinfo = f.read()
+        except OSError:
+            # Not linux. The caches can't be invalidated, so mounts are assumed not to change.
+            mountinfo = ''
+
+        with self._directory_cache_lock:
+            if mountinfo == self._mountinfo:
+                return
+
+            if self._mountinfo is not None:
+                logger.debug('Mount points changed. Clearing directory caches.')
+                self._known_directories.clear()
+                self._directory_devices.clear()
+            self._mountinfo = mountinfo
+            # The mount point is the 5th field
+            self._mount_points = {
+                Path(MOUNTINFO_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), line.split()[4]))
+                for line in mountinfo.splitlines()
+                if len(line.split()) > 4
+            }
+
+        with self._cache_lock:
+            self._filesystem_types.clear()
+
+    def remember_directory(self, directory : Path) -> None:
+        """
+        Record that a directory (and so all of its parents) exists.
+        """
+        directory = directory.absolute()
+        with self._directory_cache_lock:
+            self._known_directories.add(directory)
+            self._known_directories.update(directory.parents)
+
+    def forget_directory(self, directory : Path) -> None:
+        """
+        Remove a directory, and everything cached below it, from the directory caches. Call this if a directory may
+        have been removed.
+        """
+        directory = directory.absolute()
+        with self._directory_cache_lock:
+            self._known_directories = {d for d in self._known_directories if d != directory and directory not in d.parents}
+            self._directory_devices = {d: dev for d, dev in self._directory_devices.items() if d != directory and directory not in d.parents}
+
+    def directory_exists(self, directory : Path) -> bool:
+        """
+        Check whether a directory exists, only touching the disk the first time a directory is seen.
+
+        Args:
+            directory: The directory to check.
+
+        Returns:
+            True if the directory exists.
+        """
+        self._refresh_directory_caches()
+        with self._directory_cache_lock:
+            if directory.absolute() in self._known_directories:
+                return True
+
+        if directory.is_dir():
+            self.remember_directory(directory)
+            return True
+        return False
+
     def delete_file(self, file_path: Path, *, use_trash : bool = True, dont_record : bool = False) -> bool:
         """
         Delete a file.
@@ -841,26 +1219,38 @@ class FileManager(Script):
 
         return False
 
-    def delete_empty_directories(self, directory: Path | None = None) -> None:
+    def delete_empty_directories(self, directory: Path | None = None, *, parallel : bool | None = None) -> None:
         """
         Delete empty directories.
+
+        The tree is walked once, bottom up, so every directory is listed a single time and its emptiness is decided
+        from the results of its children.
+
+        Args:
+            directory: The directory to clean. Defaults to self.directory.
+            parallel: Clean the subtrees below directory concurrently, with max_threads workers.
+                Defaults to self.parallel_cleanup.
         """
         directory = directory or self.directory
+        if parallel is None:
+            parallel = self.parallel_cleanup
 
         if not directory.exists():
             logger.warning('delete_empty_directories on directory that does not exist: %s', directory)
             return
 
+        deleted_before = self.directories_deleted
         with alive_bar(title=f"Organizing {str(directory)[-25:]}/", unit='dirs', dual_line=True, unknown='waves') as self._progress_bar:
-            count = 0
-            skipped = 0
-            for dirpath in self.yield_directories(directory, recursive=True):
-                if self.delete_directory_if_empty(dirpath):
-                    count += 1
-                else:
-                    skipped += 1
+            def on_directory(_deleted : bool) -> None:
                 self._progress_bar()
-                self._progress_bar.text(f'{GREEN}Cleaning directories:{RESET} {count} deleted, {skipped} skipped')
+                self._progress_bar.text(f'{GREEN}Cleaning directories:{RESET} {self.directories_deleted - deleted_before} deleted')
+
+            if parallel and self.max_threads > 1:
+                with ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix='cleanup') as executor:
+                    _, skipped = self.delete_empty_tree(directory, executor=executor, on_directory=on_directory)
+            else:
+                _, skipped = self.delete_empty_tree(directory, on_directory=on_directory)
+        count = self.directories_deleted - deleted_before
 
 
         try:
@@ -872,6 +1262,87 @@ class FileManager(Script):
             
         logger.info('Cleaned up %d empty directories. %d remain.', count, skipped)
 
+    def delete_empty_tree(
+        self,
+        directory: Path,
+        *,
+        executor : ThreadPoolExecutor | None = None,
+        on_directory : Callable[[bool], None] | None = None,
+    ) -> tuple[bool, int]:
+        """
+        Delete every empty directory below (and including) directory, deepest first.
+
+        Each directory is listed once with os.scandir. It is deleted when all of its subdirectories were deleted
+        and only junk files remain, which are removed first. Symlinks always count as content.
+
+        Args:
+            directory: The root of the tree to clean.
+            executor: If given, the subdirectories of directory are cleaned concurrently. Each subtree is still
+                walked by a single worker, so workers never wait on each other.
+            on_directory: Called with the outcome of every directory, once its subtree is done.
+
+        Returns:
+            A tuple of (whether directory was deleted, the number of directories that remain in the tree).
+        """
+        junk_files : list[Path] = []
+        subdirectories : list[Path] = []
+        has_content = False
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False) and self.is_junk(Path(entry.path), entry.stat(follow_symlinks=False).st_size):
+                        # Don't remove junk files unless the rest of the dir is empty
+                        junk_files.append(Path(entry.path))
+                    else:
+                        has_content = True
+        except FileNotFoundError:
+            return True, 0
+        except PermissionError as e:
+            logger.error('Permission denied deleting directory: %s -> %s', directory, e)
+            return False, 1
+
+        if executor is not None:
+            results = list(executor.map(partial(self.delete_empty_tree, on_directory=on_directory), subdirectories))
+        else:
+            results = [self.delete_empty_tree(subdirectory, on_directory=on_directory) for subdirectory in subdirectories]
+
+        remaining = sum(kept for _, kept in results)
+        deleted = not has_content and all(was_deleted for was_deleted, _ in results) and self._delete_emptied_directory(directory, junk_files)
+        if not deleted:
+            remaining += 1
+
+        if on_directory:
+            on_directory(deleted)
+
+        return deleted, remaining
+
+    def _delete_emptied_directory(self, directory: Path, junk_files: list[Path]) -> bool:
+        """
+        Remove the junk left in a directory, then the directory itself.
+
+        Returns:
+            True if the directory was deleted (or would be, in a dry run).
+        """
+        for junk in junk_files:
+            logger.debug('Deleting file="%s" in directory="%s"', junk, directory)
+            if not self.delete_file(junk, use_trash=False):
+                logger.error('Unable to delete junk file: %s', junk)
+                return False
+
+        if not self.check_dry_run(f'deleting empty directory {directory}'):
+            try:
+                # use absolute to avoid Path('.').rmdir(), which generates an OSError
+                directory.absolute().rmdir()
+            except OSError as ose:
+                logger.error('Unable to delete directory: %s -> %s', directory, ose)
+                return False
+            self.forget_directory(directory)
+
+        self.record_delete_directory()
+        return True
+
     def delete_directory_if_empty(self, directory: Path, recursive : bool = True, cleanup : bool = True) -> bool:
         """
         Delete an empty directory, or return False.
@@ -907,42 +1378,28 @@ class FileManager(Script):
                 return False
 
             # Nothing found except junk files... time to remove them.
-            for junk in junk_files:
-                logger.debug('Deleting file="%s" in directory="%s"', junk, directory)
-                if not self.delete_file(junk, use_trash=False):
-                    logger.error('Unable to delete junk file: %s', junk)
-                    return False
-
-            # Nothing was found
-            if not self.check_dry_run(f'deleting empty directory {directory}'):
-                try:
-                    # use absolute to avoid Path('.').rmdir(), which generates an OSError
-                    directory.absolute().rmdir()
-                except OSError as ose:
-                    logger.error('Unable to delete directory: %s -> %s', directory, ose)
-                    return False
-
-            self.record_delete_directory()
-            return True
+            return self._delete_emptied_directory(directory, junk_files)
 
         except PermissionError as e:
             logger.error('Permission denied deleting directory: %s -> %s', directory, e)
 
         return False
 
-    def is_junk(self, file_path : Path) -> bool:
+    def is_junk(self, file_path : Path, filesize : int | None = None) -> bool:
         """
         Check if a file is junk.
 
         Args:
             file_path: The file to check.
+            filesize: The size of the file, if the caller already has it.
 
         Returns:
             True if the file is junk, False otherwise.
         """
         # We may check this a few times, so cache it here
         name = file_path.name
-        filesize = self.file_size(file_path)
+        if filesize is None:
+            filesize = self.file_size(file_path)
         is_hidden = name.startswith('.')
 
         # Check known junk filenames
@@ -1034,6 +1491,9 @@ class FileManager(Script):
         """
         Recursively find the filesystem ID of the nearest existing ancestor of a path.
 
+        The ID is cached per directory until mount points change. A path is assumed to be on the same filesystem as
+        its parent directory unless it is a mount point, so moving many files out of one directory only stats it once.
+
         Args:
             filepath: The path to check.
 
@@ -1049,6 +1509,14 @@ class FileManager(Script):
             >>> fm.filesystem(Path('/home/user/file.txt'))
             2053
         """
+        self._refresh_directory_caches()
+        filepath = filepath.absolute()
+        with self._directory_cache_lock:
+            if (device := self._directory_devices.get(filepath)) is not None:
+                return device
+            if filepath not in self._mount_points and (device := self._directory_devices.get(filepath.parent)) is not None:
+                return device
+
         # Create a list of the path and all its ancestors
         ancestors = [filepath] + list(filepath.parents)
 
@@ -1056,7 +1524,12 @@ class FileManager(Script):
             try:         
                 # os.stat().st_dev is more reliable on windows and linux than Path().drive
                 # ...windows will return an empty string for the latter in WSL.
-                return ancestor.stat().st_dev
+                ancestor_stat = ancestor.stat()
+                # Files are cached by their directory, since they come and go
+                directory = ancestor if stat.S_ISDIR(ancestor_stat.st_mode) else ancestor.parent
+                with self._directory_cache_lock:
+                    self._directory_devices[directory] = ancestor_stat.st_dev
+                return ancestor_stat.st_dev
             except FileNotFoundError:
                 # If the ancestor doesn't exist, move to the next one
                 continue
@@ -1118,7 +1591,7 @@ class FileManager(Script):
             destination_path = self.directory / destination_path
 
         # Convert dirs into file paths
-        if destination_path.is_dir():
+        if self.directory_exists(destination_path):
             destination_path = destination_path / source_path.name
 
         collision_count = 0
@@ -1176,12 +1649,19 @@ class FileManager(Script):
         # ... this is faster and eliminates corruption while copying the data.
         if self.is_same_filesystem(source_path, destination_path):
             source_path.rename(destination_path)
+            # A rename keeps the inode and mtime, so known hashes are still valid at the destination
+            if self.hash_index:
+                self.hash_index.move(source_path.absolute(), destination_path.absolute())
             return destination_path.exists()
         
-        # If the drives are different, try using rsync
-        logger.debug('Drives are different, so moving file with rsync: %s -> %s', source_path, destination_path)
+        # If the drives are different, try using rsync (or the native engine, if it was requested)
         # hashes are checked during this command. May raise ValueError
-        result = self._copy_with_rsync(source_path, destination_path)
+        if self.copy_tool == CopyTools.NATIVE.value:
+            logger.debug('Drives are different, so moving file with native copy: %s -> %s', source_path, destination_path)
+            result = self._copy_with_native(source_path, destination_path)
+        else:
+            logger.debug('Drives are different, so moving file with rsync: %s -> %s', source_path, destination_path)
+            result = self._copy_with_rsync(source_path, destination_path)
 
         # We know hashes match, so delete the source file
         if result:
@@ -1213,7 +1693,7 @@ class FileManager(Script):
             destination_path = self.directory / destination_path
 
         # Convert dirs into file paths
-        if destination_path.is_dir():
+        if self.directory_exists(destination_path):
             destination_path = destination_path / source_path.name
 
         if destination_path.exists():
@@ -1225,10 +1705,14 @@ class FileManager(Script):
         if not self.check_dry_run(f'copying {source_path} to {destination_path}'):
             try:
                 # This verifies the file checksum after copy.
-                if self.copy_tool == CopyTools.RSYNC.value:
+                if self.should_try_reflink(source_path, destination_path) and self._copy_with_reflink(source_path, destination_path):
+                    logger.debug('Copied %s to %s without moving bytes through userspace', source_path, destination_path)
+                elif self.copy_tool == CopyTools.RSYNC.value:
                     self._copy_with_rsync(source_path, destination_path)
                 elif self.copy_tool == CopyTools.TERACOPY.value:
                     self._copy_with_teracopy(source_path, destination_path)
+                elif self.copy_tool == CopyTools.NATIVE.value:
+                    self._copy_with_native(source_path, destination_path)
                 else:
                     self._copy_with_shutil(source_path, destination_path)
             except PermissionError as pe:
@@ -1244,6 +1728,105 @@ class FileManager(Script):
         self.record_copy_file()
         return destination_path
 
+    def should_try_reflink(self, source_path : Path, destination_path : Path) -> bool:
+        """
+        Check whether a copy should first try to clone the file, or copy it within the kernel.
+
+        This happens automatically when both paths are on the same filesystem, unless another copy tool was requested.
+        If reflink was requested, it is tried across filesystems too. Filesystems that turned out not to support either
+        are remembered, and not tried again.
+
+        Args:
+            source_path: The file to copy.
+            destination_path: Where it will be copied to.
+        """
+        if fcntl is None and not hasattr(os, 'copy_file_range'):
+            return False
+
+        if self.preferred_copy_tool not in (None, CopyTools.REFLINK):
+            return False
+
+        try:
+            destination_device = self.get_filesystem(destination_path.parent)
+            source_device = self.get_filesystem(source_path)
+        except OSError:
+            return False
+
+        if destination_device in self._reflink_unsupported:
+            return False
+
+        return source_device == destination_device or self.preferred_copy_tool == CopyTools.REFLINK
+
+    def _copy_with_reflink(self, source_path : Path, destination_path : Path) -> bool:
+        """
+        Copy a file without reading it into userspace.
+
+        ioctl(FICLONE) is tried first, which makes the destination share the source's extents on copy-on-write
+        filesystems (btrfs, XFS). The copy is instant, and takes no extra space until either file changes. As both files
+        are the same blocks on disk, only their sizes are compared afterwards.
+
+        Otherwise, os.copy_file_range copies the data within the kernel (or the server, for NFS 4.2), which some
+        filesystems still implement as a clone. That copy is verified by hash, like every other tool.
+
+        Args:
+            source_path: The source file to copy.
+            destination_path: The destination path.
+
+        Returns:
+            True on success, or False if the filesystem supports neither. Nothing is left at the destination then,
+            so another tool can copy the file instead.
+
+        Raises:
+            FileNotFoundError: If the file is not found after copying.
+            ChecksumMismatchError: If the checksums do not match after copy_file_range.
+        """
+        cloned = False
+        with open(source_path, 'rb', buffering=0) as source, open(destination_path, 'xb', buffering=0) as destination:
+            try:
+                try:
+                    if fcntl is None:
+                        raise OSError(errno.ENOSYS, 'ioctl is not available')
+                    fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+                    cloned = True
+                except OSError as e:
+                    if e.errno not in REFLINK_UNSUPPORTED_ERRNOS or not hasattr(os, 'copy_file_range'):
+                        raise
+                    remaining = os.fstat(source.fileno()).st_size
+                    while remaining > 0 and (count := os.copy_file_range(source.fileno(), destination.fileno(), remaining)):
+                        remaining -= count
+            except OSError as e:
+                destination_path.unlink(missing_ok=True)
+                if e.errno in REFLINK_UNSUPPORTED_ERRNOS:
+                    logger.debug('Filesystem of %s cannot clone or copy_file_range: %s', destination_path.parent, e)
+                    self._reflink_unsupported.add(self.get_filesystem(destination_path.parent))
+                    return False
+                raise
+            except BaseException:
+                # Don't leave a truncated file behind, which would look like a collision on the next run
+                destination_path.unlink(missing_ok=True)
+                raise
+
+        shutil.copystat(source_path, destination_path)
+
+        if not destination_path.exists():
+            raise FileNotFoundError(f"Unable to find file after reflink copy: {destination_path}")
+
+        if cloned:
+            if self.file_size(source_path) != self.file_size(destination_path):
+                destination_path.unlink(missing_ok=True)
+                raise ChecksumMismatchError(f"Size mismatch after cloning {source_path} to {destination_path}")
+            return True
+
+        source_hash = self.hash_file(source_path)
+        destination_hash = self.hash_file(destination_path, use_cache=False)
+        if source_hash != destination_hash:
+            logger.critical(f"Checksum mismatch after copy_file_range {source_path} to {destination_path}")
+            corrupt_path = destination_path.absolute().with_name(f'{destination_path.stem}-corrupt{destination_path.suffix}')
+            self.move_file(destination_path, corrupt_path, rename_on_collision=True)
+            raise ChecksumMismatchError(f"Checksum mismatch after copy_file_range {source_path} to {destination_path}")
+
+        return True
+
     def _copy_with_shutil(self, source_path : Path, destination_path : Path) -> bool:
         """
         Copy a file to a new location using shutil.
@@ -1268,13 +1851,73 @@ class FileManager(Script):
         if not result or not destination_path.exists():
             raise FileNotFoundError(f"Unable to find file after copy: {destination_path}")
 
-        destination_hash = self.hash_file(destination_path)
+        destination_hash = self.hash_file(destination_path, use_cache=False)
         if source_hash != destination_hash:
             logger.critical(f"Checksum mismatch after copying with shutil {source_path} to {destination_path}")
             raise ValueError(f"Checksum mismatch after copying with shutil {source_path} to {destination_path}")
 
         return True
 
+    def _copy_with_native(self, source_path : Path, destination_path : Path, hashing_algorithm : str = 'xxhash') -> bool:
+        """
+        Copy a file to a new location, hashing the source while it is written.
+
+        The other copy tools read the source once to hash it, once to copy it, and the destination once to verify it.
+        This reads the source a single time, so copying over SMB/NFS costs one read, one write and one read-back.
+
+        Args:
+            source: 
+                The source file to copy.
+            destination: 
+                The destination path.
+            hashing_algorithm:
+                The algorithm used to verify the copy.
+
+        Returns:
+            True on success
+
+        Raises:
+            FileNotFoundError: If the file is not found after copying.
+            ChecksumMismatchError: If the checksums do not match after copying. The destination is renamed to *-corrupt.
+        """
+        hasher = self.get_hasher(hashing_algorithm)
+        buffer = bytearray(self.read_chunk_size)
+
+        with open(source_path, 'rb', buffering=0) as source, open(destination_path, 'xb', buffering=0) as destination:
+            try:
+                source_stat = os.fstat(source.fileno())
+                with memoryview(buffer) as view:
+                    while (count := source.readinto(buffer)):
+                        chunk = view[:count]
+                        hasher.update(chunk)
+                        # Raw file objects may perform partial writes
+                        written = 0
+                        while written < count:
+                            written += destination.write(chunk[written:])
+                # Make sure the read-back below verifies what reached the disk, not just the page cache
+                os.fsync(destination.fileno())
+            except BaseException:
+                # Don't leave a truncated file behind, which would look like a collision on the next run
+                destination_path.unlink(missing_ok=True)
+                raise
+
+        shutil.copystat(source_path, destination_path)
+
+        if not destination_path.exists():
+            raise FileNotFoundError(f"Unable to find file after native copy: {destination_path}")
+
+        source_hash = hasher.hexdigest()
+        self._remember_hash(Path(source_path), source_stat, False, hashing_algorithm, source_hash)
+
+        destination_hash = self.hash_file(destination_path, hashing_algorithm=hashing_algorithm, use_cache=False)
+        if source_hash != destination_hash:
+            logger.critical(f"Checksum mismatch after native copy {source_path} to {destination_path}")
+            corrupt_path = destination_path.absolute().with_name(f'{destination_path.stem}-corrupt{destination_path.suffix}')
+            self.move_file(destination_path, corrupt_path, rename_on_collision=True)
+            raise ChecksumMismatchError(f"Checksum mismatch after native copy {source_path} to {destination_path}")
+
+        return True
+
     def _copy_with_teracopy(self, source_path : Path, destination_path : Path) -> bool:
         """
         Copy a file to a new location using TeraCopy.
@@ -1303,7 +1946,7 @@ class FileManager(Script):
         if not destination_path.exists():
             raise FileNotFoundError(f"Unable to find file after copy with TeraCopy: {destination_path}")
 
-        destination_hash = self.hash_file(destination_path)
+        destination_hash = self.hash_file(destination_path, use_cache=False)
         if source_hash != destination_hash:
             logger.critical(f"Checksum mismatch after copying with TeraCopy {source_path} to {destination_path}")
             raise ValueError(f"Checksum mismatch after copying with TeraCopy {source_path} to {destination_path}")
@@ -1339,7 +1982,7 @@ class FileManager(Script):
                 if not destination_path.exists():
                     raise FileNotFoundError(f"Unable to find file after copy with rsync: {destination_path}")
 
-                destination_hash = self.hash_file(destination_path)
+                destination_hash = self.hash_file(destination_path, use_cache=False)
                 if source_hash != destination_hash:
                     # rename destination file by appending -corrupt
                     corrupt_path = destination_path.absolute().with_name(f'{destination_path.stem}-corrupt{destination_path.suffix}')
@@ -1360,6 +2003,87 @@ class FileManager(Script):
         # If we somehow get here (which should not happen if final_attempt logic is correct), raise an error
         raise UnexpectedStateError("Unexpected flow in _copy_with_rsync. This should never happen.")
 
+    def transfer_batch_with_rsync(self, pairs : list[tuple[Path, Path]], *, move : bool = False) -> list[tuple[Path, Path]]:
+        """
+        Copy (or move) a batch of files into a single destination directory with one rsync call.
+
+        Starting rsync once per file costs a process spawn (and, over ssh, a connection) for every file. This hands
+        rsync a --files-from list instead, then verifies every file individually exactly as _copy_with_rsync does.
+
+        Args:
+            pairs: (source, destination) pairs. Every destination must be in the same directory, and keep the source's name.
+            move: If True, delete each source once its destination has been verified.
+
+        Returns:
+            The pairs that were not transferred. Destinations that failed verification have already been renamed to
+            *-corrupt. Callers should retry these one at a time, so the usual retry logic applies.
+
+        Raises:
+            ValueError: If the destinations are not all in one directory, or are renamed.
+        """
+        if not pairs:
+            return []
+
+        destination_dir = pairs[0][1].parent
+        for source_path, destination_path in pairs:
+            if destination_path.parent != destination_dir or destination_path.name != source_path.name:
+                raise ValueError(f"Batched rsync requires one destination directory and unchanged names: {source_path} -> {destination_path}")
+
+        if self.check_dry_run(f'transferring {len(pairs)} files to {destination_dir} with rsync'):
+            return []
+
+        source_hashes = {source_path: self.hash_file(source_path) for source_path, _ in pairs}
+
+        # Same allowance as _calculate_timeout, but for the whole batch
+        total_size = sum(self.file_size(source_path) for source_path, _ in pairs)
+        timeout = 60 + (total_size / (1024 * 1024)) * 10
+
+        # Null separated, so filenames with newlines survive. rsync strips the leading / from each entry.
+        with tempfile.NamedTemporaryFile('w', suffix='.files', delete=False, encoding='utf-8') as listing:
+            listing.write('\0'.join(str(source_path.absolute()) for source_path, _ in pairs))
+        try:
+            self.subprocess([
+                'rsync', '-a', '--times', '--no-relative', '--from0', f'--files-from={listing.name}',
+                '/', f'{destination_dir.absolute()}/'
+            ], timeout=timeout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            # Some files may still have arrived. rsync renames files into place, so anything present is complete.
+            logger.error('Batched rsync to %s failed. Verifying what was transferred: %s', destination_dir, e)
+        finally:
+            os.unlink(listing.name)
+
+        failed : list[tuple[Path, Path]] = []
+        for source_path, destination_path in pairs:
+            if not destination_path.exists():
+                logger.error('File missing after batched rsync: %s', destination_path)
+                failed.append((source_path, destination_path))
+                continue
+
+            if self.hash_file(destination_path, use_cache=False) != source_hashes[source_path]:
+                logger.error('Checksum mismatch after batched rsync %s to %s', source_path, destination_path)
+                corrupt_path = destination_path.absolute().with_name(f'{destination_path.stem}-corrupt{destination_path.suffix}')
+                self.move_file(destination_path, corrupt_path, rename_on_collision=True)
+                failed.append((source_path, destination_path))
+                continue
+
+            if not move:
+                self.record_copy_file()
+                continue
+
+            # It was really a move, not a copy and delete, so don't record the deletion as a deletion.
+            self.delete_file(source_path, dont_record=True)
+            self.record_move_file()
+
+            # ... do not verify xmp files, as they are not critical
+            source_xmp_path = source_path.with_suffix('.xmp')
+            try:
+                if source_xmp_path.exists(follow_symlinks=False):
+                    self._move_file(source_xmp_path, destination_path.with_suffix('.xmp'))
+            except OSError as ose:
+                logger.warning('Error moving XMP file: %s', ose)
+
+        return failed
+
     def _calculate_timeout(self, source_path: Path, requested_timeout : int = 0) -> float:
         """
         Calculate the subprocess timeout based on file size.
@@ -28,8 +28,7 @@ import math
 import shutil
 import logging
 import sqlite3
-import subprocess
-import json
+import itertools
 import re
 import argparse
 import colorlog
@@ -43,6 +42,7 @@ from alive_progress import alive_bar
 
 from scripts.lib.types import ProgressBar, RESET, RED, GREEN, YELLOW, BLUE, PURPLE, CYAN, WHITE, BLACK, BOLD, UNDERLINE, DIM
 from scripts.lib.db import ImagesDatabase
+from scripts.lib.exiftool import ExifToolService, get_exiftool
 
 # Set up module-level logger
 logger = logging.getLogger(__name__)
@@ -52,28 +52,42 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 class ExifDataExtractor:
     """Class to extract and parse GPS data from image files."""
 
-    def __init__(self):
+    GPS_TAGS = ['GPSLatitude', 'GPSLongitude', 'GPSPosition']
+
+    def __init__(self, exiftool: ExifToolService | None = None):
         if not shutil.which('exiftool'):
             logger.error("ExifTool is not installed. Please install ExifTool to proceed.")
             sys.exit(1)
         logger.debug("ExifTool is installed and ready to use.")
+        self.exiftool = exiftool or get_exiftool()
 
     def get_gps_data(self, file_path: Path) -> Tuple[Optional[Decimal], Optional[Decimal]]:
         """Extract GPS data from image file using ExifTool."""
-        try:
-            output = subprocess.check_output(
-                ['exiftool', '-GPSLatitude', '-GPSLongitude', '-GPSPosition', '-j', str(file_path)],
-                stderr=subprocess.STDOUT
-            )
-            data = json.loads(output.decode('utf-8'))[0]
-        except subprocess.CalledProcessError as e:
-            logger.error(f"ExifTool error on file {file_path}: {e}")
-            return None, None
-        except Exception as e:
-            logger.error(f"Error extracting GPS data from {file_path}: {e}")
-            logger.error(f"Output: {output.decode('utf-8')}")
-            return None, None
+        return self.get_gps_data_batch([file_path])[file_path]
 
+    def get_gps_data_batch(self, file_paths: list[Path]) -> dict[Path, Tuple[Optional[Decimal], Optional[Decimal]]]:
+        """Extract GPS data from many image files with a single ExifTool request."""
+        try:
+            rows = self.exiftool.read_tags(file_paths, self.GPS_TAGS)
+        except OSError as e:
+            logger.error(f"ExifTool error reading {len(file_paths)} files: {e}")
+            return {file_path: (None, None) for file_path in file_paths}
+
+        results = {}
+        for file_path in file_paths:
+            if file_path not in rows:
+                logger.error(f"ExifTool returned no data for {file_path}")
+                results[file_path] = (None, None)
+                continue
+            try:
+                results[file_path] = self._parse_gps_data(file_path, rows[file_path])
+            except Exception:
+                # Already logged. Don't let one bad file fail the rest of the batch.
+                results[file_path] = (None, None)
+        return results
+
+    def _parse_gps_data(self, file_path: Path, data: Any) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+        """Parse the GPS tags ExifTool returned for a single file."""
         if not isinstance(data, dict):
             logger.error(f"Invalid JSON data from ExifTool: {data}")
             return None, None
@@ -174,6 +188,13 @@ class ImageSearcher(BaseModel):
                 yield file_path
                 logger.debug(f"Found image file: {file_path}")
 
+    def _yield_gps_data(self, exif_extractor: ExifDataExtractor, files: Iterator[Path], batch_size: int = 100) -> Iterator[Tuple[Path, Tuple[Optional[Decimal], Optional[Decimal]]]]:
+        """Yield (file, (lat, lon)) for every file, reading them from ExifTool in batches."""
+        while (batch := list(itertools.islice(files, batch_size))):
+            results = exif_extractor.get_gps_data_batch(batch)
+            for path in batch:
+                yield path, results[path]
+
     def calculate_distance(self, lat1: Decimal, lon1: Decimal, lat2: Decimal, lon2: Decimal) -> float:
         """Calculate the distance between two coordinates."""
         # Convert Decimal to float for math module functions
@@ -211,11 +232,10 @@ class ImageSearcher(BaseModel):
         files = self.get_image_files()
         count: int = 0
 
-        # Process each file
+        # Process each file, reading GPS data for a batch of files at a time
         with alive_bar(title=f"{YELLOW}Searching images...{RESET}", unit='images', dual_line=True, unknown='waves') as progress_bar:
-            for file_path in files:
+            for file_path, (lat, lon) in self._yield_gps_data(exif_extractor, files):
                 try:
-                    lat, lon = exif_extractor.get_gps_data(file_path)
                     if lat is not None and lon is not None:
                         distance = self.calculate_distance(target_lat, target_lon, lat, lon)
                         if Decimal(distance) <= radius:
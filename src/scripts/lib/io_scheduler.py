@@ -0,0 +1,266 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    io_scheduler.py                                                                                      *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from scripts.lib.file_manager import FileManager
+
+logger = logging.getLogger(__name__)
+
+class DeviceKinds(Enum):
+    HDD = 'hdd'
+    SSD = 'ssd'
+    NETWORK = 'network'
+    UNKNOWN = 'unknown'
+    # Not a local device: requests in flight to a remote server
+    UPLOAD = 'upload'
+
+# Concurrent operations allowed per device. A spinning disk slows down when it has to seek between files.
+DEFAULT_DEVICE_LIMITS : dict[DeviceKinds, int] = {
+    DeviceKinds.HDD: 1,
+    DeviceKinds.SSD: 8,
+    DeviceKinds.NETWORK: 4,
+    DeviceKinds.UNKNOWN: 4,
+    DeviceKinds.UPLOAD: 4,
+}
+
+# A key for one (source, destination) pair of devices. None is used for a destination that isn't a local path.
+type DeviceKey = tuple[int | None, int | None]
+
+class IOScheduler:
+    """
+    Run file operations in a thread pool, limiting how many run at once on each pair of devices.
+
+    Operations are grouped by the st_dev of their source and destination (see FileManager.get_filesystem). Each pair is
+    allowed as many concurrent operations as the slower of its two devices: by default 1 for a spinning disk, 8 for an
+    SSD and 4 for a network filesystem. A device's kind is read from /sys/block/*/queue/rotational, or from its
+    filesystem type for network mounts, so moves between two idle SSDs are not held back by a busy HDD elsewhere.
+
+    Uploads spend most of their time waiting on the server rather than reading the source, so they are only limited by
+    the upload limit (4 by default), and a spinning disk can still keep several requests in flight.
+
+    Operations waiting for their pair do not occupy a worker thread, so they can't starve other pairs.
+    """
+    file_manager : FileManager
+    limits : dict[DeviceKinds, int]
+    max_workers : int
+
+    def __init__(self, file_manager : FileManager, limits : dict[DeviceKinds, int] | None = None, max_workers : int | None = None):
+        self.file_manager = file_manager
+        self.limits = {**DEFAULT_DEVICE_LIMITS, **(limits or {})}
+        # Enough threads for one pair of each kind to run at its limit
+        self.max_workers = max_workers or sum(self.limits.values())
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='io')
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queued : dict[DeviceKey, deque[tuple[Future, Callable, tuple, dict]]] = defaultdict(deque)
+        self._running : dict[DeviceKey, int] = defaultdict(int)
+        self._device_kinds : dict[int, DeviceKinds] = {}
+
+    def __enter__(self) -> IOScheduler:
+        return self
+
+    def __exit__(self, *exc : Any) -> None:
+        self.shutdown()
+
+    def shutdown(self, wait : bool = True) -> None:
+        """
+        Stop the worker threads, optionally waiting for every queued operation to finish first.
+        """
+        if wait:
+            with self._idle:
+                self._idle.wait_for(lambda: not any(self._running.values()) and not any(self._queued.values()))
+        self._executor.shutdown(wait=wait)
+
+    @staticmethod
+    def read_rotational(device : int) -> bool | None:
+        """
+        Check whether a block device is a spinning disk.
+
+        Args:
+            device: The st_dev of a file on the device.
+
+        Returns:
+            True for a spinning disk, False for an SSD, or None if it can't be determined (i.e. not linux, or a
+            virtual device like tmpfs or overlayfs).
+        """
+        base = Path(f'/sys/dev/block/{os.major(device)}:{os.minor(device)}')
+        try:
+            # Partitions don't have a queue of their own, so fall back to the parent disk
+            candidates = [base / 'queue' / 'rotational', base.resolve().parent / 'queue' / 'rotational']
+        except OSError:
+            return None
+
+        for candidate in candidates:
+            try:
+                return candidate.read_text(encoding='utf-8').strip() == '1'
+            except OSError:
+                continue
+        return None
+
+    def get_device_kind(self, path : Path) -> tuple[int, DeviceKinds]:
+        """
+        Find the device a path is on, and what kind of device it is.
+
+        Args:
+            path: A file or directory. It doesn't need to exist, as long as an ancestor does.
+
+        Returns:
+            The st_dev and the kind of device.
+        """
+        device = self.file_manager.get_filesystem(path)
+
+        with self._lock:
+            if device in self._device_kinds:
+                return device, self._device_kinds[device]
+
+        # Imported here to avoid a circular import
+        from scripts.lib.file_manager import NETWORK_FILESYSTEMS
+
+        if self.file_manager.get_filesystem_type(path) in NETWORK_FILESYSTEMS:
+            kind = DeviceKinds.NETWORK
+        else:
+            match self.read_rotational(device):
+                case True:
+                    kind = DeviceKinds.HDD
+                case False:
+                    kind = DeviceKinds.SSD
+                case _:
+                    kind = DeviceKinds.UNKNOWN
+
+        logger.debug('Device %s (%s) is %s', device, path, kind.value)
+        with self._lock:
+            self._device_kinds[device] = kind
+        return device, kind
+
+    def get_key(self, source : Path | None, destination : Path | None) -> tuple[DeviceKey, int]:
+        """
+        Find the device pair for an operation, and how many operations may run on it at once.
+
+        Args:
+            source: The file being read, or None if it isn't a local file.
+            destination: The directory being written to, or None if it isn't a local path (i.e. an upload).
+
+        Returns:
+            The device pair, and its concurrency limit. Uploads are only held to the upload limit.
+        """
+        devices : list[int | None] = []
+        limits : list[int] = []
+        for path in (source, destination):
+            if path is None:
+                devices.append(None)
+                limits.append(self.limits[DeviceKinds.NETWORK])
+                continue
+            try:
+                device, kind = self.get_device_kind(path)
+            except OSError as ose:
+                logger.debug('Unable to find the device for %s: %s', path, ose)
+                device, kind = None, DeviceKinds.UNKNOWN
+            devices.append(device)
+            limits.append(self.limits[kind])
+
+        if destination is None:
+            return (devices[0], None), max(1, self.limits[DeviceKinds.UPLOAD])
+
+        return (devices[0], devices[1]), max(1, min(limits))
+
+    def schedule(self, source : Path | None, destination : Path | None, fn : Callable[..., Any], *args : Any, **kwargs : Any) -> Future:
+        """
+        Queue an operation that reads from source and writes to destination.
+
+        Args:
+            source: The file being read, or None if it isn't a local file.
+            destination: The directory being written to, or None if it isn't a local path (i.e. an upload).
+            fn: The function to call.
+            *args: Positional arguments for fn.
+            **kwargs: Keyword arguments for fn.
+
+        Returns:
+            A future for the result of fn.
+        """
+        key, limit = self.get_key(source, destination)
+        future : Future = Future()
+        with self._lock:
+            self._queued[key].append((future, fn, args, kwargs))
+        self._dispatch(key, limit)
+        return future
+
+    def read(self, source : Path, fn : Callable[..., Any], *args : Any, **kwargs : Any) -> Future:
+        """
+        Queue an operation that only reads from source (i.e. hashing), limited by the source device alone.
+
+        It shares its limit with operations that read and write on that one device.
+        """
+        return self.schedule(source, source, fn, *args, **kwargs)
+
+    def submit(self, fn : Callable[..., Any], *args : Any, **kwargs : Any) -> Future:
+        """
+        Queue an operation without a known source or destination, so it can stand in for a ThreadPoolExecutor.
+
+        The operation is limited as if both ends were an unknown device.
+        """
+        future : Future = Future()
+        key : DeviceKey = (None, None)
+        with self._lock:
+            self._queued[key].append((future, fn, args, kwargs))
+        self._dispatch(key, self.limits[DeviceKinds.UNKNOWN])
+        return future
+
+    def _dispatch(self, key : DeviceKey, limit : int) -> None:
+        """
+        Start queued operations for a device pair until it reaches its limit.
+        """
+        with self._lock:
+            self._start_queued(key, limit)
+
+    def _start_queued(self, key : DeviceKey, limit : int) -> None:
+        # Must be called with self._lock held
+        queued = self._queued[key]
+        while queued and self._running[key] < limit:
+            item = queued.popleft()
+            self._running[key] += 1
+            self._executor.submit(self._run, key, limit, *item)
+
+    def _run(self, key : DeviceKey, limit : int, future : Future, fn : Callable[..., Any], args : tuple, kwargs : dict) -> None:
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                self._running[key] -= 1
+                self._start_queued(key, limit)
+                if not self._running[key] and not self._queued[key]:
+                    self._idle.notify_all()
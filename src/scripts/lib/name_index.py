@@ -0,0 +1,171 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    name_index.py                                                                                        *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Matches the "_i" suffix that collision handling adds to a filename, i.e. IMG_0001_12.jpg
+SUFFIX_PATTERN = re.compile(r'^(?P<base>.+)_(?P<index>\d{1,3})$')
+
+class DirectoryNameIndex:
+    """
+    The names of the files in one directory, read once with os.scandir and kept up to date as files are added.
+
+    Collision handling can check whether a name is taken, list the "_i" variants of a name that already exist, and
+    claim the next free suffix, all without touching the disk. The size of each file is read the first time it's
+    needed, and remembered.
+
+    Claims are atomic, so two threads writing into the same directory never pick the same name.
+    """
+    directory : Path
+
+    def __init__(self, directory : Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._names : set[str] = set()
+        self._sizes : dict[str, int] = {}
+        # (base, ext) -> the suffixes in use, and the next one to try
+        self._suffixes : dict[tuple[str, str], set[int]] = {}
+        self._next_suffix : dict[tuple[str, str], int] = {}
+
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    self._add(entry.name)
+        except FileNotFoundError:
+            # A new directory, which is empty
+            pass
+
+        logger.debug('Indexed %d names in %s', len(self._names), directory)
+
+    def __contains__(self, name : str) -> bool:
+        with self._lock:
+            return name in self._names
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._names)
+
+    def _add(self, name : str, size : int | None = None) -> None:
+        # Must be called with self._lock held (or from __init__)
+        self._names.add(name)
+        if size is not None:
+            self._sizes[name] = size
+
+        stem, ext = os.path.splitext(name)
+        if (match := SUFFIX_PATTERN.match(stem)):
+            key = (match.group('base'), ext)
+            index = int(match.group('index'))
+            self._suffixes.setdefault(key, set()).add(index)
+            if index >= self._next_suffix.get(key, 0):
+                self._next_suffix[key] = index + 1
+
+    def claim(self, name : str, size : int | None = None, *, with_sidecar : bool = False) -> bool:
+        """
+        Record a file that is about to be written, unless the name (or its .xmp sidecar's name) is already taken.
+
+        A sidecar that already exists belongs to another file, so a name is never claimed alongside one.
+
+        Args:
+            name: The filename.
+            size: The size of the file, if known.
+            with_sidecar: Whether the file's .xmp sidecar will be written too, in which case its name is claimed with it.
+
+        Returns:
+            True if the name was free and is now taken, False if it was already taken.
+        """
+        sidecar = f'{os.path.splitext(name)[0]}.xmp'
+        with self._lock:
+            if name in self._names or sidecar in self._names:
+                return False
+            self._add(name, size)
+            if with_sidecar:
+                self._add(sidecar)
+            return True
+
+    def discard(self, name : str) -> None:
+        """
+        Forget a file that was removed, or a claim that was never written.
+        """
+        with self._lock:
+            self._names.discard(name)
+            self._sizes.pop(name, None)
+
+    def variants(self, base : str, ext : str) -> list[str]:
+        """
+        List the existing "{base}_{i}{ext}" names, in order of i.
+        """
+        with self._lock:
+            indexes = sorted(self._suffixes.get((base, ext), ()))
+            return [name for i in indexes if (name := f'{base}_{i}{ext}') in self._names]
+
+    def claim_next(self, base : str, ext : str, *, size : int | None = None, max_suffix : int = 1000, with_sidecar : bool = False) -> str | None:
+        """
+        Claim "{base}_{i}{ext}" for the lowest i above every suffix already in use.
+
+        Names whose .xmp sidecar already exists are skipped, so a sidecar is never paired with the wrong file.
+
+        Args:
+            base: The filename without its extension.
+            ext: The extension, including the dot.
+            size: The size of the file, if known.
+            max_suffix: The highest suffix allowed.
+            with_sidecar: Whether the file's .xmp sidecar will be written too, in which case its name is claimed with it.
+
+        Returns:
+            The claimed name, or None if every suffix up to max_suffix is taken.
+        """
+        key = (base, ext)
+        with self._lock:
+            for i in range(self._next_suffix.get(key, 0), max_suffix):
+                name = f'{base}_{i}{ext}'
+                if name in self._names or (sidecar := f'{base}_{i}.xmp') in self._names:
+                    continue
+                self._add(name, size)
+                if with_sidecar:
+                    self._add(sidecar)
+                return name
+        return None
+
+    def size(self, name : str) -> int:
+        """
+        Get the size of a file in the directory, reading it from disk only the first time.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist.
+        """
+        with self._lock:
+            if name in self._sizes:
+                return self._sizes[name]
+
+        size = os.stat(self.directory / name).st_size
+        with self._lock:
+            self._sizes[name] = size
+        return size
@@ -23,7 +23,8 @@
 *                                                                                                                      *
 *********************************************************************************************************************"""
 from __future__ import annotations
-from typing import Any
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, Iterator
 from abc import ABC
 import os
 import subprocess
@@ -32,12 +33,14 @@ import logging
 from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 from alive_progress import alive_it, alive_bar
 from scripts.lib.types import ProgressBar
+from scripts.lib.task_stream import StreamProgress, stream_tasks
 
 logger = logging.getLogger(__name__)
 
 class Script(BaseModel, ABC):
 
     max_threads : int = 0
+    task_timeout : float | None = None
     _progress_bar : ProgressBar | None = PrivateAttr(default=None)
     _progress_message : str | None = PrivateAttr(default=None)
 
@@ -61,6 +64,33 @@ class Script(BaseModel, ABC):
 
         return value
 
+    def stream_tasks[T](
+        self,
+        items : Iterable[T],
+        submit : Callable[[T], Future],
+        *,
+        max_pending : int | None = None,
+        on_progress : Callable[[StreamProgress], None] | None = None,
+    ) -> Iterator[tuple[T, Future]]:
+        """
+        Run a task for every item, yielding each (item, future) as soon as it finishes.
+
+        See scripts.lib.task_stream.stream_tasks. Tasks are given up on after task_timeout seconds, if it is set.
+
+        Args:
+            items: The items to process.
+            submit: Starts the task for an item, i.e. executor.submit or IOScheduler.schedule.
+            max_pending: The most unfinished tasks at once. Defaults to twice max_threads.
+            on_progress: Called with the aggregate counts after every task finishes.
+        """
+        return stream_tasks(
+            items,
+            submit,
+            max_pending=max_pending or self.max_threads * 2,
+            timeout=self.task_timeout,
+            on_progress=on_progress,
+        )
+
     @classmethod
     def subprocess(cls, command : list[str] | str, **kwargs : Any) -> subprocess.CompletedProcess:
         # default check=True
@@ -0,0 +1,143 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    task_stream.py                                                                                       *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+import logging
+import time
+from typing import Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# How often running tasks are checked against their timeout, in seconds
+TIMEOUT_POLL_INTERVAL = 1.0
+
+@dataclass
+class StreamProgress:
+    """
+    Aggregate counts for a stream of tasks, passed to progress callbacks after every task finishes.
+    """
+    submitted : int = 0
+    completed : int = 0
+    failed : int = 0
+    timed_out : int = 0
+
+    @property
+    def finished(self) -> int:
+        return self.completed + self.failed + self.timed_out
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.finished
+
+def stream_tasks[T](
+    items : Iterable[T],
+    submit : Callable[[T], Future],
+    *,
+    max_pending : int,
+    timeout : float | None = None,
+    on_progress : Callable[[StreamProgress], None] | None = None,
+) -> Iterator[tuple[T, Future]]:
+    """
+    Run a task for every item, yielding each one as soon as it finishes.
+
+    Items are only pulled from the iterable as tasks finish, so no more than max_pending tasks exist at once, and a
+    lazy iterable (i.e. a directory walk) is never read far ahead of the workers. Results are yielded in the order
+    tasks finish, so a slow task never holds up the ones submitted after it.
+
+    If the caller stops iterating, or an exception (i.e. KeyboardInterrupt) interrupts the stream, every task that
+    hasn't started yet is cancelled.
+
+    Args:
+        items: The items to process.
+        submit: Starts the task for an item, i.e. executor.submit or IOScheduler.schedule.
+        max_pending: The most tasks that may be submitted but unfinished at once.
+        timeout: Seconds a task may run before it is given up on. Its future is replaced with one that raises
+            TimeoutError. A thread can't be stopped, so the task itself may still finish in the background.
+        on_progress: Called with the aggregate counts after every task finishes.
+
+    Yields:
+        (item, future) for every item. future.result() raises whatever the task raised.
+    """
+    if max_pending < 1:
+        raise ValueError("max_pending must be a positive integer.")
+
+    progress = StreamProgress()
+    pending : dict[Future, T] = {}
+    started : dict[Future, float] = {}
+    iterator = iter(items)
+    exhausted = False
+
+    try:
+        while True:
+            # Backpressure: only pull more items once there is room for them
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[submit(item)] = item
+                progress.submitted += 1
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, timeout=min(timeout, TIMEOUT_POLL_INTERVAL) if timeout is not None else None, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                item = pending.pop(future)
+                started.pop(future, None)
+                if future.cancelled() or future.exception() is not None:
+                    progress.failed += 1
+                else:
+                    progress.completed += 1
+                if on_progress:
+                    on_progress(progress)
+                yield item, future
+
+            if timeout is None:
+                continue
+
+            now = time.monotonic()
+            for future, item in list(pending.items()):
+                if not future.running():
+                    continue
+                if now - started.setdefault(future, now) < timeout:
+                    continue
+
+                logger.warning('Task for %s is still running after %ss. Moving on without it.', item, timeout)
+                del pending[future]
+                del started[future]
+                progress.timed_out += 1
+                expired : Future = Future()
+                expired.set_exception(TimeoutError(f'Task for {item} did not finish within {timeout}s'))
+                if on_progress:
+                    on_progress(progress)
+                yield item, expired
+    finally:
+        if pending:
+            cancelled = sum(future.cancel() for future in pending)
+            logger.debug('Stream stopped with %d tasks pending. Cancelled %d that had not started.', len(pending), cancelled)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import datetime
+from pathlib import Path
+import struct
+
+from scripts.lib.capture_date import read_capture_date, MP4_EPOCH
+
+
+def _tiff(date: bytes, endian: str = "<") -> bytes:
+    """
+    A TIFF structure with an Exif IFD holding only DateTimeOriginal.
+    """
+    order = b"II" if endian == "<" else b"MM"
+    header = order + struct.pack(f"{endian}HI", 42, 8)
+    ifd0 = struct.pack(f"{endian}HHHII", 1, 0x8769, 4, 1, 26) + struct.pack(f"{endian}I", 0)
+    exif = struct.pack(f"{endian}HHHII", 1, 0x9003, 2, 20, 44) + struct.pack(f"{endian}I", 0)
+    return header + ifd0 + exif + date + b"\x00"
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", len(payload) + 8) + box_type + payload
+
+
+def test_reads_jpeg_exif(tmp_path: Path) -> None:
+    exif = b"Exif\x00\x00" + _tiff(b"2023:07:14 18:30:05", ">")
+    jfif = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"\xff\xd8" + jfif + app1 + b"\xff\xda" + b"\x00" * 100)
+
+    assert read_capture_date(photo) == datetime.datetime(2023, 7, 14, 18, 30, 5)
+
+
+def test_reads_raw_and_heic(tmp_path: Path) -> None:
+    raw = tmp_path / "photo.arw"
+    raw.write_bytes(_tiff(b"2022:01:02 03:04:05") + b"\x00" * 1000)
+    assert read_capture_date(raw) == datetime.datetime(2022, 1, 2, 3, 4, 5)
+
+    heic = tmp_path / "photo.heic"
+    heic.write_bytes(_box(b"ftyp", b"heic\x00\x00\x00\x00mif1") + _box(b"meta", b"\x00" * 50) + _box(b"mdat", b"\x00\x00\x00\x06Exif\x00\x00" + _tiff(b"2021:12:31 23:59:59")))
+    assert read_capture_date(heic) == datetime.datetime(2021, 12, 31, 23, 59, 59)
+
+
+def test_reads_mp4_creation_time_after_mdat(tmp_path: Path) -> None:
+    created = datetime.datetime(2024, 5, 6, 7, 8, 9, tzinfo=datetime.timezone.utc)
+    seconds = int((created - MP4_EPOCH).total_seconds())
+    mvhd = _box(b"mvhd", b"\x00\x00\x00\x00" + struct.pack(">II", seconds, seconds) + b"\x00" * 88)
+    video = tmp_path / "video.mp4"
+    video.write_bytes(_box(b"ftyp", b"isom\x00\x00\x02\x00isom") + _box(b"mdat", b"\x00" * 200_000) + _box(b"moov", mvhd))
+
+    assert read_capture_date(video) == datetime.datetime.fromtimestamp(created.timestamp())
+
+
+def test_missing_or_blank_dates(tmp_path: Path) -> None:
+    blank = tmp_path / "blank.dng"
+    blank.write_bytes(_tiff(b"0000:00:00 00:00:00"))
+    truncated = tmp_path / "truncated.jpg"
+    truncated.write_bytes(b"\xff\xd8\xff\xe1\x01\x00Exif\x00\x00MM\x00*\x00\x00\x10\x00")
+    text = tmp_path / "notes.txt"
+    text.write_text("hello")
+
+    assert read_capture_date(blank) is None
+    assert read_capture_date(truncated) is None
+    assert read_capture_date(text) is None
+    assert read_capture_date(tmp_path / "missing.jpg") is None
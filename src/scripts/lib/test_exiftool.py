@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import shutil
+import pytest
+
+from scripts.lib.exiftool import ExifToolResult, ExifToolService
+
+# Smallest JPEG exiftool will write to: SOI, an empty scan, EOI
+MINIMAL_JPEG = bytes.fromhex("ffd8ffda0002ffd9")
+
+
+def test_result_ok_ignores_warnings() -> None:
+    assert ExifToolResult("", "Warning: [minor] Bad MakerNotes\n").ok
+    assert not ExifToolResult("", "Error: File not found - missing.jpg\n").ok
+
+
+@pytest.mark.skipif(shutil.which("exiftool") is None, reason="exiftool is not installed")
+def test_service_writes_and_reads_in_one_process(tmp_path: Path) -> None:
+    photos = [tmp_path / f"IMG_000{i}.jpg" for i in range(3)]
+    for photo in photos:
+        photo.write_bytes(MINIMAL_JPEG)
+
+    with ExifToolService() as exiftool:
+        assert exiftool.write_tags(photos[0], {"DateTimeOriginal": "2024:01:02 03:04:05"}).ok
+        pid = exiftool._processes[0]._process.pid
+        for photo in photos[1:]:
+            assert exiftool.write_tags(photo, {"DateTimeOriginal": "2024:01:02 03:04:05"}).ok
+
+        rows = exiftool.read_tags(photos + [tmp_path / "missing.jpg"], ["DateTimeOriginal"])
+
+        assert set(rows) == set(photos)
+        assert all(row["DateTimeOriginal"] == "2024:01:02 03:04:05" for row in rows.values())
+        # Every request was served by the same exiftool process
+        assert exiftool._processes[0]._process.pid == pid
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
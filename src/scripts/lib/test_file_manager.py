@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+import pytest
+
+from scripts.lib.db.hashes import HashIndex
+from scripts.lib.file_manager import FileManager, ReadStrategies
+
+
+def test_hash_index_survives_new_instance(tmp_path: Path, write_file) -> None:
+    index_path = tmp_path / "hashes.db"
+    photo = tmp_path / "IMG_0001.jpg"
+    write_file(photo, b"original")
+
+    first = FileManager(directory=tmp_path, hash_index_path=index_path)
+    expected = first.hash_file(photo)
+
+    # A fresh instance has an empty memory cache, so the hash must come from the index
+    second = FileManager(directory=tmp_path, hash_index_path=index_path)
+    stat = photo.stat()
+    assert second.hash_index.get(photo, stat, False, 'xxhash') == expected
+    assert second.hash_file(photo) == expected
+
+
+def test_hash_index_invalidated_on_change(tmp_path: Path, write_file) -> None:
+    index_path = tmp_path / "hashes.db"
+    photo = tmp_path / "IMG_0001.jpg"
+    write_file(photo, b"original")
+
+    fm = FileManager(directory=tmp_path, hash_index_path=index_path)
+    before = fm.hash_file(photo)
+
+    write_file(photo, b"modified content")
+    os.utime(photo, ns=(photo.stat().st_atime_ns, photo.stat().st_mtime_ns + 1_000_000))
+
+    assert HashIndex(index_path).get(photo, photo.stat(), False, 'xxhash') is None
+    assert fm.hash_file(photo) != before
+
+
+def test_hash_index_follows_rename(tmp_path: Path, write_file) -> None:
+    index_path = tmp_path / "hashes.db"
+    source = tmp_path / "a" / "IMG_0001.jpg"
+    destination = tmp_path / "b" / "IMG_0001.jpg"
+    write_file(source, b"content")
+    destination.parent.mkdir()
+
+    fm = FileManager(directory=tmp_path, hash_index_path=index_path)
+    expected = fm.hash_file(source)
+    fm.move_file(source, destination)
+
+    assert fm.hash_index.get(destination, destination.stat(), False, 'xxhash') == expected
+
+
+@pytest.mark.parametrize("size", [0, 10, 3 * 1024 * 1024 + 7])
+def test_read_strategies_agree(tmp_path: Path, size: int, write_file) -> None:
+    photo = tmp_path / "IMG_0001.CR2"
+    write_file(photo, os.urandom(size))
+
+    digests = set()
+    for strategy in ReadStrategies:
+        fm = FileManager(directory=tmp_path, read_strategy=strategy, read_chunk_size=1024 * 1024)
+        digests.add(fm.hash_file(photo, use_cache=False))
+
+    assert len(digests) == 1
+
+
+def test_native_copy_hashes_source_once(tmp_path: Path, write_file) -> None:
+    source = tmp_path / "a" / "IMG_0001.jpg"
+    destination = tmp_path / "b" / "IMG_0001.jpg"
+    write_file(source, os.urandom(2 * 1024 * 1024 + 3))
+    destination.parent.mkdir()
+
+    fm = FileManager(directory=tmp_path, preferred_copy_tool="native", read_chunk_size=1024 * 1024)
+    fm.copy_file(source, destination)
+
+    assert destination.read_bytes() == source.read_bytes()
+    assert destination.stat().st_mtime_ns == source.stat().st_mtime_ns
+    # The streamed hash of the source is cached, so asking again does not reread it
+    assert fm.hash_file(source) == fm.hash_file(destination, use_cache=False)
+
+
+def test_native_copy_refuses_existing_destination(tmp_path: Path, write_file) -> None:
+    source = tmp_path / "IMG_0001.jpg"
+    destination = tmp_path / "IMG_0002.jpg"
+    write_file(source, b"new")
+    write_file(destination, b"old")
+
+    fm = FileManager(directory=tmp_path, preferred_copy_tool="native")
+    with pytest.raises(FileExistsError):
+        fm._copy_with_native(source, destination)
+    assert destination.read_bytes() == b"old"
+
+
+def test_rsync_batch_requires_one_directory(tmp_path: Path) -> None:
+    fm = FileManager(directory=tmp_path)
+    pairs = [
+        (tmp_path / "IMG_0001.jpg", tmp_path / "a" / "IMG_0001.jpg"),
+        (tmp_path / "IMG_0002.jpg", tmp_path / "b" / "IMG_0002.jpg"),
+    ]
+    with pytest.raises(ValueError):
+        fm.transfer_batch_with_rsync(pairs)
+
+
+@pytest.mark.skipif(shutil.which("rsync") is None, reason="rsync is not installed")
+def test_rsync_batch_moves_and_verifies(tmp_path: Path, write_file) -> None:
+    sources = [tmp_path / "src" / "one" / "IMG_0001.jpg", tmp_path / "src" / "two" / "IMG_0002.jpg"]
+    for i, source in enumerate(sources):
+        write_file(source, f"photo {i}".encode())
+    destination_dir = tmp_path / "dst"
+    destination_dir.mkdir()
+    expected = {source.name: source.read_bytes() for source in sources}
+
+    fm = FileManager(directory=tmp_path, trash_directory=tmp_path / ".trash")
+    failed = fm.transfer_batch_with_rsync([(source, destination_dir / source.name) for source in sources], move=True)
+
+    assert failed == []
+    assert {path.name: path.read_bytes() for path in destination_dir.iterdir()} == expected
+    assert not any(source.exists() for source in sources)
+
+
+def test_scan_files_matches_all_patterns_in_one_pass(tmp_path: Path, write_file) -> None:
+    for name in ["a/IMG_1.JPG", "a/b/IMG_2.arw", "a/notes.txt", ".hidden/IMG_3.jpg", ".trash/0001/IMG_4.jpg", "IMG_5.jpg"]:
+        write_file(tmp_path / name, b"x")
+
+    fm = FileManager(directory=tmp_path, extensions=['jpg', 'arw'])
+    entries = list(fm.scan_files())
+
+    assert sorted(Path(entry.path).relative_to(tmp_path).as_posix() for entry in entries) == ["IMG_5.jpg", "a/IMG_1.JPG", "a/b/IMG_2.arw"]
+    assert all(entry.stat().st_size == 1 for entry in entries)
+    assert sorted(fm.yield_files(recursive=False)) == [tmp_path / "IMG_5.jpg"]
+
+
+def test_directory_and_device_caches(tmp_path: Path, monkeypatch, write_file) -> None:
+    fm = FileManager(directory=tmp_path)
+    month = tmp_path / "2024" / "2024-01-01"
+    photo = tmp_path / "IMG_0001.jpg"
+    write_file(photo, b"x")
+
+    fm.mkdir(month)
+    assert fm.directory_exists(month)
+    assert fm.directory_exists(tmp_path / "2024")
+    device = fm.get_filesystem(photo)
+    assert fm.get_filesystem(month) == device
+
+    # Cached lookups don't touch the disk
+    def fail(*args, **kwargs):
+        raise AssertionError("stat should not be called")
+
+    monkeypatch.setattr(Path, "stat", fail)
+    monkeypatch.setattr(Path, "is_dir", fail)
+    assert fm.mkdir(month) == month
+    assert fm.get_filesystem(tmp_path / "another.jpg") == device
+    assert fm.is_same_filesystem(photo, month)
+    monkeypatch.undo()
+
+    # Removed directories are forgotten
+    assert fm.delete_directory_if_empty(tmp_path / "2024")
+    assert not fm.directory_exists(month)
+
+
+def test_directory_caches_cleared_when_mounts_change(tmp_path: Path, monkeypatch) -> None:
+    fm = FileManager(directory=tmp_path)
+    fm.remember_directory(tmp_path / "gone")
+    assert fm.directory_exists(tmp_path / "gone")
+
+    # Pretend the mount table changed, and the check interval has passed
+    fm._mountinfo = "stale"
+    fm._mounts_checked_at = 0.0
+    assert not fm.directory_exists(tmp_path / "gone")
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_delete_empty_directories_bottom_up(tmp_path: Path, parallel: bool) -> None:
+    (tmp_path / "a" / "b" / "c").mkdir(parents=True)
+    (tmp_path / "a" / "b" / ".DS_Store").write_bytes(b"")
+    (tmp_path / "keep" / "empty").mkdir(parents=True)
+    (tmp_path / "keep" / "photo.jpg").write_bytes(b"data")
+    (tmp_path / "link").mkdir()
+    (tmp_path / "link" / "target").symlink_to(tmp_path / "keep")
+
+    fm = FileManager(directory=tmp_path, max_threads=4)
+    deleted, remaining = fm.delete_empty_tree(tmp_path / "a")
+    assert deleted and remaining == 0
+    assert not (tmp_path / "a").exists()
+    assert fm.directories_deleted == 3
+
+    fm.delete_empty_directories(parallel=parallel)
+    assert (tmp_path / "keep" / "photo.jpg").exists()
+    assert not (tmp_path / "keep" / "empty").exists()
+    assert (tmp_path / "link" / "target").is_symlink()
+    assert fm.directories_deleted == 4
+
+
+def test_copy_clones_within_a_filesystem(tmp_path: Path, monkeypatch) -> None:
+    import scripts.lib.file_manager as file_manager
+
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(b"photo" * 1000)
+    fm = FileManager(directory=tmp_path)
+
+    cloned: list[int] = []
+
+    def fake_clone(fd, request, source_fd):
+        assert request == file_manager.FICLONE
+        cloned.append(fd)
+        os.write(fd, os.pread(source_fd, 1 << 20, 0))
+
+    monkeypatch.setattr(file_manager.fcntl, "ioctl", fake_clone)
+    monkeypatch.setattr(FileManager, "hash_file", lambda *args, **kwargs: pytest.fail("clones are not re-read"))
+    assert fm.copy_file(source, tmp_path / "copy.jpg").read_bytes() == source.read_bytes()
+    assert len(cloned) == 1
+
+
+def test_copy_falls_back_when_reflink_is_unsupported(tmp_path: Path, monkeypatch) -> None:
+    import errno
+    import scripts.lib.file_manager as file_manager
+
+    def unsupported(*args):
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    monkeypatch.setattr(file_manager.fcntl, "ioctl", unsupported)
+    monkeypatch.setattr(file_manager.os, "copy_file_range", unsupported)
+
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(b"photo" * 1000)
+    fm = FileManager(directory=tmp_path, preferred_copy_tool="reflink")
+    assert fm.copy_tool == "shutil" or fm.copy_tool == "rsync"
+
+    assert fm.copy_file(source, tmp_path / "first.jpg").read_bytes() == source.read_bytes()
+    assert not fm.should_try_reflink(source, tmp_path / "second.jpg")
+    assert fm.copy_file(source, tmp_path / "second.jpg").read_bytes() == source.read_bytes()
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+import pytest
+
+from scripts.lib.file_manager import FileManager
+from scripts.lib.io_scheduler import DeviceKinds, IOScheduler
+
+
+class ConcurrencyTracker:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def work(self, value: int) -> int:
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return value * 2
+
+
+@pytest.mark.parametrize("limit", [1, 3])
+def test_limits_concurrency_per_device_pair(tmp_path: Path, limit: int) -> None:
+    fm = FileManager(directory=tmp_path)
+    tracker = ConcurrencyTracker()
+
+    with IOScheduler(fm, limits={kind: limit for kind in DeviceKinds}, max_workers=8) as scheduler:
+        futures = [scheduler.schedule(tmp_path, tmp_path, tracker.work, i) for i in range(12)]
+        assert [future.result() for future in futures] == [i * 2 for i in range(12)]
+
+    assert tracker.peak == limit
+
+
+def test_waiting_pair_does_not_block_others(tmp_path: Path) -> None:
+    fm = FileManager(directory=tmp_path)
+    release = threading.Event()
+
+    with IOScheduler(fm, limits={kind: 1 for kind in DeviceKinds}, max_workers=2) as scheduler:
+        # Occupy the local pair, and queue more work behind it
+        blocked = [scheduler.schedule(tmp_path, tmp_path, release.wait, 5) for _ in range(3)]
+        # A different pair still gets the second worker
+        assert scheduler.submit(lambda: "done").result(timeout=5) == "done"
+        release.set()
+        assert all(future.result() for future in blocked)
+
+
+def test_uploads_from_a_hdd_use_the_upload_limit(tmp_path: Path, monkeypatch) -> None:
+    fm = FileManager(directory=tmp_path)
+    scheduler = IOScheduler(fm, limits={DeviceKinds.HDD: 1, DeviceKinds.UPLOAD: 3}, max_workers=8)
+    monkeypatch.setattr(scheduler, "get_device_kind", lambda path: (1, DeviceKinds.HDD))
+
+    with scheduler:
+        uploads = ConcurrencyTracker()
+        futures = [scheduler.schedule(tmp_path, None, uploads.work, i) for i in range(12)]
+        assert [future.result() for future in futures] == [i * 2 for i in range(12)]
+
+        # Reads, like hashing before an upload, are still held to the disk's limit
+        reads = ConcurrencyTracker()
+        futures = [scheduler.read(tmp_path, reads.work, i) for i in range(6)]
+        assert [future.result() for future in futures] == [i * 2 for i in range(6)]
+
+    assert uploads.peak == 3
+    assert reads.peak == 1
+
+
+def test_errors_are_returned_through_the_future(tmp_path: Path) -> None:
+    def fail() -> None:
+        raise ValueError("boom")
+
+    with FileManager(directory=tmp_path).create_io_scheduler() as scheduler:
+        future = scheduler.schedule(tmp_path, None, fail)
+        with pytest.raises(ValueError):
+            future.result()
+
+
+def test_device_limits_from_command_line(tmp_path: Path) -> None:
+    fm = FileManager(directory=tmp_path, device_limits=["hdd=2", "SSD=16"], max_threads=3)
+    assert fm.device_limits == {DeviceKinds.HDD: 2, DeviceKinds.SSD: 16}
+
+    scheduler = fm.create_io_scheduler()
+    assert scheduler.limits[DeviceKinds.UNKNOWN] == 3
+    assert scheduler.limits[DeviceKinds.NETWORK] == 4
+    scheduler.shutdown()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from scripts.lib.name_index import DirectoryNameIndex
+
+
+def test_claims_next_suffix_after_highest(tmp_path: Path) -> None:
+    for name in ["IMG_0001.jpg", "IMG_0001_0.jpg", "IMG_0001_7.jpg", "IMG_0001_8.xmp", "IMG_0002_3.jpg"]:
+        (tmp_path / name).write_bytes(b"x")
+
+    names = DirectoryNameIndex(tmp_path)
+
+    assert "IMG_0001.jpg" in names
+    assert names.variants("IMG_0001", ".jpg") == ["IMG_0001_0.jpg", "IMG_0001_7.jpg"]
+    # _8 is skipped because its sidecar already exists
+    assert names.claim_next("IMG_0001", ".jpg") == "IMG_0001_9.jpg"
+    assert names.claim_next("IMG_0001", ".jpg") == "IMG_0001_10.jpg"
+    assert names.claim_next("IMG_0003", ".jpg") == "IMG_0003_0.jpg"
+    assert names.claim_next("IMG_0001", ".jpg", max_suffix=11) is None
+
+
+def test_claim_is_exclusive_and_discard_releases(tmp_path: Path) -> None:
+    names = DirectoryNameIndex(tmp_path / "missing")
+
+    assert len(names) == 0
+    assert names.claim("IMG_0001.jpg", 10)
+    assert not names.claim("IMG_0001.jpg", 10)
+    assert names.size("IMG_0001.jpg") == 10
+
+    names.discard("IMG_0001.jpg")
+    assert names.claim("IMG_0001.jpg")
+
+
+def test_claims_reserve_sidecars(tmp_path: Path) -> None:
+    names = DirectoryNameIndex(tmp_path)
+
+    assert names.claim("IMG_0001.ARW", with_sidecar=True)
+    assert "IMG_0001.xmp" in names
+    # Another file with the same stem would be paired with the ARW's sidecar
+    assert not names.claim("IMG_0001.JPG")
+    assert names.claim_next("IMG_0001", ".JPG", with_sidecar=True) == "IMG_0001_0.JPG"
+    assert "IMG_0001_0.xmp" in names
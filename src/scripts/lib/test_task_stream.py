@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import threading
+import time
+
+import pytest
+
+from scripts.lib.task_stream import StreamProgress, stream_tasks
+
+
+def test_results_stream_in_completion_order_with_backpressure() -> None:
+    release_slow = threading.Event()
+    pulled: list[int] = []
+
+    def items():
+        for i in range(6):
+            pulled.append(i)
+            yield i
+
+    def work(i: int) -> int:
+        if i == 0:
+            release_slow.wait(5)
+        return i * 10
+
+    counts: list[StreamProgress] = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        finished = []
+        for item, future in stream_tasks(items(), partial(executor.submit, work), max_pending=2, on_progress=counts.append):
+            finished.append((item, future.result()))
+            # Never more than max_pending items are in flight
+            assert len(pulled) - len(finished) <= 2
+            if len(finished) == 5:
+                release_slow.set()
+
+    # The slow first item didn't hold up the rest
+    assert finished == [(1, 10), (2, 20), (3, 30), (4, 40), (5, 50), (0, 0)]
+    assert counts[-1].completed == 6 and counts[-1].pending == 0
+
+
+def test_timeout_and_cancellation() -> None:
+    release = threading.Event()
+
+    def work(i: int) -> int:
+        if i == 0:
+            release.wait(5)
+        return i
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        tasks = stream_tasks(range(1), partial(executor.submit, work), max_pending=1, timeout=0.05)
+        item, future = next(tasks)
+        assert item == 0
+        with pytest.raises(TimeoutError):
+            future.result()
+        release.set()
+
+    started: list[int] = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        def slow(i: int) -> int:
+            started.append(i)
+            time.sleep(0.05)
+            return i
+
+        tasks = stream_tasks(range(100), partial(executor.submit, slow), max_pending=4)
+        next(tasks)
+        # Stopping early cancels the tasks that haven't started
+        tasks.close()
+
+    assert len(started) < 4
@@ -59,13 +59,16 @@
 *                                                                                                                      *
 *********************************************************************************************************************"""
 from __future__ import annotations
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from concurrent.futures import Future
 import datetime
+import fnmatch
 from ftplib import FTP
 import re
 import subprocess
 import sys
 import os
+import threading
 import time
 
 # Add the root directory of the project to sys.path
@@ -74,8 +77,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 from pathlib import Path
 import logging
 import argparse
-from typing import Any, Literal, Optional, Protocol
+from typing import Any, Iterable, Iterator, Literal, Optional, Protocol
 from alive_progress import alive_it, alive_bar
+from cachetools import LRUCache
 from pydantic import Field, PrivateAttr, field_validator
 from dotenv import load_dotenv
 from scripts.lib.types import ProgressBar, RESET, RED, GREEN, YELLOW, BLUE, BLUE2, PURPLE, CYAN
@@ -83,7 +87,13 @@ from scripts import setup_logging
 from scripts.exceptions import ShouldTerminateError
 from scripts.lib.file_manager import StrPattern
 from scripts.monthly.exceptions import OneFileException, DuplicationHandledException
-from scripts.lib.file_manager import FileManager
+from scripts.lib.file_manager import FileManager, CopyTools
+from scripts.lib.io_scheduler import IOScheduler, DeviceKinds
+from scripts.lib.name_index import DirectoryNameIndex
+from scripts.lib.capture_date import read_capture_date
+from scripts.lib.db.hashes import DEFAULT_HASH_INDEX_PATH
+from scripts.lib.db.imports import ImportManifest, DEFAULT_IMPORT_MANIFEST_PATH
+from scripts.lib.db.plans import OrganizePlan, PlanEntry, PlanActions, PlanStatus, PAGE_SIZE as PLAN_PAGE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -108,8 +118,14 @@ class FileOrganizer(FileManager):
     target_directory : Path | None = None
     copy_mode : bool = False
     keep_duplicates : bool = False
+    rsync_batch_size : int = 0
+    import_manifest_path : Path | None = None
+    plan_path : Path | None = None
 
     _progress_bar : ProgressBar | None = PrivateAttr(default=None)
+    _name_indexes : LRUCache = PrivateAttr(default_factory=lambda: LRUCache(maxsize=256))
+    _name_index_lock : threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _import_manifest : ImportManifest | None = PrivateAttr(default=None)
 
     @field_validator('target_directory', mode='before')
     def validate_target_directory(cls, value: Any) -> Path | None:
@@ -123,6 +139,26 @@ class FileOrganizer(FileManager):
             
         return dir_path
 
+    @field_validator('import_manifest_path', 'plan_path', mode='before')
+    def validate_optional_path(cls, value: Any) -> Path | None:
+        # None or empty disables the manifest
+        if not value:
+            return None
+        return Path(value)
+
+    @property
+    def import_manifest(self) -> ImportManifest | None:
+        """
+        The manifest of files already imported, which is only used in copy mode.
+        """
+        if not self.copy_mode or not self.import_manifest_path:
+            return None
+
+        with self._cache_lock:
+            if not self._import_manifest:
+                self._import_manifest = ImportManifest(self.import_manifest_path)
+        return self._import_manifest
+
     @property
     def progress_bar(self) -> ProgressBar:
         if not self._progress_bar:
@@ -151,12 +187,98 @@ class FileOrganizer(FileManager):
             return self.directory
         return self.target_directory
 
-    def hash_file(self, filename: str | Path, partial : bool = False, hashing_algorithm : str = 'xxhash') -> str:
+    def get_name_index(self, directory : Path) -> DirectoryNameIndex:
+        """
+        Get the index of filenames in a destination directory, reading the directory the first time it's used.
+
+        Args:
+            directory: The destination directory.
+
+        Returns:
+            The name index, shared by every thread writing into the directory.
+        """
+        key = str(directory.absolute())
+        with self._name_index_lock:
+            if (index := self._name_indexes.get(key)) is None:
+                index = self._name_indexes[key] = DirectoryNameIndex(Path(key))
+        return index
+
+    def moves_sidecar(self, source_path : Path) -> bool:
+        """
+        Check whether moving a file will bring an .xmp sidecar along with it, so its name must be claimed too.
+        """
+        if self.copy_mode or source_path.suffix.lower() == '.xmp':
+            return False
+        return source_path.with_suffix('.xmp').exists(follow_symlinks=False)
+
+    def release_name(self, source_path : Path, destination_path : Path) -> None:
+        """
+        Release a name (and its sidecar's name) that was claimed for a file that was never written.
+        """
+        names = self.get_name_index(destination_path.parent)
+        names.discard(destination_path.name)
+        if self.moves_sidecar(source_path):
+            names.discard(destination_path.with_suffix('.xmp').name)
+
+    def is_already_imported(self, file_path : Path) -> bool:
+        """
+        Check the import manifest for a source file that was copied before, and hasn't changed since.
+
+        This only stats the source, so known files are skipped without touching the destination. Records are kept
+        per target directory, so importing into another target copies the file again.
+
+        Args:
+            file_path: The source file.
+
+        Returns:
+            True if the file was already imported, and should be skipped.
+        """
+        if not (manifest := self.import_manifest):
+            return False
+
+        source_path = file_path.absolute()
+        try:
+            record = manifest.get(source_path, source_path.stat(), self.get_target_directory().absolute())
+        except FileNotFoundError:
+            return False
+
+        if not record:
+            return False
+
+        self.record_skip_file()
+        logger.debug('Skipping file %s, which was already imported to %s', source_path, record[0])
+        return True
+
+    def record_import(self, file_path : Path, destination_path : Path) -> None:
+        """
+        Record a source file in the import manifest, once a copy of it exists at the destination.
+
+        Args:
+            file_path: The source file.
+            destination_path: The copy of the source file.
+        """
+        if self.dry_run or not (manifest := self.import_manifest):
+            return
+
+        source_path = file_path.absolute()
+        try:
+            # The hash was already calculated (and cached) when the copy was verified
+            file_hash = None if self.skip_hash else self.hash_file(source_path)
+            manifest.record(
+                source_path, source_path.stat(), destination_path.absolute(), self.get_target_directory().absolute(),
+                file_hash
+            )
+        except (OSError, OneFileException) as e:
+            # The file will simply be checked again on the next run
+            logger.warning('Unable to record import of %s: %s', source_path, e)
+
+    def hash_file(self, filename: str | Path, partial : bool = False, hashing_algorithm : str = 'xxhash', *, use_cache : bool = True) -> str:
         """
         Calculate the MD5 hash of a file.
 
         Args:
             filename: The path to the file to hash.
+            use_cache: If False, always read the file instead of using a cached hash.
 
         Returns:
             The MD5 hash of the file.
@@ -165,7 +287,7 @@ class FileOrganizer(FileManager):
             OneFileException: If an error occurs while reading the file.
         """
         try:
-            return super().hash_file(filename, partial, hashing_algorithm)
+            return super().hash_file(filename, partial, hashing_algorithm, use_cache=use_cache)
         except PermissionError:
             raise
         except IOError as e:
@@ -276,19 +398,20 @@ class FileOrganizer(FileManager):
         with alive_bar(title=f"{BLUE2}Organize{RESET} {self._shortpath(self.directory.absolute())}", unit='files', dual_line=True, unknown='waves') as self._progress_bar:
             self.progress_message('Searching...')
 
-            with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-                futures = []
-                for filepath in self.yield_files():
-                    submit_result = executor.submit(self.process_file_threadsafe, filepath)
-                    futures.append(submit_result)
-                    
-                    if len(futures) >= self.max_threads * 2:
-                        # Wait for the first batch to complete
-                        self.handle_futures(futures[:self.max_threads])
-                        futures = futures[self.max_threads:]
-
-                if futures:
-                    self.handle_futures(futures)
+            with self.create_io_scheduler() as scheduler:
+                if self.plan_path:
+                    self.organize_files_planned(scheduler)
+                elif self.rsync_batch_size > 1 and self.copy_tool == CopyTools.RSYNC.value:
+                    self.organize_files_batched(scheduler)
+                else:
+                    target_directory = self.get_target_directory()
+                    tasks = self.stream_tasks(
+                        self.yield_files(),
+                        lambda filepath: scheduler.schedule(filepath, target_directory, self.process_file_threadsafe, filepath),
+                        max_pending=scheduler.max_workers * 2,
+                    )
+                    for _filepath, future in tasks:
+                        self.handle_futures([future])
 
         self.report('Moving files complete')
 
@@ -298,6 +421,426 @@ class FileOrganizer(FileManager):
 
         logger.info(self.report('Finished organizing.'))
 
+    def get_plan_settings(self) -> dict[str, str]:
+        """
+        The settings that decide what a plan contains. A stored plan is only resumed when they all match.
+        """
+        return {
+            'directory': str(self.directory.absolute()),
+            'target_directory': str(self.get_target_directory().absolute()),
+            'glob_pattern': self.glob_pattern,
+            'copy_mode': str(int(self.copy_mode)),
+            'keep_duplicates': str(int(self.keep_duplicates)),
+        }
+
+    def organize_files_planned(self, scheduler : IOScheduler) -> None:
+        """
+        Organize files in two phases, journaled in the plan at plan_path.
+
+        First, every file is planned: its destination and action are decided, and written to the plan. Then the plan
+        is executed in pages ordered by destination, and each page is journaled as it completes. If the run is
+        interrupted, the next run with the same settings finishes the entries left from the last journaled page, then
+        plans again to pick up any files added since.
+
+        The plan is cleared once every entry has been attempted. Files that failed are still in the source, so they're
+        planned (and retried) again by the next run.
+
+        Args:
+            scheduler: The scheduler that planning and execution are submitted to.
+        """
+        plan = OrganizePlan(self.plan_path)
+        try:
+            settings = self.get_plan_settings()
+            stored_settings = plan.get_settings()
+            resumable = plan.is_planned() and all(stored_settings.get(key) == value for key, value in settings.items())
+            counts = plan.count_by_status()
+            if resumable and counts[PlanStatus.PENDING]:
+                logger.info('Resuming the plan in %s. %d entries are left, %d are done.', self.plan_path, counts[PlanStatus.PENDING] + counts[PlanStatus.FAILED], counts[PlanStatus.DONE])
+                self.execute_plan(plan, scheduler)
+                self.log_plan_failures(plan)
+            elif stored_settings and not resumable:
+                logger.warning('Discarding the plan in %s, which was interrupted while planning, or made for a different run.', self.plan_path)
+
+            self.plan_files(plan, scheduler, settings)
+            self.execute_plan(plan, scheduler)
+            self.log_plan_failures(plan)
+            plan.clear()
+        finally:
+            plan.close()
+
+    def log_plan_failures(self, plan : OrganizePlan) -> None:
+        """
+        Warn about the entries of a plan that failed. Their files are left in the source, to be planned again next run.
+        """
+        if (failed := plan.count_by_status()[PlanStatus.FAILED]):
+            logger.warning('%d entries of the plan in %s could not be executed. Run again to retry them.', failed, self.plan_path)
+
+    def plan_files(self, plan : OrganizePlan, scheduler : IOScheduler, settings : dict[str, str]) -> None:
+        """
+        Decide what to do with every file, and write it to the plan.
+
+        Files are planned concurrently, as planning hashes any existing files they may duplicate.
+
+        Args:
+            plan: The plan to write to. Any previous plan in it is discarded.
+            scheduler: The scheduler that files are planned with.
+            settings: The settings the plan is made with.
+        """
+        plan.start(settings)
+        self.progress_message('Planning...')
+
+        target_directory = self.get_target_directory()
+        entries : list[PlanEntry] = []
+        tasks = self.stream_tasks(
+            (filepath for filepath in self.yield_files() if not self.is_already_imported(filepath)),
+            lambda filepath: scheduler.schedule(filepath, target_directory, self.plan_file, filepath),
+            max_pending=scheduler.max_workers * 2,
+        )
+        for _filepath, future in tasks:
+            entries.extend(self.handle_plan_futures([future]))
+            if len(entries) >= PLAN_PAGE_SIZE:
+                plan.add_entries(entries)
+                entries = []
+
+        plan.add_entries(entries)
+        plan.finish_planning()
+
+    def handle_plan_futures(self, futures : list[Future]) -> list[PlanEntry]:
+        """
+        Wait for files to be planned.
+
+        Files that could not be planned are logged, and left where they are for the next run.
+
+        Args:
+            futures: Futures returned by plan_file.
+
+        Returns:
+            The entries to add to the plan.
+        """
+        entries : list[PlanEntry] = []
+        for future in futures:
+            try:
+                if (entry := future.result()):
+                    entries.append(entry)
+            except (OneFileException, OSError, ValueError) as e:
+                logger.error("Error planning file: %s", e)
+                self.record_error()
+        return entries
+
+    def plan_file(self, file_path : Path) -> PlanEntry | None:
+        """
+        Decide where a file goes, and what to do with it, without changing anything on disk.
+
+        The name the file will use is claimed in its destination's name index, so no two files are planned to the
+        same destination.
+
+        Args:
+            file_path: The file to plan.
+
+        Returns:
+            The plan entry, or None if there is nothing to do.
+
+        Raises:
+            OneFileException: If a unique filename could not be found, or either file could not be hashed.
+        """
+        source_path = file_path.absolute()
+        source_stat = source_path.stat()
+        destination_dir = (self.get_target_directory() / self.find_subdir(file_path)).absolute()
+        names = self.get_name_index(destination_dir)
+        base, ext = file_path.stem, file_path.suffix
+        transfer = PlanActions.COPY if self.copy_mode else PlanActions.MOVE
+
+        if destination_dir / file_path.name == source_path or (self.skip_collision and file_path.name in names):
+            self.record_skip_file()
+            return None
+
+        # The name, or any "_i" variant of it, may already be a copy of this file
+        for name in (file_path.name, *names.variants(base, ext)):
+            try:
+                if name not in names or names.size(name) != source_stat.st_size:
+                    continue
+            except FileNotFoundError:
+                continue
+
+            if self.files_match(source_path, destination_dir / name):
+                delete = not (self.keep_duplicates or self.copy_mode or self.skip_hash)
+                return PlanEntry(
+                    source=source_path, destination=destination_dir / name, action=PlanActions.DELETE if delete else PlanActions.SKIP,
+                    size=source_stat.st_size, mtime_ns=source_stat.st_mtime_ns, file_hash=None if self.skip_hash else self.hash_file(source_path),
+                )
+
+        with_sidecar = self.moves_sidecar(source_path)
+        if names.claim(file_path.name, source_stat.st_size, with_sidecar=with_sidecar):
+            name = file_path.name
+        elif not (name := names.claim_next(base, ext, size=source_stat.st_size, with_sidecar=with_sidecar)):
+            raise OneFileException(f"Could not find a unique filename for {source_path=}")
+
+        return PlanEntry(source=source_path, destination=destination_dir / name, action=transfer, size=source_stat.st_size, mtime_ns=source_stat.st_mtime_ns)
+
+    def execute_plan(self, plan : OrganizePlan, scheduler : IOScheduler) -> None:
+        """
+        Carry out every entry of a plan that hasn't been executed yet, journaling each page as it completes.
+
+        Args:
+            plan: The plan to execute.
+            scheduler: The scheduler that operations are submitted to.
+        """
+        for page in plan.iter_pending(include_failed=True):
+            tasks = self.stream_tasks(
+                page,
+                lambda entry: scheduler.schedule(entry.source, entry.destination.parent, self.execute_plan_entry_threadsafe, entry),
+                max_pending=scheduler.max_workers * 2,
+            )
+            done : list[int] = []
+            failed : list[tuple[int, str]] = []
+            try:
+                for entry, future in tasks:
+                    try:
+                        future.result()
+                        done.append(entry.id)
+                    except (OneFileException, OSError) as e:
+                        logger.error("Error executing plan for %s: %s", entry.source, e)
+                        failed.append((entry.id, str(e)))
+            finally:
+                # Journal whatever finished, even if the run is about to terminate
+                plan.mark_done(done)
+                plan.mark_failed(failed)
+
+    def execute_plan_entry_threadsafe(self, entry : PlanEntry) -> None:
+        """
+        Execute a single plan entry, waiting out network outages.
+        """
+        try:
+            attempt = 0
+            while True:
+                try:
+                    self.execute_plan_entry(entry)
+                except DuplicationHandledException:
+                    logger.debug("Duplicate file handled: %s", entry.source)
+                except OSError as ose:
+                    # Check for errno 107 or 112 (host down), and if so, wait and retry
+                    if ose.errno in {107, 112}:
+                        attempt += 1
+                        wait_time = min(60, 5 * attempt)
+                        logger.warning("There may be a network issue. Waiting %ss to retry: %s", wait_time, ose)
+                        time.sleep(wait_time)
+                        continue
+                    raise
+                return
+        finally:
+            self.progress_advance(self._shortpath(entry.destination.parent))
+
+    def execute_plan_entry(self, entry : PlanEntry) -> None:
+        """
+        Execute a single plan entry.
+
+        Entries can be executed again safely: work that was finished before an interruption, but not journaled, is
+        recognized and not repeated, and a destination left partly written is replaced. If the source changed since it
+        was planned, or another file took its destination, the file is processed from scratch instead. A source that
+        was removed since it was planned is treated as finished.
+
+        Args:
+            entry: The entry to execute.
+
+        Raises:
+            DuplicationHandledException: If the file was processed from scratch, and turned out to be a duplicate.
+            OneFileException: If the operation failed.
+        """
+        source_path, destination_path = entry.source, entry.destination
+
+        if entry.action == PlanActions.SKIP:
+            self.record_skip_file()
+            self.record_import(source_path, destination_path)
+            return
+
+        try:
+            source_stat = source_path.stat()
+        except FileNotFoundError:
+            if entry.action == PlanActions.DELETE:
+                # Deleted before an interruption
+                return
+            if entry.action == PlanActions.MOVE and destination_path.exists() and self.file_size(destination_path) == entry.size:
+                # Moved before an interruption
+                return
+            # Removed since it was planned, so there's nothing left to do
+            logger.info('Source file disappeared since it was planned: %s', source_path)
+            return
+
+        if (source_stat.st_size, source_stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+            logger.info('File changed since it was planned, organizing it again: %s', source_path)
+            self.process_file(source_path)
+            return
+
+        if entry.action == PlanActions.DELETE:
+            if not self.files_match(source_path, destination_path):
+                self.process_file(source_path)
+                return
+            self.record_duplicate_file()
+            self.delete_file(source_path)
+            if (xmp_source_path := source_path.with_suffix('.xmp')).exists(follow_symlinks=False):
+                self.delete_file(xmp_source_path)
+            return
+
+        if destination_path.exists():
+            # Checked first, so the size of the partial copy is never cached by files_match
+            if self.is_partial_copy(source_path, destination_path, entry.size):
+                # The name was claimed for this entry, and an interrupted transfer left it half written
+                logger.warning('Replacing a partial copy of %s left by an interrupted run: %s', source_path, destination_path)
+                # Not delete_file, which guards sources. This file is only our own unfinished output.
+                if not self.check_dry_run(f'deleting partial copy {destination_path}'):
+                    destination_path.unlink()
+            elif entry.action == PlanActions.COPY and self.files_match(source_path, destination_path):
+                # Copied before an interruption
+                self.record_import(source_path, destination_path)
+                return
+            else:
+                # Something else took the destination since it was planned
+                self.process_file(source_path)
+                return
+
+        self.mkdir(destination_path.parent)
+        if entry.action == PlanActions.COPY:
+            self.record_import(source_path, self.copy_file(source_path, destination_path))
+        else:
+            self.move_file(source_path, destination_path)
+
+    def is_partial_copy(self, source_path : Path, destination_path : Path, size : int) -> bool:
+        """
+        Check whether a destination is a truncated copy of its source, as left by a transfer that was interrupted.
+
+        Args:
+            source_path: The source, which must still be the size it was planned with.
+            destination_path: The destination to check.
+            size: The size of the source.
+
+        Returns:
+            True if the destination is shorter than the source, and matches the start of it.
+        """
+        # Not file_size, which would cache the size of a file that's about to be replaced
+        remaining = destination_path.stat().st_size
+        if remaining >= size:
+            return False
+
+        with open(source_path, 'rb') as source_file, open(destination_path, 'rb') as destination_file:
+            while remaining > 0:
+                chunk = destination_file.read(min(self.read_chunk_size, remaining))
+                if not chunk or source_file.read(len(chunk)) != chunk:
+                    return False
+                remaining -= len(chunk)
+        return True
+
+    def organize_files_batched(self, scheduler : IOScheduler, files : Iterable[Path] | None = None) -> None:
+        """
+        Organize files, sending cross-filesystem transfers to rsync in batches of rsync_batch_size per directory.
+
+        Every destination is claimed in its directory's name index as it is planned. Anything that needs a collision
+        check (an existing destination, or two sources with the same name) is deferred until the batches have finished,
+        then processed one at a time as organize_files normally would. So are files in a batch that failed verification.
+
+        Args:
+            scheduler: The scheduler that single files and batches are submitted to.
+            files: The files to organize. Defaults to every file in self.directory.
+        """
+        futures : list[Future] = []
+        batch_futures : list[Future] = []
+        batches : dict[Path, list[tuple[Path, Path]]] = defaultdict(list)
+        deferred : list[Path] = []
+
+        if files is None:
+            files = self.yield_files()
+
+        for filepath in files:
+            if self.is_already_imported(filepath):
+                self.progress_advance(self._shortpath(filepath.parent))
+                continue
+
+            try:
+                destination_path = (self.create_subdir(filepath) / filepath.name).absolute()
+                names = self.get_name_index(destination_path.parent)
+                if destination_path.name in names:
+                    deferred.append(filepath)
+                    continue
+                same_filesystem = self.is_same_filesystem(filepath, destination_path.parent)
+            except (OSError, ValueError) as e:
+                logger.debug('Unable to plan a batched transfer, deferring: %s -> %s', filepath, e)
+                deferred.append(filepath)
+                continue
+
+            if same_filesystem:
+                # A rename is already cheap, and doesn't involve rsync. process_file claims the name itself.
+                futures.append(scheduler.schedule(filepath, destination_path.parent, self.process_file_threadsafe, filepath))
+            elif not names.claim(destination_path.name, self.file_size(filepath), with_sidecar=self.moves_sidecar(filepath)):
+                deferred.append(filepath)
+            else:
+                batch = batches[destination_path.parent]
+                batch.append((filepath, destination_path))
+                if len(batch) >= self.rsync_batch_size:
+                    batch = batches.pop(destination_path.parent)
+                    batch_futures.append(scheduler.schedule(filepath, destination_path.parent, self.transfer_batch_threadsafe, batch))
+
+            if len(futures) >= scheduler.max_workers * 2:
+                self.handle_futures(futures[:scheduler.max_workers])
+                futures = futures[scheduler.max_workers:]
+
+            if len(batch_futures) >= scheduler.max_workers * 2:
+                deferred.extend(self.handle_batch_futures(batch_futures[:scheduler.max_workers]))
+                batch_futures = batch_futures[scheduler.max_workers:]
+
+        for destination_dir, batch in batches.items():
+            batch_futures.append(scheduler.schedule(batch[0][0], destination_dir, self.transfer_batch_threadsafe, batch))
+
+        self.handle_futures(futures)
+        deferred.extend(self.handle_batch_futures(batch_futures))
+
+        if deferred:
+            logger.debug('Processing %d deferred files individually', len(deferred))
+            target_directory = self.get_target_directory()
+            self.handle_futures([scheduler.schedule(filepath, target_directory, self.process_file_threadsafe, filepath) for filepath in deferred])
+
+    def transfer_batch_threadsafe(self, pairs : list[tuple[Path, Path]]) -> list[Path]:
+        """
+        Transfer a batch of files with rsync, and handle exceptions safely.
+
+        Args:
+            pairs: (source, destination) pairs, all in one destination directory.
+
+        Returns:
+            The source files that were not transferred, and should be processed individually.
+        """
+        try:
+            failed = self.transfer_batch_with_rsync(pairs, move=not self.copy_mode)
+        except (OneFileException, OSError) as e:
+            logger.error("Error transferring batch to %s: %s", pairs[0][1].parent, e)
+            failed = pairs
+        else:
+            self.progress_advance(self._shortpath(pairs[0][1].parent), advance=len(pairs) - len(failed))
+            if self.copy_mode:
+                failed_pairs = set(failed)
+                for source_path, destination_path in pairs:
+                    if (source_path, destination_path) not in failed_pairs:
+                        self.record_import(source_path, destination_path)
+
+        # Release the names of files that weren't transferred, so they can be claimed again when processed individually
+        for source_path, destination_path in failed:
+            self.release_name(source_path, destination_path)
+
+        return [source_path for source_path, _ in failed]
+
+    def handle_batch_futures(self, futures : list[Future]) -> list[Path]:
+        """
+        Wait for batched transfers to finish.
+
+        Args:
+            futures: Futures returned by transfer_batch_threadsafe.
+
+        Returns:
+            Every source file that still needs to be processed.
+        """
+        remaining : list[Path] = []
+        for future in futures:
+            remaining.extend(future.result())
+        return remaining
+
     def handle_futures(self, futures : list[Future]) -> tuple[int, int]:
         """
         Handle the results of a list of futures.
@@ -314,7 +857,7 @@ class FileOrganizer(FileManager):
             try:
                 result = future.result()
                 results.append(result)
-            except (OneFileException, PermissionError) as ofe:
+            except (OneFileException, PermissionError, TimeoutError) as ofe:
                 logger.error("Error organizing file: %s", ofe)
                 results.append(False)
             except Exception as e:
@@ -375,11 +918,14 @@ class FileOrganizer(FileManager):
         """
         filename = file_path.name
 
+        if self.is_already_imported(file_path):
+            return None
+
         # Create the subdir
         destination_dir = self.create_subdir(file_path)
         destination_path = destination_dir / filename
 
-        if destination_path.exists() and (self.skip_collision or file_path.samefile(destination_path)):
+        if filename in self.get_name_index(destination_dir) and destination_path.exists() and (self.skip_collision or file_path.samefile(destination_path)):
             self.record_skip_file()
             logger.debug(f"Skipping file {file_path.absolute()=} as it is already in the correct directory")
             return None
@@ -392,13 +938,17 @@ class FileOrganizer(FileManager):
 
             try:
                 if self.copy_mode:
-                    return self.copy_file(file_path, destination_file)
+                    copied_path = self.copy_file(file_path, destination_file)
+                    self.record_import(file_path, copied_path)
+                    return copied_path
                 return self.move_file(file_path, destination_file)
             except FileExistsError as fee:
                 logger.warning("File was created by another process. Attempt(%d/%d). destination_path='%s' -> %s", i, MAX_ATTEMPTS, destination_file, fee)
                 raise ShouldTerminateError(f"File was created by another process. {destination_file.absolute()=} -> {fee=}")
             except FileNotFoundError as fnf:
                 logger.warning("File not found while moving file. Attempt(%d/%d). source_path='%s' -> %s", i, MAX_ATTEMPTS, file_path, fnf)
+                # The destination directory may have been removed since it was cached
+                self.forget_directory(destination_file.parent)
             except PermissionError as pe:
                 logger.warning("Permission error moving file. Attempt(%d/%d). destination_path='%s' -> %s", i, MAX_ATTEMPTS, destination_file, pe)
                 break
@@ -407,11 +957,15 @@ class FileOrganizer(FileManager):
             except subprocess.TimeoutExpired as te:
                 logger.warning("Timeout error moving file. Attempt(%d/%d). destination_path='%s' -> %s", i, MAX_ATTEMPTS, destination_file, te)
 
+            # The name was claimed, but nothing was written. Release it, so the retry can use it again.
+            self.release_name(file_path, destination_file)
+
             # Wait a bit before trying again.
             # -- 1 second, 10 seconds, 20 seconds
             wait_time = max(1, (i - 1) * 10)
             time.sleep(wait_time)
 
+        self.release_name(file_path, destination_file)
         logger.error("File could not be moved after %s attempts. destination_path='%s'", i, destination_file)
         raise OneFileException(f"File could not be moved after {MAX_ATTEMPTS} attempts. {destination_file.absolute()=}")
 
@@ -436,7 +990,7 @@ class FileOrganizer(FileManager):
             if not directory.is_absolute():
                 directory = self.directory / directory
             
-        if directory.exists():
+        if self.directory_exists(directory):
             return directory
 
         try:
@@ -526,6 +1080,9 @@ class FileOrganizer(FileManager):
         """
         Determine the year, month, and day for a file based on its filename or metadata.
 
+        A date in the filename is preferred. Otherwise, the capture date is read from the file's header, and if it has
+        none, the file's ctime is used.
+
         Args:
             filepath: The file path to extract the date from.
 
@@ -535,7 +1092,10 @@ class FileOrganizer(FileManager):
         # Prefer a date in the filename, if one exists, over the file metadata
         if (match := self.match_date_in_filename(filepath.name)):
             return match
-        
+
+        if (captured := read_capture_date(filepath)):
+            return (captured.strftime('%Y'), captured.strftime('%m'), captured.strftime('%d'))
+
         try:
             # Get the created date from the filepath
             file_stat = filepath.stat()
@@ -603,14 +1163,15 @@ class FileOrganizer(FileManager):
         """
         # XMP files go with their respective RAW files
         xmp_source_path = source_path.with_suffix('.xmp')
-        xmp_destination_path = destination_path.with_suffix('.xmp')
+        names = self.get_name_index(destination_path.parent)
         
-        if not destination_path.exists():
-            if not xmp_destination_path.exists():
-                # No conflict; return the destination file
+        if destination_path.name not in names:
+            # The claim fails if the destination's .xmp is taken, and reserves it if our sidecar will be moved there
+            if names.claim(destination_path.name, self.file_size(source_path), with_sidecar=self.moves_sidecar(source_path)):
+                # No conflict; the destination is now reserved for this file
                 return destination_path
 
-            # Destination has no conflict, but potential xmp file conflict. Don't handle it.
+            # Destination has no conflict, but potential xmp file conflict (or another thread just took the name). Don't handle it.
             return False
         
         if self.skip_collision:
@@ -629,7 +1190,9 @@ class FileOrganizer(FileManager):
                 if xmp_source_path.exists(follow_symlinks=False):
                     self.delete_file(xmp_source_path)
                 raise DuplicationHandledException(f"Duplicate file {source_path.absolute()=} deleted")
-                
+
+            # An identical copy is already in the archive, so the source counts as imported
+            self.record_import(source_path, destination_path)
             raise DuplicationHandledException(f"Duplicate file {source_path.absolute()=} skipped")
 
         # Files differ; the conflict was not handled.
@@ -639,6 +1202,10 @@ class FileOrganizer(FileManager):
         """
         Handle a filename collision by finding a unique filename.
 
+        Existing "_i" variants of the name are compared with the source, as any one of them may be a duplicate. Variants
+        of a different size are ruled out from the name index without reading them. If none match, the suffix after
+        the highest one in use is claimed.
+
         Args:
             source_file: The source file.
             target_file: The target file.
@@ -656,15 +1223,24 @@ class FileOrganizer(FileManager):
         # Files differ; find a new filename
         base = source_file.stem  # Filename without extension
         ext = source_file.suffix  # File extension including the dot
+        names = self.get_name_index(target_file.parent)
+        source_size = self.file_size(source_file)
 
-        new_target_file : Path | None = None
-        for i in range(max_attempts):
-            new_target_file = target_file.parent / f"{base}_{i}{ext}"
+        for name in names.variants(base, ext):
+            try:
+                if names.size(name) != source_size:
+                    continue
+            except FileNotFoundError:
+                # Claimed by another thread, but not written yet
+                continue
 
-            if (viable_path := self.handle_single_conflict(source_file, new_target_file)):
+            if (viable_path := self.handle_single_conflict(source_file, target_file.parent / name)):
                 return viable_path
 
-        raise OneFileException(f"Could not find a unique filename for {source_file.absolute()=}... last name tried: {new_target_file=}")
+        if not (new_name := names.claim_next(base, ext, size=source_size, max_suffix=max_attempts, with_sidecar=self.moves_sidecar(source_file))):
+            raise OneFileException(f"Could not find a unique filename for {source_file.absolute()=}... all {max_attempts} suffixes are taken")
+
+        return target_file.parent / new_name
 
     def report(self, message_prefix : str | None = None) -> str:
         """
@@ -717,9 +1293,9 @@ class FileOrganizer(FileManager):
             
         return f"{RESET}{' '.join(buffer) or 'No files changed'}{RESET}"
 
-def autopilot(organizer : FileOrganizer) -> None:
+def get_autopilot_rules() -> dict[str, str]:
     """
-    Automatically organize files based on their extension.
+    Build the glob -> target directory rules that autopilot applies, in order.
     """
     # Compile glob patterns
     raw_globs = [
@@ -790,11 +1366,35 @@ def autopilot(organizer : FileOrganizer) -> None:
     for glob in video_globs:
         for ext in video_extensions:
             globs[f'{glob}.{ext}'] = '/mnt/i/Photos/'
-    
-    # Copy organizer and change the target directory
-    for glob, target in globs.items():
-        logger.info('Organizing %s to %s', glob, target)
-        glob_organizer = FileOrganizer(
+
+    return globs
+
+class FileRouter:
+    """
+    Organize files for many glob -> target rules in a single pass over the source tree.
+
+    Each rule gets its own FileOrganizer (a copy of the base organizer with a new glob and target), so stats are kept
+    per rule. All the globs are compiled into one regex, tried in rule order, so a file that matches several rules
+    goes to the first one, as it did when each rule was organized in turn.
+    """
+    organizer : FileOrganizer
+    rules : list[tuple[str, FileOrganizer]]
+    pattern : re.Pattern
+
+    def __init__(self, organizer : FileOrganizer, rules : dict[str, str | Path]):
+        self.organizer = organizer
+        self.rules = [(glob, self._copy_organizer(glob, target)) for glob, target in rules.items()]
+        self.pattern = re.compile(
+            '|'.join(f'(?P<rule{i}>{fnmatch.translate(glob)})' for i, glob in enumerate(rules)) or r'(?!)',
+            re.IGNORECASE
+        )
+
+    def _copy_organizer(self, glob : str, target : str | Path) -> FileOrganizer:
+        """
+        Copy the base organizer and change the glob and target directory.
+        """
+        organizer = self.organizer
+        return FileOrganizer(
             directory       = organizer.directory,
             target_directory= target,
             glob_pattern    = glob,
@@ -806,8 +1406,82 @@ def autopilot(organizer : FileOrganizer) -> None:
             keep_duplicates = organizer.keep_duplicates,
             trash_directory = organizer.trash_directory,
             max_threads     = organizer.max_threads,
+            task_timeout    = organizer.task_timeout,
+            hash_index_path = organizer.hash_index_path,
+            preferred_copy_tool = organizer.preferred_copy_tool,
+            rsync_batch_size = organizer.rsync_batch_size,
+            device_limits   = organizer.device_limits,
+            import_manifest_path = organizer.import_manifest_path,
         )
-        glob_organizer.organize_files(cleanup=False)
+
+    def route(self, filename : str) -> FileOrganizer | None:
+        """
+        Find the organizer for the first rule that matches a filename.
+
+        Args:
+            filename: The name of the file, without its directory.
+
+        Returns:
+            The organizer for the matching rule, or None if no rule matches.
+        """
+        if not (match := self.pattern.match(filename)) or not match.lastgroup:
+            return None
+        return self.rules[int(match.lastgroup.removeprefix('rule'))][1]
+
+    def organize_files(self) -> None:
+        """
+        Walk the source tree once, and organize each file with the organizer for its rule.
+        """
+        organizer = self.organizer
+        if organizer.dry_run:
+            # Nothing is walked in a dry run, but report each rule as organize_files would
+            for _glob, rule_organizer in self.rules:
+                rule_organizer.check_dry_run(f'organizing files with {rule_organizer.glob_pattern=} in {rule_organizer.directory.absolute()}')
+            return
+
+        print(f'{RESET}Organizing files in {BLUE}{organizer.directory.absolute()}{RESET} by {len(self.rules)} rules with {organizer.max_threads} threads.')
+
+        batched = organizer.rsync_batch_size > 1 and organizer.copy_tool == CopyTools.RSYNC.value
+        batched_files : dict[int, list[Path]] = defaultdict(list)
+
+        with alive_bar(title=f"{BLUE2}Autopilot{RESET} {organizer._shortpath(organizer.directory.absolute())}", unit='files', dual_line=True, unknown='waves') as bar:
+            for _glob, rule_organizer in self.rules:
+                rule_organizer._progress_bar = bar
+
+            with organizer.create_io_scheduler() as scheduler:
+                def routed_files() -> Iterator[tuple[FileOrganizer, Path]]:
+                    for entry in organizer.scan_files(pattern=self.pattern):
+                        if not (rule_organizer := self.route(entry.name)):
+                            continue
+
+                        filepath = Path(entry.path)
+                        if batched:
+                            # Batches are planned per rule once the walk is complete
+                            batched_files[id(rule_organizer)].append(filepath)
+                            continue
+
+                        yield rule_organizer, filepath
+
+                tasks = organizer.stream_tasks(
+                    routed_files(),
+                    lambda task: scheduler.schedule(task[1], task[0].get_target_directory(), task[0].process_file_threadsafe, task[1]),
+                    max_pending=scheduler.max_workers * 2,
+                )
+                for (rule_organizer, _filepath), future in tasks:
+                    rule_organizer.handle_futures([future])
+
+                for _glob, rule_organizer in self.rules:
+                    if files := batched_files.get(id(rule_organizer)):
+                        rule_organizer.organize_files_batched(scheduler, files)
+
+        for glob, rule_organizer in self.rules:
+            logger.info('Organized %s to %s: %s', glob, rule_organizer.get_target_directory(), rule_organizer.report('Finished organizing.'))
+
+def autopilot(organizer : FileOrganizer) -> None:
+    """
+    Automatically organize files based on their extension.
+    """
+    FileRouter(organizer, get_autopilot_rules()).organize_files()
 
     organizer.delete_empty_directories()
 
@@ -825,6 +1499,14 @@ class ArgsNamespace(argparse.Namespace):
     skip_hash: bool
     dry_run: bool
     max_threads : int
+    task_timeout : Optional[float]
+    hash_index : str
+    copy_tool : Optional[str]
+    rsync_batch_size : int
+    device_limit : list[str]
+    parallel_cleanup : bool
+    import_manifest : str
+    plan : Optional[str]
     ftp_host: str
     ftp_user: str
     ftp_pass: str
@@ -837,6 +1519,10 @@ def main() -> int:
     
     DEFAULT_TARGET = os.getenv('IMAGEINN_ORGANIZE_TARGET', '.')
     DEFAULT_TRASH = os.getenv('IMAGEINN_ORGANIZE_TRASH', None)
+    DEFAULT_HASH_INDEX = os.getenv('IMAGEINN_HASH_INDEX', str(DEFAULT_HASH_INDEX_PATH))
+    DEFAULT_COPY_TOOL = os.getenv('IMAGEINN_COPY_TOOL', None)
+    DEFAULT_PLAN = os.getenv('IMAGEINN_ORGANIZE_PLAN', None)
+    DEFAULT_IMPORT_MANIFEST = os.getenv('IMAGEINN_IMPORT_MANIFEST', str(DEFAULT_IMPORT_MANIFEST_PATH))
 
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Organize files into monthly directories.')
@@ -852,6 +1538,14 @@ def main() -> int:
     parser.add_argument('--skip-collision', action='store_true', help='Skip moving files on collision')
     parser.add_argument('--skip-hash', action='store_true', help='Skip verifying file hashes')
     parser.add_argument('--max-threads', type=int, default=0, help='Maximum number of threads to use')
+    parser.add_argument('--task-timeout', type=float, default=None, help='Seconds a single file may take before moving on without it (default: no limit)')
+    parser.add_argument('--hash-index', default=DEFAULT_HASH_INDEX, help=f'SQLite file to persist file hashes between runs. Pass an empty string to disable. Defaults to env var IMAGEINN_HASH_INDEX, which is "{DEFAULT_HASH_INDEX}"')
+    parser.add_argument('--import-manifest', default=DEFAULT_IMPORT_MANIFEST, help=f'SQLite file recording the files already imported by --copy, which later runs skip unless they changed. Pass an empty string to disable. Defaults to env var IMAGEINN_IMPORT_MANIFEST, which is "{DEFAULT_IMPORT_MANIFEST}"')
+    parser.add_argument('--plan', default=DEFAULT_PLAN, help='SQLite file to plan every operation into before executing them. An interrupted run resumes from it. Defaults to env var IMAGEINN_ORGANIZE_PLAN, or no plan')
+    parser.add_argument('--copy-tool', default=DEFAULT_COPY_TOOL, choices=[tool.value for tool in CopyTools], help='Tool used to copy files between filesystems. Defaults to env var IMAGEINN_COPY_TOOL, or rsync if it is installed. Unless another tool is chosen, copies within one filesystem are cloned (or copied in the kernel) first, where the filesystem supports it')
+    parser.add_argument('--rsync-batch-size', type=int, default=0, help='Send cross-filesystem transfers to rsync in batches of this many files per directory (default: one rsync call per file)')
+    parser.add_argument('--device-limit', action='append', default=[], metavar='KIND=LIMIT', help=f'Concurrent operations allowed per device of this kind ({", ".join(kind.value for kind in DeviceKinds)}). May be repeated. Defaults to 1 for hdd, 8 for ssd, 4 for network, and --max-threads for unknown devices')
+    parser.add_argument('--parallel-cleanup', action='store_true', help='Delete empty directories in separate subtrees concurrently, using --max-threads workers')
     parser.add_argument('--dry-run', action='store_true', help='Simulate the file organization without moving files')
     parser.add_argument('--ftp-host', help='FTP host to connect to')
     parser.add_argument('--ftp-user', help='FTP username')
@@ -873,6 +1567,14 @@ def main() -> int:
         keep_duplicates = args.keep_duplicates,
         trash_directory = args.trash,
         max_threads     = args.max_threads,
+        task_timeout    = args.task_timeout,
+        hash_index_path = args.hash_index,
+        preferred_copy_tool = args.copy_tool,
+        rsync_batch_size = args.rsync_batch_size,
+        device_limits   = args.device_limit,
+        parallel_cleanup = args.parallel_cleanup,
+        import_manifest_path = args.import_manifest,
+        plan_path       = args.plan,
     )
 
     try:
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable
+import pytest
+
+from scripts.monthly.organize.base import FileOrganizer
+
+
+@pytest.fixture
+def organizer_options() -> dict[str, Any]:
+    """
+    Extra options for every organizer a test module creates. Override this in a module to change its defaults.
+    """
+    return {}
+
+
+@pytest.fixture
+def make_organizer(tmp_path: Path, organizer_options: dict[str, Any]) -> Callable[..., FileOrganizer]:
+    """
+    Create a FileOrganizer from tmp_path/source into tmp_path/target. Keyword arguments override the defaults.
+    """
+    def make(**kwargs: Any) -> FileOrganizer:
+        return FileOrganizer(**{
+            "directory": tmp_path / "source",
+            "target_directory": tmp_path / "target",
+            **organizer_options,
+            **kwargs,
+        })
+
+    return make
@@ -0,0 +1,303 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    dedupe_archive.py                                                                                    *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import os
+import sys
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
+# Add the root directory of the project to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from alive_progress import alive_bar
+from pydantic import PrivateAttr, field_validator
+from dotenv import load_dotenv
+from scripts import setup_logging
+from scripts.lib.types import RESET, RED, BLUE, PURPLE
+from scripts.lib.file_manager import FileManager
+from scripts.lib.db.duplicates import DuplicateIndex, DEFAULT_DUPLICATE_INDEX_PATH, PAGE_SIZE
+from scripts.lib.db.hashes import DEFAULT_HASH_INDEX_PATH
+
+logger = logging.getLogger(__name__)
+
+# FileManager.hash_file reads the whole file for a partial hash below this size, so the partial hash is also the full hash.
+PARTIAL_HASH_THRESHOLD = 2 * 1024 * 1024
+
+class ArchiveDeduplicator(FileManager):
+    """
+    Find files with identical contents anywhere in an archive, and report or trash the extra copies.
+
+    Unlike DuplicateVariantCleaner, files are compared regardless of their name or directory. Every file is recorded in
+    a DuplicateIndex, then narrowed down by size, partial hash and full hash. Only files that collide at one stage are
+    read for the next, and hashes survive between runs, so a re-run only reads new or changed files.
+
+    Of each group of identical files, the oldest is kept (then the one nearest the root, then by name). The others are
+    moved to the trash with delete_file, or just reported.
+    """
+    index_path : Path = DEFAULT_DUPLICATE_INDEX_PATH
+    trash_duplicates : bool = False
+    hashing_algorithm : str = 'xxhash'
+
+    _index : DuplicateIndex | None = PrivateAttr(default=None)
+
+    @field_validator('index_path', mode='before')
+    def validate_index_path(cls, v) -> Path:
+        return Path(v) if v else DEFAULT_DUPLICATE_INDEX_PATH
+
+    @property
+    def index(self) -> DuplicateIndex:
+        if not self._index:
+            self._index = DuplicateIndex(self.index_path)
+        return self._index
+
+    @property
+    def root(self) -> Path:
+        return self.directory.resolve()
+
+    def run(self) -> None:
+        """
+        Scan the archive, hash whatever is needed to confirm duplicates, then report or trash them.
+        """
+        self.scan()
+        self.hash_candidates(partial=True)
+        self.hash_candidates(partial=False)
+        self.resolve_duplicates()
+
+    def _walk(self) -> Iterator[tuple[Path, os.stat_result]]:
+        """
+        Yield (path, stat) for every regular file below the root, skipping hidden directories (and so the trash).
+        """
+        pending = [self.root]
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.should_ignore_directory(entry.name):
+                                pending.append(Path(entry.path))
+                        elif entry.is_file(follow_symlinks=False):
+                            yield Path(entry.path), entry.stat(follow_symlinks=False)
+            except OSError as e:
+                logger.warning('Unable to scan %s: %s', directory, e)
+                self.record_error()
+
+    def scan(self) -> None:
+        """
+        Record every file below the root in the index, and forget files that are gone.
+        """
+        scan_id = self.index.next_scan_id()
+        batch : list[tuple[Path, os.stat_result]] = []
+        logger.info('Scanning %s...', self.root)
+        with alive_bar(title='Scanning', unit='files', unknown='waves') as bar:
+            for file_path, file_stat in self._walk():
+                batch.append((file_path, file_stat))
+                if len(batch) >= PAGE_SIZE:
+                    self.index.record_files(batch, scan_id)
+                    batch.clear()
+                bar()
+            if batch:
+                self.index.record_files(batch, scan_id)
+
+        if removed := self.index.forget_missing(self.root, scan_id):
+            logger.info('Forgot %d file(s) that no longer exist.', removed)
+
+    def _hash(self, path : str, partial : bool) -> str | None:
+        try:
+            return self.hash_file(path, partial=partial, hashing_algorithm=self.hashing_algorithm)
+        except OSError as e:
+            logger.warning('Unable to hash %s: %s', path, e)
+            self.record_error()
+            return None
+
+    def hash_candidates(self, *, partial : bool) -> None:
+        """
+        Hash every file that still collides with another, one page at a time.
+
+        Args:
+            partial: Hash files that share a size (True), or files that share a partial hash (False).
+        """
+        if partial:
+            candidates = self.index.iter_missing_partial(self.root)
+        else:
+            candidates = self.index.iter_missing_full(self.root)
+
+        title = 'Comparing' if partial else 'Hashing'
+        with ThreadPoolExecutor(max_workers=self.max_threads) as executor, alive_bar(title=title, unit='files', unknown='waves') as bar:
+            while page := list(islice(candidates, PAGE_SIZE)):
+                results = executor.map(lambda row: self._hash(row[0], partial), page)
+                hashes : list[tuple[str, str]] = []
+                small_files : list[tuple[str, str]] = []
+                for (path, size), file_hash in zip(page, results):
+                    bar()
+                    if file_hash is None:
+                        continue
+                    hashes.append((path, file_hash))
+                    if partial and size <= PARTIAL_HASH_THRESHOLD:
+                        small_files.append((path, file_hash))
+
+                self.index.set_hashes(hashes, partial=partial)
+                if small_files:
+                    # The whole file was read, so there's no need to read it again for the full hash
+                    self.index.set_hashes(small_files, partial=False)
+
+    @staticmethod
+    def _keep_rank(row : tuple[str, int, int, int]) -> tuple[int, int, str]:
+        path, _size, mtime_ns, _inode = row
+        return (mtime_ns, path.count(os.sep), path)
+
+    def _unchanged(self, row : tuple[str, int, int, int]) -> bool:
+        """
+        Check that a file still matches its record, so we never act on stale hashes.
+        """
+        path, size, mtime_ns, inode = row
+        try:
+            file_stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return False
+        return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino) == (size, mtime_ns, inode)
+
+    def resolve_duplicates(self) -> None:
+        """
+        Report or trash the extra copies in every group of identical files.
+        """
+        groups = 0
+        wasted_bytes = 0
+        with alive_bar(title='Resolving', unit='groups', unknown='waves') as bar:
+            for group in self.index.iter_duplicate_groups(self.root):
+                bar()
+                groups += 1
+                keep, *duplicates = sorted(group, key=self._keep_rank)
+                if not self._unchanged(keep):
+                    logger.warning('Skipping duplicates of %s, which changed since it was scanned.', keep[0])
+                    self.record_skip_file(len(duplicates))
+                    continue
+
+                for duplicate in duplicates:
+                    path = Path(duplicate[0])
+                    if duplicate[3] == keep[3]:
+                        logger.debug('Skipping %s, which is a hard link to %s', path, keep[0])
+                        continue
+                    if not self._unchanged(duplicate):
+                        logger.warning('Skipping %s, which changed since it was scanned.', path)
+                        self.record_skip_file()
+                        continue
+
+                    wasted_bytes += duplicate[1]
+                    if not self.trash_duplicates:
+                        logger.info('Duplicate: %s (same as %s)', path, keep[0])
+                        self.record_skip_file()
+                        continue
+
+                    try:
+                        if self.delete_file(path):
+                            self.index.forget(path)
+                    except OSError as e:
+                        logger.error('Unable to trash %s: %s', path, e)
+                        self.record_error()
+
+                bar.text(self.report())
+
+        logger.info('Found %d group(s) of duplicates, wasting %.1f MB. %s', groups, wasted_bytes / 1024 / 1024, self.report())
+
+    def report(self, message_prefix : str | None = None) -> str:
+        """
+        Create a report of the deduplication.
+
+        Args:
+            message_prefix: An optional message to prefix the report with.
+
+        Returns:
+            The report string.
+        """
+        buffer = []
+        if message_prefix:
+            buffer.append(f'{BLUE}{message_prefix[-30:]:31s}{RESET}')
+        if self.files_deleted > 0:
+            buffer.append(f'{PURPLE}{self.files_deleted} trashed{RESET}')
+        if self.files_skipped > 0:
+            buffer.append(f'{PURPLE}{self.files_skipped} kept{RESET}')
+        if self.errors > 0:
+            buffer.append(f'{RED}Errors: {self.errors}{RESET}')
+        return f"{RESET}{' '.join(buffer) or 'No duplicates found'}{RESET}"
+
+class ArgsNamespace(argparse.Namespace):
+    directory : str
+    trash : str | None
+    trash_duplicates : bool
+    index : str
+    hash_index : str
+    max_threads : int
+    dry_run : bool
+    verbose : bool
+
+def main() -> int:
+    logger = setup_logging()
+
+    load_dotenv()
+
+    DEFAULT_TRASH = os.getenv('IMAGEINN_ORGANIZE_TRASH', None)
+    DEFAULT_INDEX = os.getenv('IMAGEINN_DUPLICATE_INDEX', str(DEFAULT_DUPLICATE_INDEX_PATH))
+    DEFAULT_HASH_INDEX = os.getenv('IMAGEINN_HASH_INDEX', str(DEFAULT_HASH_INDEX_PATH))
+
+    parser = argparse.ArgumentParser(description='Find files with identical contents anywhere in an archive.')
+    parser.add_argument('-d', '--directory', default='.', help='Root of the archive (default: current directory)')
+    parser.add_argument('--trash-duplicates', action='store_true', help='Move duplicates to the trash instead of only reporting them')
+    parser.add_argument('--trash', default=DEFAULT_TRASH, help='Directory to move duplicates to. Defaults to env var IMAGEINN_ORGANIZE_TRASH, or .trash/ at the root of the drive')
+    parser.add_argument('--index', default=DEFAULT_INDEX, help=f'SQLite file that records every file between runs. Defaults to env var IMAGEINN_DUPLICATE_INDEX, which is "{DEFAULT_INDEX}"')
+    parser.add_argument('--hash-index', default=DEFAULT_HASH_INDEX, help=f'SQLite file to persist file hashes between runs. Pass an empty string to disable. Defaults to env var IMAGEINN_HASH_INDEX, which is "{DEFAULT_HASH_INDEX}"')
+    parser.add_argument('--max-threads', type=int, default=0, help='Maximum number of threads to use for hashing')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be trashed without moving anything')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Increase verbosity')
+    args = parser.parse_args(namespace=ArgsNamespace())
+
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+
+    deduplicator = ArchiveDeduplicator(
+        directory        = args.directory,
+        trash_directory  = args.trash,
+        trash_duplicates = args.trash_duplicates,
+        index_path       = args.index,
+        hash_index_path  = args.hash_index,
+        max_threads      = args.max_threads,
+        dry_run          = args.dry_run,
+    )
+
+    try:
+        deduplicator.run()
+    except KeyboardInterrupt:
+        logger.warning("Operation interrupted by user")
+        logger.info('Before termination: %s', deduplicator.report())
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -30,7 +30,7 @@ import re
 import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Protocol
+from typing import Callable, Iterator, Protocol
 
 from alive_progress import alive_bar
 
@@ -68,11 +68,39 @@ class Sha256Hasher:
         return hasher.hexdigest()
 
 
-def _iter_files(root: Path, recursive: bool) -> Iterator[Path]:
-    if recursive:
-        yield from (p for p in root.rglob("*") if p.is_file())
-        return
-    yield from (p for p in root.iterdir() if p.is_file())
+# Bytes read from each end of a file for the partial checksum.
+_PARTIAL_CHUNK_BYTES = 64 * 1024
+
+
+def _iter_files(root: Path, recursive: bool) -> Iterator[tuple[Path, int]]:
+    """
+    Yield (path, size) for every file, using the stat data os.scandir already has.
+    """
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(Path(entry.path))
+                    continue
+                if entry.is_file():
+                    yield Path(entry.path), entry.stat().st_size
+
+
+def _partial_checksum(path: Path, size: int) -> str:
+    """
+    Hash the first and last _PARTIAL_CHUNK_BYTES of a file.
+
+    Only used to rule files out cheaply. Files are never deleted on the strength of a partial match.
+    """
+    hasher = hashlib.sha256()
+    with path.open("rb") as file_handle:
+        hasher.update(file_handle.read(_PARTIAL_CHUNK_BYTES))
+        file_handle.seek(max(0, size - _PARTIAL_CHUNK_BYTES))
+        hasher.update(file_handle.read(_PARTIAL_CHUNK_BYTES))
+    return hasher.hexdigest()
 
 
 def _group_key_for(path: Path) -> tuple[Path, str, str]:
@@ -131,6 +159,8 @@ class DuplicateVariantCleaner:
         self._config = config
         self._checksum_cache: dict[Path, str] = {}
         self._checksum_lock = threading.Lock()
+        self._sizes: dict[Path, int] = {}
+        self._partial_checksums: dict[Path, str] = {}
 
     def _compute_checksum(self, path: Path) -> str:
         """
@@ -150,6 +180,61 @@ class DuplicateVariantCleaner:
             self._checksum_cache[path] = checksum
         return checksum
 
+    def _compute_partial_checksum(self, path: Path) -> str:
+        """
+        Compute a head/tail checksum, and remember it.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+        checksum = _partial_checksum(path, self._sizes[path])
+        with self._checksum_lock:
+            self._partial_checksums[path] = checksum
+        return checksum
+
+    def _hash_in_parallel(self, paths: list[Path], compute: Callable[[Path], str], title: str) -> dict[Path, str]:
+        """
+        Run a checksum function over many files with the configured number of workers.
+
+        Returns:
+            A dict of path -> error message, for every file that could not be hashed.
+        """
+        failures: dict[Path, str] = {}
+        if not paths:
+            return failures
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._config.workers,
+            thread_name_prefix="hash",
+        ) as executor, alive_bar(
+            title=title, unit="files", total=len(paths)
+        ) as bar:
+            future_to_path = {executor.submit(compute, path): path for path in paths}
+            for future in concurrent.futures.as_completed(future_to_path):
+                path = future_to_path[future]
+                try:
+                    future.result()
+                except OSError as exc:
+                    failures[path] = str(exc)
+                    logger.warning("Failed to hash %s: %s", path, exc)
+                finally:
+                    bar()
+
+        return failures
+
+    @staticmethod
+    def _groups_with_differences(
+        groups: dict[tuple[Path, str, str], list[Path]],
+        values: dict[Path, object],
+    ) -> set[tuple[Path, str, str]]:
+        """
+        Find groups whose files don't all share one value (i.e. size).
+
+        A group is only cleaned when every variant matches the kept file, so a single difference rules out the
+        whole group, and none of its files need to be hashed.
+        """
+        return {key for key, files in groups.items() if len({values[path] for path in files}) > 1}
+
     def run(self) -> int:
         root = self._config.root
         if not root.exists():
@@ -162,8 +247,9 @@ class DuplicateVariantCleaner:
         groups: dict[tuple[Path, str, str], list[Path]] = {}
         logger.debug("Scanning files under %s...", root)
         with alive_bar(title="Scanning", unit="files", unknown="waves") as bar:
-            for file_path in _iter_files(root, recursive=self._config.recursive):
+            for file_path, size in _iter_files(root, recursive=self._config.recursive):
                 groups.setdefault(_group_key_for(file_path), []).append(file_path)
+                self._sizes[file_path] = size
                 bar()
 
         if not groups:
@@ -171,50 +257,49 @@ class DuplicateVariantCleaner:
             return 0
 
         # Only hash files that are in groups with potential duplicates.
-        files_to_hash: list[Path] = []
-        for files in groups.values():
-            if len(files) >= 2:
-                files_to_hash.extend(files)
-
-        if not files_to_hash:
+        candidates = {key: files for key, files in groups.items() if len(files) >= 2}
+        if not candidates:
             logger.info("No duplicate candidates found under %s", root)
             return 0
 
-        # Deduplicate paths while preserving stability.
-        seen: set[Path] = set()
-        unique_files_to_hash: list[Path] = []
-        for file_path in files_to_hash:
-            if file_path in seen:
-                continue
-            seen.add(file_path)
-            unique_files_to_hash.append(file_path)
+        # Stage 1: files of different sizes can't match, which rules out their group without reading anything.
+        rejected = self._groups_with_differences(candidates, self._sizes)
+
+        # Stage 2: compare the ends of large files, which rules out most similar-sized edits and re-encodes.
+        partial_files = [
+            path
+            for key, files in candidates.items()
+            if key not in rejected
+            for path in files
+            if self._sizes[path] > 2 * _PARTIAL_CHUNK_BYTES
+        ]
+        logger.info("Comparing %d large file(s) by head/tail...", len(partial_files))
+        hash_failures = self._hash_in_parallel(partial_files, self._compute_partial_checksum, "Comparing")
+        partial_groups = {
+            key: files
+            for key, files in candidates.items()
+            if key not in rejected
+            and not any(path in hash_failures for path in files)
+            and all(path in self._partial_checksums for path in files)
+        }
+        rejected |= self._groups_with_differences(partial_groups, self._partial_checksums)
+
+        # Stage 3: a full checksum for every file still in contention.
+        files_to_hash = [
+            path
+            for key, files in candidates.items()
+            if key not in rejected and not any(path in hash_failures for path in files)
+            for path in files
+        ]
 
         logger.info(
-            "Hashing %d file(s) with %d worker(s)...",
-            len(unique_files_to_hash),
+            "Hashing %d file(s) with %d worker(s). %d group(s) ruled out by size or head/tail.",
+            len(files_to_hash),
             self._config.workers,
+            len(rejected),
         )
 
-        hash_failures: dict[Path, str] = {}
-
-        with concurrent.futures.ThreadPoolExecutor(
-            max_workers=self._config.workers,
-            thread_name_prefix="hash",
-        ) as executor, alive_bar(
-            title="Hashing", unit="files", total=len(unique_files_to_hash)
-        ) as bar:
-            future_to_path = {
-                executor.submit(self._compute_checksum, path): path for path in unique_files_to_hash
-            }
-            for future in concurrent.futures.as_completed(future_to_path):
-                path = future_to_path[future]
-                try:
-                    future.result()
-                except OSError as exc:
-                    hash_failures[path] = str(exc)
-                    logger.warning("Failed to hash %s: %s", path, exc)
-                finally:
-                    bar()
+        hash_failures |= self._hash_in_parallel(files_to_hash, self._compute_checksum, "Hashing")
 
         deleted_count = 0
         kept_groups = 0
@@ -224,12 +309,20 @@ class DuplicateVariantCleaner:
         logger.info("Processing %d file(s) in %d group(s)...", files_total, len(groups))
 
         with alive_bar(title="Processing", unit="files", total=files_total) as bar:
-            for (_parent, base_stem, _ext_lower), files in groups.items():
+            for key, files in groups.items():
+                _parent, base_stem, _ext_lower = key
                 if len(files) < 2:
                     for _ in files:
                         bar()
                     continue
 
+                if key in rejected:
+                    skipped_groups += 1
+                    logger.debug("Not deleting for base=%s. Variants differ in size or content.", base_stem)
+                    for _ in files:
+                        bar()
+                    continue
+
                 # If any file in this group failed hashing, skip deletions for safety.
                 if any(path in hash_failures for path in files):
                     skipped_groups += 1
@@ -22,20 +22,22 @@ Python: 3.12
 from __future__ import annotations
 
 import argparse
-import json
 import logging
 import os
 import re
+import queue
 import subprocess
+import threading
 import uuid
 from dataclasses import dataclass
 from datetime import date, datetime, time
 from pathlib import Path
-from typing import Final, Iterable, Optional
+from typing import Callable, Final, Iterable, Optional
 
 from alive_progress import alive_bar
 from pydantic import BaseModel, Field, PositiveInt, ValidationError, field_validator
 
+from scripts.lib.exiftool import ExifToolResult, ExifToolService, get_exiftool
 from scripts.lib.file_manager import FileManager
 
 # --------------------------------------------------------------------------------------
@@ -64,6 +66,10 @@ class AppConfig(BaseModel):
     skip_existing: bool = Field(False, description="If True, skip moves when the destination exists.")
     prefer_piexif: bool = Field(False, description="Force piexif over exiftool where possible.")
     max_depth: PositiveInt = Field(6, description="Maximum directory depth to scan from directory_to_sort.")
+    workers: PositiveInt = Field(
+        default_factory=lambda: os.cpu_count() or 4,
+        description="Number of threads (and exiftool processes) used to update and move files.",
+    )
     verbose: bool = Field(False, description="Enable debug logging.")
 
     @field_validator("base_directory", mode="before")
@@ -317,9 +323,11 @@ class ExifToolUpdater(MetadataUpdater):
         "QuickTime:TrackCreateDate",
     ]
 
-    def __init__(self) -> None:
+    def __init__(self, exiftool: Optional[ExifToolService] = None) -> None:
         self._available = self._check_available()
         self._ffmpeg_available = self._check_ffmpeg_available()
+        # One persistent exiftool process, instead of starting perl for every file.
+        self._exiftool = exiftool
 
     @staticmethod
     def _check_available() -> bool:
@@ -341,6 +349,12 @@ class ExifToolUpdater(MetadataUpdater):
     def available(self) -> bool:
         return self._available
 
+    @property
+    def exiftool(self) -> ExifToolService:
+        if self._exiftool is None:
+            self._exiftool = get_exiftool()
+        return self._exiftool
+
     def _ensure_unique_sibling_path(self, desired_path: Path) -> Path:
         """Return a unique path by appending -{n} if needed."""
         if not desired_path.exists():
@@ -480,24 +494,14 @@ class ExifToolUpdater(MetadataUpdater):
         if not self.available:
             return None
 
-        cmd = ["exiftool", "-j", "-n"]
-        for tag in self._READ_TAGS:
-            cmd.append(f"-{tag}")
-        cmd.append(str(file_path))
-
-        logger.debug("Running exiftool (read): %s", " ".join(cmd))
-        res = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        if res.returncode != 0:
-            logger.debug("exiftool read failed for %s: %s", file_path.name, (res.stderr or "").strip())
+        logger.debug("Reading date tags with exiftool: %s", file_path)
+        try:
+            row = self.exiftool.read_tags([file_path], self._READ_TAGS, numeric=True).get(file_path)
+        except OSError as exc:
+            logger.debug("exiftool read failed for %s: %s", file_path.name, exc)
             return None
 
-        try:
-            payload = json.loads(res.stdout or "[]")
-            if not payload:
-                return None
-            row = payload[0]
-        except Exception as exc:  # noqa: BLE001
-            logger.debug("Failed to parse exiftool JSON for %s: %s", file_path.name, exc)
+        if not row:
             return None
 
         for tag in self._READ_TAGS:
@@ -518,24 +522,23 @@ class ExifToolUpdater(MetadataUpdater):
         dt_str = shot_dt.strftime("%Y:%m:%d %H:%M:%S")
 
         # Update common date tags; -overwrite_original to avoid _original files.
-        def run_exiftool(target_path: Path) -> subprocess.CompletedProcess[str]:
-            cmd = [
-                "exiftool",
-                "-overwrite_original",
-                f"-DateTimeOriginal={dt_str}",
-                f"-CreateDate={dt_str}",
-                f"-TrackCreateDate={dt_str}",
-                f"-MediaCreateDate={dt_str}",
-                str(target_path),
-            ]
-            logger.debug("Running exiftool (write): %s", " ".join(cmd))
-            return subprocess.run(cmd, capture_output=True, text=True, check=False)
+        def run_exiftool(target_path: Path) -> ExifToolResult:
+            logger.debug("Writing date tags with exiftool: %s -> %s", target_path, dt_str)
+            return self.exiftool.write_tags(
+                target_path,
+                {
+                    "DateTimeOriginal": dt_str,
+                    "CreateDate": dt_str,
+                    "TrackCreateDate": dt_str,
+                    "MediaCreateDate": dt_str,
+                },
+            )
 
         if dry_run:
             return True
 
         res = run_exiftool(file_path)
-        if res.returncode == 0:
+        if res.ok:
             return True
 
         stderr = (res.stderr or "").strip()
@@ -554,7 +557,7 @@ class ExifToolUpdater(MetadataUpdater):
 
             # Retry exiftool against the repaired file (now at the original filename).
             res_retry = run_exiftool(file_path)
-            if res_retry.returncode == 0:
+            if res_retry.ok:
                 return True
 
             stderr_retry = (res_retry.stderr or "").strip()
@@ -675,8 +678,8 @@ class CompositeUpdater(MetadataUpdater):
 
     acceptable_date_range: tuple[date, date]
 
-    def __init__(self, prefer_piexif: bool = False) -> None:
-        self.exiftool = ExifToolUpdater()
+    def __init__(self, prefer_piexif: bool = False, exiftool: Optional[ExifToolService] = None) -> None:
+        self.exiftool = ExifToolUpdater(exiftool)
         self.piexif = PiexifUpdater()
         self.prefer_piexif = prefer_piexif
         self.acceptable_date_range = (date(2000, 1, 1), datetime.now().date())
@@ -725,6 +728,20 @@ class CompositeUpdater(MetadataUpdater):
 # --------------------------------------------------------------------------------------
 # File Moving
 # --------------------------------------------------------------------------------------
+class _ProcessStats:
+    """Counters shared by PhotoMover's worker threads."""
+
+    def __init__(self) -> None:
+        self.checked = 0
+        self.moved = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, counter: str, count: int = 1) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + count)
+
+
 class PhotoMover:
     """Finds, validates, updates, and moves photos to correct dated folders."""
 
@@ -736,6 +753,10 @@ class PhotoMover:
         self.updater = updater
         self.acceptable_date_range = (date(2000, 1, 1), datetime.now().date())
         self.mover = FileManager(dry_run=config.dry_run, directory=self.config.base_directory)
+        self._directory_locks: dict[Path, threading.Lock] = {}
+        self._directory_locks_guard = threading.Lock()
+        self._prepared_dirs: set[Path] = set()
+        self._pending_moves: dict[Path, list[Path]] = {}
 
     def scan_files(self) -> Iterable[Path]:
         """Yield candidate files under base_directory (bounded by max_depth)."""
@@ -831,10 +852,19 @@ class PhotoMover:
         return datetime.combine(parsed.shot_date, time.min)
 
     def process(self) -> tuple[int, int]:
-        """Process all candidate files. Returns tuple: (checked, moved)."""
-        moved = 0
-        checked = 0
-        errors = 0
+        """
+        Process all candidate files. Returns tuple: (checked, moved).
+
+        Work is pipelined through a bounded queue:
+        - This thread scans, parses filenames, and skips files that need no work.
+        - config.workers threads read and write metadata, set file times and move files.
+
+        Moves are grouped by destination directory: one worker at a time moves every file queued for a directory,
+        so collision renames stay unique and the directory is prepared once.
+        """
+        stats = _ProcessStats()
+        failures: list[BaseException] = []
+        work: queue.Queue[tuple[Path, ParsedFilenameDatetime] | None] = queue.Queue(maxsize=self.config.workers * 4)
 
         if self.mover.is_same_filesystem(self.config.base_directory, self.config.directory_to_sort or self.config.base_directory):
             logger.info("Moves will be atomic.")
@@ -842,8 +872,11 @@ class PhotoMover:
             logger.info("Moving across Filesystems. Moves will be slow.")
             
         with alive_bar(title="Processing", dual_line=True, unknown="waves") as bar:
+            bar_lock = threading.Lock()
+
             def progress_text(message: str, log_level: int | None = None) -> None:
-                bar.text(f"({moved} →/{errors} E/{checked} ✓) {message}")
+                with bar_lock:
+                    bar.text(f"({stats.moved} →/{stats.errors} E/{stats.checked} ✓) {message}")
                 if log_level is None:
                     return
                 if log_level == logging.INFO:
@@ -855,62 +888,158 @@ class PhotoMover:
                 elif log_level == logging.DEBUG:
                     logger.debug(message)
 
-            for file_path in self.scan_files():
-                try:
-                    checked += 1
-                    filename = file_path.name
+            def advance() -> None:
+                with bar_lock:
+                    bar()
 
-                    parsed = FilenameParser.parse_datetime(filename)
-                    if parsed is None:
-                        progress_text(f"No date in filename: {filename}", log_level=logging.DEBUG)
-                        continue
+            def worker() -> None:
+                while (item := work.get()) is not None:
+                    try:
+                        # After a failure, drain the queue without doing any more work
+                        if not failures:
+                            self._process_file(item[0], item[1], stats, progress_text)
+                    except BaseException as exc:  # noqa: BLE001
+                        failures.append(exc)
+                    finally:
+                        advance()
+
+            threads = [threading.Thread(target=worker, name=f"fix-metadata-{i}", daemon=True) for i in range(self.config.workers)]
+            for thread in threads:
+                thread.start()
 
-                    if not (self.acceptable_date_range[0] <= parsed.shot_date <= self.acceptable_date_range[1]):
-                        progress_text(
-                            (
-                                f"Shot date {parsed.shot_date} for {filename} is outside acceptable range "
-                                f"{self.acceptable_date_range[0]} - {self.acceptable_date_range[1]}; skipping."
-                            ),
-                            log_level=logging.INFO,
-                        )
-                        continue
+            try:
+                for file_path in self.scan_files():
+                    if failures:
+                        break
 
-                    if self.is_correct_location(file_path, parsed.shot_date):
-                        progress_text(f"Already in correct location: {file_path}", log_level=logging.DEBUG)
+                    stats.add("checked")
+                    if (parsed := self._parse_for_processing(file_path, progress_text)) is None:
+                        advance()
                         continue
 
-                    shot_dt = self._resolve_shot_datetime(file_path, parsed)
+                    work.put((file_path, parsed))
+            finally:
+                for _ in threads:
+                    work.put(None)
+                for thread in threads:
+                    thread.join()
 
-                    # Update metadata (best effort)
-                    try:
-                        self.updater.update_datetime(file_path, shot_dt, self.config.dry_run)
-                    except (OSError, PermissionError) as exc:  # noqa: BLE001
-                        errors += 1
-                        progress_text(f"Metadata update failed for {filename}: {exc}", log_level=logging.WARNING)
+        if failures:
+            raise failures[0]
 
-                    # Update filesystem times (best effort)
-                    try:
-                        self._set_file_times(file_path, shot_dt, self.config.dry_run)
-                    except (OSError, PermissionError) as exc:  # noqa: BLE001
-                        errors += 1
-                        progress_text(f"Failed to set file times for {filename}: {exc}", log_level=logging.WARNING)
+        return stats.checked, stats.moved
 
-                    # Compute destination and move
-                    dest_dir = self._expected_dir(self.config.base_directory, parsed.shot_date)
-                    destination = dest_dir / filename
+    def _parse_for_processing(self, file_path: Path, progress_text: Callable[..., None]) -> Optional[ParsedFilenameDatetime]:
+        """Parse a filename, returning None if the file needs no work."""
+        filename = file_path.name
 
-                    try:
-                        destination = self._ensure_unique_destination(destination)
-                        progress_text(f"Moving to: {destination}", log_level=logging.DEBUG)
-                        self.move(file_path, destination)
-                        moved += 1
-                    except FileExistsError as exc:
-                        progress_text(f"Skipping (exists): {exc}", log_level=logging.DEBUG)
-
-                finally:
-                    bar()
+        parsed = FilenameParser.parse_datetime(filename)
+        if parsed is None:
+            progress_text(f"No date in filename: {filename}", log_level=logging.DEBUG)
+            return None
+
+        if not (self.acceptable_date_range[0] <= parsed.shot_date <= self.acceptable_date_range[1]):
+            progress_text(
+                (
+                    f"Shot date {parsed.shot_date} for {filename} is outside acceptable range "
+                    f"{self.acceptable_date_range[0]} - {self.acceptable_date_range[1]}; skipping."
+                ),
+                log_level=logging.INFO,
+            )
+            return None
+
+        if self.is_correct_location(file_path, parsed.shot_date):
+            progress_text(f"Already in correct location: {file_path}", log_level=logging.DEBUG)
+            return None
+
+        return parsed
 
-        return checked, moved
+    def _process_file(
+        self,
+        file_path: Path,
+        parsed: ParsedFilenameDatetime,
+        stats: _ProcessStats,
+        progress_text: Callable[..., None],
+    ) -> None:
+        """Fix the metadata of a single file, and move it to its dated folder. Runs on a worker thread."""
+        filename = file_path.name
+        shot_dt = self._resolve_shot_datetime(file_path, parsed)
+
+        # Update metadata (best effort)
+        try:
+            self.updater.update_datetime(file_path, shot_dt, self.config.dry_run)
+        except (OSError, PermissionError) as exc:  # noqa: BLE001
+            stats.add("errors")
+            progress_text(f"Metadata update failed for {filename}: {exc}", log_level=logging.WARNING)
+
+        # Update filesystem times (best effort)
+        try:
+            self._set_file_times(file_path, shot_dt, self.config.dry_run)
+        except (OSError, PermissionError) as exc:  # noqa: BLE001
+            stats.add("errors")
+            progress_text(f"Failed to set file times for {filename}: {exc}", log_level=logging.WARNING)
+
+        # Queue the move with others into the same directory
+        dest_dir = self._expected_dir(self.config.base_directory, parsed.shot_date)
+        self._queue_move(file_path, dest_dir, stats, progress_text)
+
+    def _queue_move(
+        self,
+        file_path: Path,
+        dest_dir: Path,
+        stats: _ProcessStats,
+        progress_text: Callable[..., None],
+    ) -> None:
+        """
+        Queue a file to be moved into dest_dir, and move the directory's batch if no other worker is doing so.
+
+        A worker that finds the directory busy returns straight away, leaving its file to the worker moving the batch.
+        That worker checks for new files after releasing the lock, so nothing queued is left behind.
+        """
+        with self._directory_locks_guard:
+            self._pending_moves.setdefault(dest_dir, []).append(file_path)
+
+        lock = self._directory_lock(dest_dir)
+        while lock.acquire(blocking=False):
+            try:
+                while batch := self._take_pending_moves(dest_dir):
+                    self._move_batch(batch, dest_dir, stats, progress_text)
+            finally:
+                lock.release()
+
+            with self._directory_locks_guard:
+                if not self._pending_moves.get(dest_dir):
+                    return
+
+    def _take_pending_moves(self, dest_dir: Path) -> list[Path]:
+        with self._directory_locks_guard:
+            return self._pending_moves.pop(dest_dir, [])
+
+    def _move_batch(
+        self,
+        batch: list[Path],
+        dest_dir: Path,
+        stats: _ProcessStats,
+        progress_text: Callable[..., None],
+    ) -> None:
+        """Move files into one destination directory. The caller holds the directory's lock."""
+        if not self.config.dry_run and dest_dir not in self._prepared_dirs:
+            dest_dir.mkdir(parents=True, exist_ok=True)
+            self._prepared_dirs.add(dest_dir)
+
+        for file_path in batch:
+            try:
+                destination = self._ensure_unique_destination(dest_dir / file_path.name)
+                progress_text(f"Moving to: {destination}", log_level=logging.DEBUG)
+                self.move(file_path, destination)
+                stats.add("moved")
+            except FileExistsError as exc:
+                progress_text(f"Skipping (exists): {exc}", log_level=logging.DEBUG)
+
+    def _directory_lock(self, directory: Path) -> threading.Lock:
+        """Get the lock held while a batch of files is moved into a destination directory."""
+        with self._directory_locks_guard:
+            return self._directory_locks.setdefault(directory, threading.Lock())
 
     def move(self, source: Path, destination: Path) -> None:
         """Move file from source to destination."""
@@ -943,6 +1072,7 @@ def build_arg_parser() -> argparse.ArgumentParser:
     parser.add_argument("--skip-existing", action="store_true", help="Skip if destination file exists.")
     parser.add_argument("--prefer-piexif", action="store_true", help="Prefer piexif over exiftool when possible.")
     parser.add_argument("--max-depth", type=int, default=6, help="Max directory depth to scan (default: 6).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker threads and exiftool processes (default: CPU count).")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose logging.")
     return parser
 
@@ -961,14 +1091,16 @@ def main(argv: Optional[list[str]] = None) -> int:
                 prefer_piexif=args.prefer_piexif,
                 max_depth=args.max_depth,
                 verbose=args.verbose,
+                **({"workers": args.workers} if args.workers else {}),
             )
         except ValidationError as exc:
             logger.error("Invalid configuration: %s", exc)
             return 2
 
-        updater = CompositeUpdater(prefer_piexif=config.prefer_piexif)
-        mover = PhotoMover(config, updater)
-        checked, moved = mover.process()
+        with ExifToolService(processes=config.workers) as exiftool:
+            updater = CompositeUpdater(prefer_piexif=config.prefer_piexif, exiftool=exiftool)
+            mover = PhotoMover(config, updater)
+            checked, moved = mover.process()
 
         logger.info(
             "Done. Checked: %s, Moved: %s%s",
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from pathlib import Path
+import pytest
+
+from scripts.monthly.exceptions import DuplicationHandledException
+from scripts.monthly.organize.base import FileOrganizer
+
+
+def test_collision_only_reads_variants_of_the_same_size(tmp_path: Path, monkeypatch, write_file, make_organizer) -> None:
+    target = tmp_path / "target"
+    write_file(target / "IMG_0001.jpg", b"first")
+    write_file(target / "IMG_0001_0.jpg", b"a longer second file")
+    write_file(target / "IMG_0001_1.jpg", b"third")
+    source = write_file(tmp_path / "source" / "IMG_0001.jpg", b"new!!")
+
+    organizer = make_organizer()
+
+    compared: list[str] = []
+    files_match = FileOrganizer.files_match
+
+    def recording_files_match(self, source_file, destination_path, skip_hash=None):
+        compared.append(destination_path.name)
+        return files_match(self, source_file, destination_path, skip_hash)
+
+    monkeypatch.setattr(FileOrganizer, "files_match", recording_files_match)
+
+    assert organizer.handle_collision(source, target / "IMG_0001.jpg") == target / "IMG_0001_2.jpg"
+    assert compared == ["IMG_0001.jpg", "IMG_0001_1.jpg"]
+
+    # The claimed name is taken for the next file, without reading the directory again
+    assert organizer.get_name_index(target).claim_next("IMG_0001", ".jpg") == "IMG_0001_3.jpg"
+
+
+def test_collision_finds_duplicate_among_variants(tmp_path: Path, write_file, make_organizer) -> None:
+    target = tmp_path / "target"
+    write_file(target / "IMG_0001.jpg", b"first")
+    write_file(target / "IMG_0001_0.jpg", b"same")
+    source = write_file(tmp_path / "source" / "IMG_0001.jpg", b"same")
+
+    organizer = make_organizer(trash_directory=tmp_path / "trash")
+    with pytest.raises(DuplicationHandledException):
+        organizer.handle_collision(source, target / "IMG_0001.jpg")
+
+    assert not source.exists()
+    assert organizer.files_duplicated == 1
+    assert sorted(p.name for p in target.iterdir()) == ["IMG_0001.jpg", "IMG_0001_0.jpg"]
+
+
+def test_sidecars_from_two_sources_are_both_kept(tmp_path: Path, write_file, make_organizer) -> None:
+    source = tmp_path / "source"
+    raw = write_file(source / "a" / "PXL_20211009_143747197.ARW", b"raw")
+    write_file(source / "a" / "PXL_20211009_143747197.xmp", b"xmp for raw")
+    jpg = write_file(source / "b" / "PXL_20211009_143747197.JPG", b"jpg")
+    write_file(source / "b" / "PXL_20211009_143747197.xmp", b"xmp for jpg")
+
+    organizer = make_organizer()
+    raw_destination = organizer.process_file(raw)
+    jpg_destination = organizer.process_file(jpg)
+
+    # The raw's sidecar was moved after its name was claimed, so the jpg can't be paired with it
+    assert raw_destination.parent == jpg_destination.parent
+    assert jpg_destination.name == "PXL_20211009_143747197_0.JPG"
+    assert raw_destination.with_suffix(".xmp").read_bytes() == b"xmp for raw"
+    assert jpg_destination.with_suffix(".xmp").read_bytes() == b"xmp for jpg"
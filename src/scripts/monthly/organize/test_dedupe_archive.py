@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from scripts.lib.db import duplicates
+from scripts.lib.db.duplicates import DuplicateIndex
+from scripts.monthly.organize.dedupe_archive import ArchiveDeduplicator
+
+
+def _deduplicator(tmp_path: Path, **kwargs) -> ArchiveDeduplicator:
+    return ArchiveDeduplicator(
+        directory=tmp_path / "archive",
+        trash_directory=tmp_path / "trash",
+        index_path=tmp_path / "index.db",
+        max_threads=2,
+        **kwargs,
+    )
+
+
+def test_trashes_duplicates_across_directories(tmp_path: Path, write_file) -> None:
+    archive = tmp_path / "archive"
+    (tmp_path / "trash").mkdir()
+    large = os.urandom(3 * 1024 * 1024)
+    large_edited = large[:1024 * 1024] + b"x" + large[1024 * 1024 + 1:]
+
+    original = write_file(archive / "2024/2024-01-01/a.jpg", b"same", 1_000)
+    copy = write_file(archive / "backup/nested/b.jpg", b"same", 2_000)
+    same_size = write_file(archive / "other/c.jpg", b"diff", 500)
+    large_original = write_file(archive / "2024/large.mp4", large, 1_000)
+    large_copy = write_file(archive / "dump/large-1.mp4", large, 2_000)
+    large_other = write_file(archive / "dump/large-2.mp4", large_edited, 2_000)
+
+    _deduplicator(tmp_path, trash_duplicates=True).run()
+
+    assert original.exists()
+    assert not copy.exists()
+    assert same_size.exists()
+    assert large_original.exists()
+    assert not large_copy.exists()
+    assert large_other.exists()
+    assert sorted(p.name for p in (tmp_path / "trash").rglob("*") if p.is_file()) == ["b.jpg", "large-1.mp4"]
+
+
+def test_report_only_and_rerun_is_incremental(tmp_path: Path, monkeypatch, write_file) -> None:
+    archive = tmp_path / "archive"
+    first = write_file(archive / "a/photo.jpg", b"same", 1_000)
+    second = write_file(archive / "b/photo.jpg", b"same", 2_000)
+
+    hashed: list[str] = []
+    hash_file = ArchiveDeduplicator.hash_file
+
+    def recording_hash_file(self, filename, *args, **kwargs):
+        hashed.append(str(filename))
+        return hash_file(self, filename, *args, **kwargs)
+
+    monkeypatch.setattr(ArchiveDeduplicator, "hash_file", recording_hash_file)
+
+    deduplicator = _deduplicator(tmp_path)
+    deduplicator.run()
+    assert first.exists() and second.exists()
+    assert deduplicator.files_skipped == 1
+    assert sorted(hashed) == sorted([str(first), str(second)])
+
+    # Nothing changed, so nothing is read again
+    hashed.clear()
+    _deduplicator(tmp_path).run()
+    assert hashed == []
+
+    # Only the changed file is read again
+    write_file(second, b"diff", 3_000)
+    _deduplicator(tmp_path).run()
+    assert hashed == [str(second)]
+
+
+def test_candidates_span_pages(tmp_path: Path, monkeypatch, write_file) -> None:
+    monkeypatch.setattr(duplicates, "PAGE_SIZE", 2)
+    archive = tmp_path / "archive"
+    files = [
+        write_file(archive / f"{i}.jpg", content, 1_000)
+        for i, content in enumerate([b"aa", b"bb", b"aa", b"c", b"ddd", b"eee", b"", b""])
+    ]
+    index = DuplicateIndex(tmp_path / "index.db")
+    try:
+        index.record_files([(path, path.stat()) for path in files], index.next_scan_id())
+
+        # Unique sizes and empty files are never candidates
+        partial = list(index.iter_missing_partial(archive))
+        assert [path for path, _size in partial] == [str(files[i]) for i in (0, 1, 2, 4, 5)]
+
+        # Hashing a page at a time, as the deduplicator does, doesn't change which files collide
+        hashes = iter(index.iter_missing_partial(archive))
+        page = [next(hashes), next(hashes)]
+        index.set_hashes([(page[0][0], "aa"), (page[1][0], "bb"), (str(files[2]), "aa")], partial=True)
+        assert [path for path, _size in hashes] == [str(files[i]) for i in (4, 5)]
+
+        assert [path for path, _size in index.iter_missing_full(archive)] == [str(files[0]), str(files[2])]
+    finally:
+        index.close()
@@ -7,13 +7,9 @@ import pytest
 from scripts.monthly.organize.delete_duplicates import CleanerConfig, DuplicateVariantCleaner, Sha256Hasher
 
 
-def _write(path: Path, content: bytes) -> None:
-    path.write_bytes(content)
-
-
-def test_deletes_identical_variants_multithreaded(tmp_path: Path) -> None:
+def test_deletes_identical_variants_multithreaded(tmp_path: Path, write_file) -> None:
     original = tmp_path / "PXL_20250103_182702167.MP~20250108-094004.jpg"
-    _write(original, b"same")
+    write_file(original, b"same")
 
     v1 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_0-2.jpg"
     v2 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_1-2.jpg"
@@ -21,12 +17,12 @@ def test_deletes_identical_variants_multithreaded(tmp_path: Path) -> None:
     v4 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_5_1.jpg"
     v5 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004 (2).jpg"
     v6 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_0 (2).jpg"
-    _write(v1, b"same")
-    _write(v2, b"same")
-    _write(v3, b"same")
-    _write(v4, b"same")
-    _write(v5, b"same")
-    _write(v6, b"same")
+    write_file(v1, b"same")
+    write_file(v2, b"same")
+    write_file(v3, b"same")
+    write_file(v4, b"same")
+    write_file(v5, b"same")
+    write_file(v6, b"same")
 
     config = CleanerConfig(
         root=tmp_path,
@@ -46,16 +42,16 @@ def test_deletes_identical_variants_multithreaded(tmp_path: Path) -> None:
     assert not v5.exists()
     assert not v6.exists()
 
-def test_does_not_delete_if_any_variant_differs(tmp_path: Path) -> None:
+def test_does_not_delete_if_any_variant_differs(tmp_path: Path, write_file) -> None:
     original = tmp_path / "PXL_20250103_234246990.MP~20250108-094625.jpg"
-    _write(original, b"same")
+    write_file(original, b"same")
 
     v1 = tmp_path / "PXL_20250103_234246990.MP~20250108-094625-1.jpg"
     v2 = tmp_path / "PXL_20250103_234246990.MP~20250108-094625-1-1.jpg"
     v3 = tmp_path / "PXL_20250103_234246990.MP~20250108-094625-2.jpg"
-    _write(v1, b"same")
-    _write(v2, b"same")
-    _write(v3, b"DIFFERENT")
+    write_file(v1, b"same")
+    write_file(v2, b"same")
+    write_file(v3, b"DIFFERENT")
 
     config = CleanerConfig(
         root=tmp_path,
@@ -72,14 +68,14 @@ def test_does_not_delete_if_any_variant_differs(tmp_path: Path) -> None:
     assert v2.exists()
     assert v3.exists()
 
-def test_does_not_delete_different_names(tmp_path: Path) -> None:
+def test_does_not_delete_different_names(tmp_path: Path, write_file) -> None:
     original = tmp_path / "PXL_20250103_234246990.MP~20250108-094625.jpg"
-    _write(original, b"same")
+    write_file(original, b"same")
 
     v1 = tmp_path / "PXL_20250103_234246990.MP~20250108-094625-1.jpg"
     v2 = tmp_path / "DIFFERENT_NAME.jpg"
-    _write(v1, b"same")
-    _write(v2, b"same")
+    write_file(v1, b"same")
+    write_file(v2, b"same")
 
     config = CleanerConfig(
         root=tmp_path,
@@ -95,14 +91,14 @@ def test_does_not_delete_different_names(tmp_path: Path) -> None:
     assert not v1.exists()
     assert v2.exists()
 
-def test_does_not_delete_dry_run(tmp_path: Path) -> None:
+def test_does_not_delete_dry_run(tmp_path: Path, write_file) -> None:
     original = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_0.jpg"
-    _write(original, b"same")
+    write_file(original, b"same")
 
     v1 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_0-2.jpg"
     v2 = tmp_path / "PXL_20250103_182702167.MP~20250108-094004_0-3-1.jpg"
-    _write(v1, b"same")
-    _write(v2, b"same")
+    write_file(v1, b"same")
+    write_file(v2, b"same")
 
     config = CleanerConfig(
         root=tmp_path,
@@ -118,5 +114,36 @@ def test_does_not_delete_dry_run(tmp_path: Path) -> None:
     assert v1.exists()
     assert v2.exists()
 
+class RecordingHasher:
+    def __init__(self) -> None:
+        self.hashed: list[str] = []
+
+    def checksum(self, path: Path) -> str:
+        self.hashed.append(path.name)
+        return Sha256Hasher().checksum(path)
+
+
+def test_only_full_hashes_files_that_survive_size_and_partial(tmp_path: Path, write_file) -> None:
+    big = os.urandom(512 * 1024)
+
+    # Different sizes: never hashed
+    write_file(tmp_path / "IMG_0001.jpg", b"short")
+    write_file(tmp_path / "IMG_0001-1.jpg", b"longer content")
+    # Same size, different tail: ruled out by the partial checksum
+    write_file(tmp_path / "IMG_0002.jpg", big)
+    write_file(tmp_path / "IMG_0002-1.jpg", big[:-1] + b"x")
+    # Identical: fully hashed, and the variant deleted
+    write_file(tmp_path / "IMG_0003.jpg", big)
+    write_file(tmp_path / "IMG_0003-1.jpg", big)
+
+    hasher = RecordingHasher()
+    config = CleanerConfig(root=tmp_path, recursive=False, dry_run=False, hasher=hasher, verbose=False, workers=2)
+    assert DuplicateVariantCleaner(config).run() == 0
+
+    assert sorted(hasher.hashed) == ["IMG_0003-1.jpg", "IMG_0003.jpg"]
+    assert (tmp_path / "IMG_0001-1.jpg").exists()
+    assert (tmp_path / "IMG_0002-1.jpg").exists()
+    assert not (tmp_path / "IMG_0003-1.jpg").exists()
+
 if __name__ == "__main__":
     pytest.main([os.path.abspath(__file__)])
\ No newline at end of file
@@ -7,7 +7,7 @@ from typing import Optional
 
 import pytest
 
-from scripts.monthly.organize.fix_metadata import AppConfig, FilenameParser, PhotoMover, CompositeUpdater, ParsedFilenameDatetime
+from scripts.monthly.organize.fix_metadata import AppConfig, FilenameParser, PhotoMover, CompositeUpdater, ParsedFilenameDatetime, _ProcessStats
 
 class DummyUpdater(CompositeUpdater):
     def __init__(self):
@@ -183,5 +183,46 @@ def test_resolve_datetime_defaults_to_midnight_when_no_time_anywhere(tmp_path: P
     resolved = mover._resolve_shot_datetime(file_path, parsed)
     assert resolved == datetime(2024, 1, 1, 0, 0, 0)
 
+def test_process_parallel_counts_and_collisions(tmp_path: Path) -> None:
+    base = tmp_path / "Photos"
+    # The same filename in many unsorted folders, all destined for one directory
+    for i in range(20):
+        touch_file(base / "unsorted" / f"batch{i}" / "IMG_20231001_000001.jpg")
+    for i in range(10):
+        touch_file(base / "unsorted" / f"IMG_2023100{i % 9 + 1}_{i:06d}.jpg")
+    touch_file(base / "unsorted" / "no-date.jpg")
+
+    cfg = AppConfig(base_directory=base, dry_run=False, max_depth=6, workers=4)
+    checked, moved = PhotoMover(cfg, DummyUpdater()).process()
+
+    assert checked == 31
+    assert moved == 30
+    day = base / "2023" / "2023-10-01"
+    names = {p.name for p in day.iterdir()}
+    assert "IMG_20231001_000001.jpg" in names
+    assert {f"IMG_20231001_000001-{i}.jpg" for i in range(1, 20)} <= names
+
+def test_moves_are_batched_by_destination(tmp_path: Path) -> None:
+    base = tmp_path / "Photos"
+    first = base / "unsorted" / "IMG_20231001_000001.jpg"
+    second = base / "unsorted" / "IMG_20231001_000002.jpg"
+    touch_file(first)
+    touch_file(second)
+
+    mover = PhotoMover(AppConfig(base_directory=base, dry_run=False, max_depth=6), DummyUpdater())  # type: ignore[arg-type]
+    stats = _ProcessStats()
+    day = base / "2023" / "2023-10-01"
+
+    # While another worker is moving into the directory, the file is left for that worker's batch
+    lock = mover._directory_lock(day)
+    with lock:
+        mover._queue_move(first, day, stats, lambda *args, **kwargs: None)
+    assert first.exists() and stats.moved == 0
+
+    # The next worker to get the lock moves everything queued for the directory
+    mover._queue_move(second, day, stats, lambda *args, **kwargs: None)
+    assert stats.moved == 2
+    assert {p.name for p in day.iterdir()} == {first.name, second.name}
+
 if __name__ == "__main__":
     pytest.main([os.path.abspath(__file__)])
\ No newline at end of file
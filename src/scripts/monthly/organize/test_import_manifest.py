@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from pathlib import Path
+import sqlite3
+import pytest
+
+from scripts.lib.db.imports import ImportManifest
+from scripts.monthly.exceptions import DuplicationHandledException
+from scripts.monthly.organize.base import FileOrganizer
+
+
+@pytest.fixture
+def organizer_options(tmp_path: Path) -> dict:
+    return {"copy_mode": True, "import_manifest_path": tmp_path / "imports.db"}
+
+
+def test_copy_skips_files_already_imported(tmp_path: Path, monkeypatch, write_file, make_organizer) -> None:
+    source = write_file(tmp_path / "source" / "IMG_0001.jpg", b"photo")
+
+    copied = make_organizer().process_file(source)
+    assert copied is not None and copied.read_bytes() == b"photo"
+
+    # A later run skips the file before working out (or creating) its destination
+    organizer = make_organizer()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the destination should not be touched")
+
+    monkeypatch.setattr(FileOrganizer, "create_subdir", fail)
+    assert organizer.process_file(source) is None
+    assert organizer.files_skipped == 1
+    monkeypatch.undo()
+
+    # A changed source is imported again
+    write_file(source, b"edited photo", mtime=1_700_000_100)
+    organizer = make_organizer()
+    reimported = organizer.process_file(source)
+    assert reimported is not None and reimported != copied
+    assert reimported.read_bytes() == b"edited photo"
+    assert copied.read_bytes() == b"photo"
+    assert organizer.import_manifest.count_records() == 1
+
+
+def test_existing_duplicates_are_recorded(tmp_path: Path, write_file, make_organizer) -> None:
+    source = write_file(tmp_path / "source" / "IMG_0001.jpg", b"photo")
+    organizer = make_organizer()
+    destination = organizer.create_subdir(source) / source.name
+    write_file(destination, b"photo")
+
+    with pytest.raises(DuplicationHandledException):
+        organizer.process_file(source)
+
+    record = organizer.import_manifest.get(source.absolute(), source.stat(), (tmp_path / "target").absolute())
+    assert record is not None
+    assert record[0] == destination.absolute()
+    assert record[1] == organizer.hash_file(source)
+    assert make_organizer().is_already_imported(source)
+
+
+def test_each_target_is_imported_separately(tmp_path: Path, write_file, make_organizer) -> None:
+    source = write_file(tmp_path / "source" / "IMG_0001.jpg", b"photo")
+    assert make_organizer().process_file(source) is not None
+
+    # The same card imported into a backup drive, sharing the manifest
+    backup = make_organizer(target_directory=tmp_path / "backup")
+    copied = backup.process_file(source)
+    assert copied is not None and copied.is_relative_to(tmp_path / "backup")
+    assert backup.files_skipped == 0
+    assert backup.import_manifest.count_records() == 2
+    assert make_organizer().is_already_imported(source)
+
+
+def test_untargeted_records_are_migrated(tmp_path: Path, write_file) -> None:
+    source = write_file(tmp_path / "source" / "IMG_0001.jpg", b"photo")
+    destination = (tmp_path / "target" / "IMG_0001.jpg").absolute()
+    stat = source.stat()
+    with sqlite3.connect(tmp_path / "imports.db") as conn:
+        conn.execute('''CREATE TABLE imports
+                        (source TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+                         destination TEXT NOT NULL, hash TEXT, imported_at REAL NOT NULL)''')
+        conn.execute('INSERT INTO imports VALUES (?, ?, ?, ?, NULL, 0)',
+                     (str(source.absolute()), stat.st_size, stat.st_mtime_ns, str(destination)))
+    conn.close()
+
+    manifest = ImportManifest(tmp_path / "imports.db")
+    try:
+        # An old record only counts for the target it was copied into
+        assert manifest.get(source.absolute(), stat, (tmp_path / "target").absolute()) == (destination, None)
+        assert manifest.get(source.absolute(), stat, (tmp_path / "backup").absolute()) is None
+    finally:
+        manifest.close()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from pathlib import Path
+import pytest
+
+from scripts.exceptions import ShouldTerminateError
+from scripts.lib.db.plans import OrganizePlan, PlanActions, PlanStatus
+from scripts.monthly.organize.base import FileOrganizer
+
+
+@pytest.fixture
+def organizer_options(tmp_path: Path) -> dict:
+    return {"trash_directory": tmp_path / "trash", "plan_path": tmp_path / "plan.db", "max_threads": 2}
+
+
+def test_plan_file_decides_without_changing_anything(tmp_path: Path, write_file, make_organizer) -> None:
+    organizer = make_organizer()
+    duplicate = write_file(tmp_path / "source" / "IMG_b.jpg", b"same")
+    clash = write_file(tmp_path / "source" / "IMG_a.jpg", b"different")
+    day = tmp_path / "target" / organizer.find_subdir(clash)
+    write_file(day / "IMG_a.jpg", b"existing")
+    write_file(day / "IMG_b.jpg", b"same")
+
+    entry = organizer.plan_file(duplicate)
+    assert (entry.action, entry.destination) == (PlanActions.DELETE, day / "IMG_b.jpg")
+    assert entry.file_hash == organizer.hash_file(duplicate)
+
+    entry = organizer.plan_file(clash)
+    assert (entry.action, entry.destination) == (PlanActions.MOVE, day / "IMG_a_0.jpg")
+
+    # Names are claimed as they are planned
+    other = write_file(tmp_path / "other" / "IMG_a.jpg", b"another")
+    assert organizer.plan_file(other).destination == day / "IMG_a_1.jpg"
+    assert sorted(p.name for p in day.iterdir()) == ["IMG_a.jpg", "IMG_b.jpg"]
+    assert duplicate.exists() and clash.exists()
+
+
+def test_interrupted_run_resumes_from_the_plan(tmp_path: Path, monkeypatch, write_file, make_organizer) -> None:
+    for i in range(6):
+        write_file(tmp_path / "source" / f"IMG_{i}.jpg", f"photo {i}".encode())
+
+    executed: list[Path] = []
+    execute_plan_entry = FileOrganizer.execute_plan_entry
+
+    def crashing_execute_plan_entry(self, entry):
+        executed.append(entry.source)
+        if len(executed) == 3:
+            raise ShouldTerminateError("simulated crash")
+        return execute_plan_entry(self, entry)
+
+    monkeypatch.setattr(FileOrganizer, "execute_plan_entry", crashing_execute_plan_entry)
+    with pytest.raises(ShouldTerminateError):
+        make_organizer().organize_files(cleanup=False)
+
+    plan = OrganizePlan(tmp_path / "plan.db")
+    counts = plan.count_by_status()
+    plan.close()
+    assert counts[PlanStatus.PENDING] > 0
+    assert sum(counts.values()) == 6
+
+    # The next run finishes the remaining entries before planning again, so there's nothing left to plan
+    monkeypatch.undo()
+    planned: list[list[str]] = []
+    plan_files = FileOrganizer.plan_files
+
+    def recording_plan_files(self, *args, **kwargs):
+        planned.append([p.name for p in (tmp_path / "source").iterdir()])
+        return plan_files(self, *args, **kwargs)
+
+    monkeypatch.setattr(FileOrganizer, "plan_files", recording_plan_files)
+    make_organizer().organize_files(cleanup=False)
+
+    assert planned == [[]]
+    assert not list((tmp_path / "source").iterdir())
+    moved = sorted(p.name for p in (tmp_path / "target").rglob("*.jpg"))
+    assert moved == [f"IMG_{i}.jpg" for i in range(6)]
+
+    plan = OrganizePlan(tmp_path / "plan.db")
+    assert sum(plan.count_by_status().values()) == 0
+    plan.close()
+
+
+def test_failed_entries_dont_stop_new_files_being_organized(tmp_path: Path, monkeypatch, write_file, make_organizer) -> None:
+    write_file(tmp_path / "source" / "IMG_1.jpg", b"photo 1")
+    broken = write_file(tmp_path / "source" / "IMG_2.jpg", b"photo 2")
+
+    execute_plan_entry = FileOrganizer.execute_plan_entry
+
+    def failing_execute_plan_entry(self, entry):
+        if entry.source.name == "IMG_2.jpg":
+            raise OSError("simulated I/O error")
+        return execute_plan_entry(self, entry)
+
+    monkeypatch.setattr(FileOrganizer, "execute_plan_entry", failing_execute_plan_entry)
+    make_organizer().organize_files(cleanup=False)
+    monkeypatch.undo()
+    assert broken.exists()
+
+    # The broken file is removed by hand, and a new one arrives
+    broken.unlink()
+    write_file(tmp_path / "source" / "IMG_3.jpg", b"photo 3")
+    make_organizer().organize_files(cleanup=False)
+
+    assert not list((tmp_path / "source").iterdir())
+    assert sorted(p.name for p in (tmp_path / "target").rglob("*.jpg")) == ["IMG_1.jpg", "IMG_3.jpg"]
+    plan = OrganizePlan(tmp_path / "plan.db")
+    assert sum(plan.count_by_status().values()) == 0
+    plan.close()
+
+
+def test_resume_replaces_a_partly_written_destination(tmp_path: Path, monkeypatch, write_file, make_organizer) -> None:
+    content = bytes(range(256)) * 64
+    source = write_file(tmp_path / "source" / "IMG_1.jpg", content)
+
+    def interrupted_execute_plan_entry(self, entry):
+        # The transfer was cut off half way through
+        write_file(entry.destination, content[:len(content) // 2])
+        raise ShouldTerminateError("simulated crash")
+
+    monkeypatch.setattr(FileOrganizer, "execute_plan_entry", interrupted_execute_plan_entry)
+    with pytest.raises(ShouldTerminateError):
+        make_organizer(copy_mode=True).organize_files(cleanup=False)
+    monkeypatch.undo()
+
+    make_organizer(copy_mode=True).organize_files(cleanup=False)
+
+    copies = list((tmp_path / "target").rglob("*.jpg"))
+    assert [p.name for p in copies] == ["IMG_1.jpg"]
+    assert copies[0].read_bytes() == content
+    assert source.read_bytes() == content
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from scripts.lib.file_manager import FileManager
+from scripts.monthly.organize.base import FileOrganizer, FileRouter
+
+
+def _files_under(directory: Path) -> list[str]:
+    return sorted(p.name for p in directory.rglob("*") if p.is_file())
+
+
+def test_routes_each_file_to_first_matching_rule_in_one_walk(tmp_path: Path, monkeypatch, write_file) -> None:
+    source = tmp_path / "source"
+    photography = tmp_path / "p"
+    photos = tmp_path / "photos"
+    write_file(source / "JAM_20240101_0001.arw")
+    write_file(source / "nested/JAM_20240101_0002.jpg")
+    write_file(source / "PXL_20240102_0003.jpg")
+    write_file(source / "PXL_20240102_0004-a7r4-.mp4")
+    write_file(source / "notes.txt")
+
+    walks: list[Path | None] = []
+    scan_files = FileManager.scan_files
+
+    def recording_scan_files(self, directory=None, **kwargs):
+        walks.append(directory)
+        return scan_files(self, directory, **kwargs)
+
+    monkeypatch.setattr(FileManager, "scan_files", recording_scan_files)
+
+    organizer = FileOrganizer(directory=source, max_threads=2)
+    router = FileRouter(organizer, {
+        "*-a7r4-*": photography,
+        "JAM_*.arw": photography,
+        "JAM_*.jpg": photography,
+        "PXL_*.jpg": photos,
+        "PXL_*.mp4": photos,
+    })
+    router.organize_files()
+
+    assert len(walks) == 1
+    assert _files_under(photography) == ["JAM_20240101_0001.arw", "JAM_20240101_0002.jpg", "PXL_20240102_0004-a7r4-.mp4"]
+    assert _files_under(photos) == ["PXL_20240102_0003.jpg"]
+    assert _files_under(source) == ["notes.txt"]
+    # Stats are kept per rule
+    assert [rule.files_moved for _, rule in router.rules] == [1, 1, 1, 1, 0]
+
+
+def test_dry_run_moves_nothing(tmp_path: Path, write_file) -> None:
+    source = tmp_path / "source"
+    photo = write_file(source / "PXL_20240102_0003.jpg")
+
+    organizer = FileOrganizer(directory=source, dry_run=True)
+    FileRouter(organizer, {"PXL_*.jpg": tmp_path / "photos"}).organize_files()
+
+    assert photo.exists()
+    assert _files_under(tmp_path / "photos") == []
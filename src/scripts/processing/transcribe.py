@@ -31,6 +31,7 @@ import sys
 import tempfile
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import partial
 from dataclasses import dataclass
 from datetime import timedelta
 from pathlib import Path
@@ -42,6 +43,8 @@ import pysrt
 import whisper
 from tqdm import tqdm
 
+from scripts.lib.task_stream import stream_tasks
+
 import platform
 
 if platform.system() != "Windows":
@@ -504,11 +507,15 @@ class VideoProcessor:
         
         # Use ThreadPoolExecutor for parallel processing if configured
         if self.config.max_workers > 1:
-            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-                futures = [executor.submit(self.process_file, video_file) 
-                          for video_file in video_files]
-                
-                for future in tqdm(futures, desc="Processing videos", unit="file"):
+            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor, \
+                 tqdm(total=len(video_files), desc="Processing videos", unit="file") as progress:
+                tasks = stream_tasks(
+                    video_files,
+                    partial(executor.submit, self.process_file),
+                    max_pending=self.config.max_workers * 2,
+                    on_progress=lambda _counts: progress.update(),
+                )
+                for _video_file, future in tasks:
                     try:
                         result = future.result()
                         if result:
@@ -0,0 +1,129 @@
+"""
+
+	Metadata:
+
+		File: test_exifcache.py
+		Project: imageinn
+		Created Date: 16 Oct 2026
+		Author: Jess Mann
+		Email: jess.a.mann@gmail.com
+
+		-----
+
+		Last Modified: Fri Oct 16 2026
+		Modified By: Jess Mann
+
+		-----
+
+		Copyright (c) 2026 Jess Mann
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from decimal import Decimal
+from exifread.classes import IfdTag
+from exifread.utils import Ratio
+from scripts.import_sd.photo import Photo
+from scripts.import_sd.exifcache import ExifCache
+from scripts.import_sd.exif import ExifTag
+
+# Tags as exifread returns them, with the values Photo.exif should convert them to
+SAMPLE_TAGS = {
+	ExifTag.CAMERA.value: IfdTag('ILCE-7RM4', 0x0110, 2, 'ILCE-7RM4', 340, 10),
+	ExifTag.ISO.value: IfdTag('100', 0x8827, 3, [100], 0, 2),
+	ExifTag.F_NUMBER.value: IfdTag('28/10', 0x829d, 5, [Ratio(28, 10)], 0, 8),
+	ExifTag.EXPOSURE_BIAS.value: IfdTag('-1/3', 0x9204, 10, [Ratio(-1, 3)], 0, 8),
+}
+SAMPLE_RECORD = {
+	ExifTag.CAMERA.value: 'ILCE-7RM4',
+	ExifTag.ISO.value: 100,
+	ExifTag.F_NUMBER.value: Decimal('2.8'),
+	ExifTag.EXPOSURE_BIAS.value: Decimal(-1) / Decimal(3),
+}
+
+class TestExifCache(unittest.TestCase):
+
+	def setUp(self):
+		self.temp_dir = tempfile.mkdtemp()
+		self.image_path = os.path.join(self.temp_dir, 'IMG_1234.arw')
+		with open(self.image_path, 'wb') as image_file:
+			image_file.write(b'raw data')
+		os.utime(self.image_path, (1_700_000_000, 1_700_000_000))
+
+		self.cache = ExifCache(os.path.join(self.temp_dir, 'exif.db'))
+
+	def tearDown(self):
+		Photo.exif_cache = None
+		self.cache.close()
+		shutil.rmtree(self.temp_dir)
+
+	def test_hit(self):
+		stat = os.stat(self.image_path)
+		self.cache.set(self.image_path, stat, SAMPLE_RECORD)
+		self.assertEqual(self.cache.get(self.image_path, stat), SAMPLE_RECORD)
+		self.assertIsNone(self.cache.get(os.path.join(self.temp_dir, 'IMG_1235.arw'), stat))
+
+	def test_invalidated_by_size(self):
+		self.cache.set(self.image_path, os.stat(self.image_path), SAMPLE_RECORD)
+
+		with open(self.image_path, 'ab') as image_file:
+			image_file.write(b' edited')
+		os.utime(self.image_path, (1_700_000_000, 1_700_000_000))
+
+		self.assertIsNone(self.cache.get(self.image_path, os.stat(self.image_path)))
+
+	def test_invalidated_by_mtime(self):
+		self.cache.set(self.image_path, os.stat(self.image_path), SAMPLE_RECORD)
+
+		os.utime(self.image_path, (1_700_000_100, 1_700_000_100))
+
+		self.assertIsNone(self.cache.get(self.image_path, os.stat(self.image_path)))
+
+	def test_round_trip(self):
+		record = {
+			ExifTag.CAMERA.value: 'ILCE-7RM4',
+			ExifTag.ISO.value: 100,
+			ExifTag.F_NUMBER.value: Decimal('2.8'),
+			ExifTag.EXPOSURE_BIAS.value: Decimal(-1) / Decimal(3),
+			ExifTag.LENS.value: None,
+		}
+		decoded = ExifCache.decode(ExifCache.encode(record))
+		self.assertEqual(decoded, record)
+		self.assertIsInstance(decoded[ExifTag.F_NUMBER.value], Decimal)
+		self.assertIsInstance(decoded[ExifTag.ISO.value], int)
+
+	def test_convert_tag_round_trip(self):
+		converted = {key: Photo._convert_tag(tag) for key, tag in SAMPLE_TAGS.items()}
+		self.assertEqual(converted, SAMPLE_RECORD)
+		self.assertEqual(ExifCache.decode(ExifCache.encode(converted)), converted)
+
+	@patch('exifread.process_file', return_value=SAMPLE_TAGS)
+	def test_photo_parses_once(self, mock_process_file):
+		photo = Photo(self.image_path)
+
+		self.assertEqual(photo.attr(ExifTag.CAMERA), 'ILCE-7RM4')
+		self.assertEqual(photo.attr(ExifTag.ISO), 100)
+		self.assertEqual(photo.attr(ExifTag.F_NUMBER), Decimal('2.8'))
+		self.assertIsNone(photo.attr(ExifTag.LENS))
+		self.assertEqual(mock_process_file.call_count, 1)
+
+	@patch('exifread.process_file', return_value=SAMPLE_TAGS)
+	def test_photo_uses_cache(self, mock_process_file):
+		Photo.exif_cache = self.cache
+
+		self.assertEqual(Photo(self.image_path).exif, SAMPLE_RECORD)
+		self.assertEqual(mock_process_file.call_count, 1)
+
+		# A later run reads the record from the cache, without parsing the file
+		self.assertEqual(Photo(self.image_path).exif, SAMPLE_RECORD)
+		self.assertEqual(mock_process_file.call_count, 1)
+
+		# Until the file changes
+		os.utime(self.image_path, (1_700_000_100, 1_700_000_100))
+		self.assertEqual(Photo(self.image_path).exif, SAMPLE_RECORD)
+		self.assertEqual(mock_process_file.call_count, 2)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -56,7 +56,9 @@ import shutil
 import subprocess
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import argparse
+from scripts.lib.task_stream import stream_tasks
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -256,10 +258,16 @@ class JPGSyncer:
             return
         logger.info('%s JPG files found.', total)
 
-        with ThreadPoolExecutor(max_workers=self.threads) as executor:
-            list(tqdm(executor.map(self.process_file, jpg_files), total=total, desc="Syncing JPG files"))
+        with ThreadPoolExecutor(max_workers=self.threads) as executor, tqdm(total=total, desc="Syncing JPG files") as progress:
+            tasks = stream_tasks(
+                jpg_files,
+                partial(executor.submit, self.process_file),
+                max_pending=self.threads * 2,
+                on_progress=lambda _counts: progress.update(),
+            )
+            failed = sum(1 for _file, future in tasks if not future.result())
 
-        logger.info("Sync completed on %s files.", total)
+        logger.info("Sync completed on %s files. %s failed.", total, failed)
 
     def process_file(self, file: Path) -> bool:
         """
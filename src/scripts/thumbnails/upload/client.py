@@ -0,0 +1,311 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    client.py                                                                                            *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import IO, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.thumbnails.upload.exceptions import AuthenticationError
+from scripts.thumbnails.upload.status import StatusOptions
+
+logger = logging.getLogger(__name__)
+
+# Sent as the deviceId of every asset, so Immich can tell which assets we uploaded
+DEVICE_ID = 'imageinn'
+
+# Bytes handed to the socket per read of a multipart body
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Seconds to wait for a connection to the server
+CONNECT_TIMEOUT = 10
+
+# Checksums sent per request to the bulk upload check
+BULK_CHECK_BATCH_SIZE = 1000
+
+class UploadBackends(Enum):
+    # The immich CLI, started once per file
+    CLI = 'cli'
+    # The asset upload API, over a pooled keep-alive session
+    HTTP = 'http'
+
+@dataclass(frozen=True, slots=True)
+class UploadResult:
+    status: StatusOptions
+    asset_id: str | None = None
+    message: str | None = None
+
+class MultipartBody:
+    """
+    A multipart/form-data body that streams its file from disk.
+
+    The fields and part headers are encoded up front, so the total length is known and the request is sent with a
+    Content-Length, rather than chunked. The file itself is read a chunk at a time as the socket asks for it.
+    """
+
+    def __init__(self, fields: dict[str, str], file_field: str, file_path: Path, content_type: str = 'application/octet-stream'):
+        self.boundary = uuid.uuid4().hex
+        self.file_path = file_path
+
+        head = bytearray()
+        for name, value in fields.items():
+            head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        filename = file_path.name.replace('"', '%22')
+        head += (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode()
+
+        self._head = bytes(head)
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self._file_size = file_path.stat().st_size
+        self._segments: list[bytes | Path] = [self._head, file_path, self._tail]
+        self._current: IO[bytes] | None = None
+        self._pending = b''
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+    def __enter__(self) -> MultipartBody:
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def _read_segment(self, size: int) -> bytes:
+        """
+        Read up to size bytes from the current segment, moving on to the next one when it is exhausted.
+        """
+        while self._segments or self._pending or self._current:
+            if self._pending:
+                chunk, self._pending = self._pending[:size], self._pending[size:]
+                return chunk
+
+            if self._current:
+                chunk = self._current.read(size)
+                if chunk:
+                    return chunk
+                self._current.close()
+                self._current = None
+                continue
+
+            segment = self._segments.pop(0)
+            if isinstance(segment, Path):
+                self._current = segment.open('rb')
+            else:
+                self._pending = segment
+
+        return b''
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self._read_segment(UPLOAD_CHUNK_SIZE), b''))
+        return self._read_segment(size)
+
+    def close(self) -> None:
+        if self._current:
+            self._current.close()
+            self._current = None
+        self._segments.clear()
+        self._pending = b''
+
+class ImmichClient:
+    """
+    Calls the Immich API directly.
+
+    A single requests session is shared by every worker thread. Its connection pool holds one keep-alive connection
+    per thread, so each upload reuses an open (TLS) connection instead of starting a process and logging in.
+    """
+    url : str
+
+    def __init__(self, url: str, api_key: str, *, pool_size: int = 10):
+        self.url = url.rstrip('/')
+        if not self.url.endswith('/api'):
+            self.url += '/api'
+        self.api_key = api_key
+
+        self._session = requests.Session()
+        self._session.headers.update({'x-api-key': api_key, 'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1), pool_block=True)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        self._album_lock = threading.Lock()
+        self._album_ids : dict[str, str] = {}
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, 60))
+        return self._session.request(method, f'{self.url}/{path.lstrip("/")}', **kwargs)
+
+    def authenticate(self) -> None:
+        """
+        Check that the API key is accepted.
+
+        Raises:
+            AuthenticationError: If the server rejects the key.
+        """
+        response = self.request('GET', 'users/me')
+        if response.status_code in (401, 403):
+            raise AuthenticationError(f'Immich rejected the API key: {response.status_code}')
+        response.raise_for_status()
+
+    def upload_asset(self, file_path: Path, *, timeout: float | None = None) -> UploadResult:
+        """
+        Upload a single file as an asset.
+
+        Args:
+            file_path: The file to upload.
+            timeout: Seconds to wait for the server to respond once the file has been sent.
+
+        Returns:
+            The status Immich reported: UPLOADED for a new asset, DUPLICATE for one it already has, or ERROR if the
+            file was rejected (i.e. an unsupported file type).
+
+        Raises:
+            requests.RequestException: If the connection fails, or the server returns a 5xx error. Both are worth
+                retrying.
+        """
+        stat = file_path.stat()
+        modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat()
+        fields = {
+            'deviceAssetId': f'{file_path.name}-{stat.st_size}'.replace(' ', ''),
+            'deviceId': DEVICE_ID,
+            'fileCreatedAt': modified,
+            'fileModifiedAt': modified,
+            'isFavorite': 'false',
+        }
+
+        with MultipartBody(fields, 'assetData', file_path) as body:
+            response = self.request(
+                'POST',
+                'assets',
+                data=body,
+                headers={'Content-Type': body.content_type},
+                timeout=(CONNECT_TIMEOUT, timeout or 60),
+            )
+
+        if response.status_code >= 500:
+            response.raise_for_status()
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+
+        if response.status_code in (401, 403):
+            raise AuthenticationError(f'Immich rejected the API key: {response.status_code}')
+
+        if not response.ok:
+            message = payload.get('message') if isinstance(payload, dict) else None
+            if isinstance(message, list):
+                message = '; '.join(str(m) for m in message)
+            return UploadResult(StatusOptions.ERROR, message=message or response.text[:200])
+
+        match payload.get('status'):
+            case 'created':
+                return UploadResult(StatusOptions.UPLOADED, payload.get('id'))
+            case 'duplicate':
+                return UploadResult(StatusOptions.DUPLICATE, payload.get('id'))
+            case status:
+                return UploadResult(StatusOptions.ERROR, payload.get('id'), f'Unknown status: {status}')
+
+    def bulk_upload_check(self, checksums: dict[str, str]) -> dict[str, str | None]:
+        """
+        Ask the server which files it already has, by SHA-1, without sending them.
+
+        Args:
+            checksums: Hex SHA-1 checksums, keyed on an id chosen by the caller (i.e. the path).
+
+        Returns:
+            The ids of the files the server already has, mapped to the id of its existing asset (if it reported one).
+
+        Raises:
+            requests.RequestException: If a request fails.
+        """
+        existing : dict[str, str | None] = {}
+        items = list(checksums.items())
+        for start in range(0, len(items), BULK_CHECK_BATCH_SIZE):
+            batch = items[start:start + BULK_CHECK_BATCH_SIZE]
+            response = self.request(
+                'POST',
+                'assets/bulk-upload-check',
+                json={'assets': [{'id': id, 'checksum': checksum} for id, checksum in batch]},
+            )
+            response.raise_for_status()
+            for result in response.json().get('results', []):
+                if result.get('action') == 'reject' and result.get('reason') == 'duplicate':
+                    existing[result['id']] = result.get('assetId')
+
+        return existing
+
+    def get_album_id(self, album_name: str) -> str:
+        """
+        Find an album by name, creating it if it doesn't exist. Ids are cached for the life of the client.
+        """
+        with self._album_lock:
+            if album_name in self._album_ids:
+                return self._album_ids[album_name]
+
+            response = self.request('GET', 'albums')
+            response.raise_for_status()
+            for album in response.json():
+                self._album_ids.setdefault(album['albumName'], album['id'])
+
+            if album_name not in self._album_ids:
+                logger.info('Creating album %s', album_name)
+                response = self.request('POST', 'albums', json={'albumName': album_name})
+                response.raise_for_status()
+                self._album_ids[album_name] = response.json()['id']
+
+            return self._album_ids[album_name]
+
+    def add_to_album(self, album_name: str, asset_ids: list[str]) -> None:
+        """
+        Add assets to an album. Assets that are already in it are ignored by the server.
+        """
+        if not asset_ids:
+            return
+        album_id = self.get_album_id(album_name)
+        response = self.request('PUT', f'albums/{album_id}/assets', json={'ids': asset_ids})
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._session.close()
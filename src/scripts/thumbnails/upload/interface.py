@@ -50,6 +50,7 @@ import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
 
 import subprocess
+import requests
 from pathlib import Path
 from pydantic import Field, PrivateAttr, field_validator
 from collections.abc import Iterable
@@ -58,8 +59,9 @@ from scripts import setup_logging
 from scripts.lib.file_manager import FileManager
 from scripts.lib.db import ImagesDatabase
 from scripts.thumbnails.upload.meta import ALLOWED_EXTENSIONS, DEFAULT_DB_PATH, IGNORE_DIRS
+from scripts.thumbnails.upload.client import ImmichClient, UploadBackends
 from scripts.thumbnails.upload.exceptions import AuthenticationError, ConfigurationError
-from scripts.thumbnails.upload.status import FileStatus
+from scripts.thumbnails.upload.status import FileStatus, StatusOptions, SUCCESSFUL_STATUSES
 from scripts.thumbnails.upload.template import FileTemplate
 
 logger = setup_logging()
@@ -80,12 +82,16 @@ class ImmichInterface(FileManager, ABC):
     album : str | None = None
     skip : bool = False
     move_after_upload : Path | None = None
+    upload_backend : UploadBackends = UploadBackends.CLI
 
     _authenticated: bool = PrivateAttr(default=False)
     _db : ImagesDatabase | None = PrivateAttr(default=None)
     _start_ns : int = PrivateAttr(default=0)
     _bytes_lock : threading.Lock = PrivateAttr(default_factory=lambda: threading.Lock())
     _bytes_uploaded : int = PrivateAttr(default=0)
+    _client : ImmichClient | None = PrivateAttr(default=None)
+    _client_lock : threading.Lock = PrivateAttr(default_factory=lambda: threading.Lock())
+    _status_snapshot : dict[Path, dict[str, StatusOptions]] = PrivateAttr(default_factory=dict)
 
     @field_validator('directory', mode="before")
     def validate_directory(cls, v):
@@ -162,6 +168,22 @@ class ImmichInterface(FileManager, ABC):
 
         return self._db
 
+    @property
+    def client(self) -> ImmichClient:
+        """
+        The HTTP client shared by every upload thread, with a connection for each of them.
+        """
+        with self._client_lock:
+            if not self._client:
+                self._client = ImmichClient(self.url, self.api_key, pool_size=self.max_threads)
+            return self._client
+
+    def close_client(self) -> None:
+        with self._client_lock:
+            if self._client:
+                self._client.close()
+                self._client = None
+
     @property
     def bytes_uploaded(self) -> int:
         with self._bytes_lock:
@@ -193,7 +215,17 @@ class ImmichInterface(FileManager, ABC):
             return
 
         logger.debug("Authenticating with Immich at %s", self.url)
-        
+
+        if self.upload_backend == UploadBackends.HTTP:
+            try:
+                self.client.authenticate()
+            except requests.RequestException as e:
+                logger.error("Authentication failed: %s", e)
+                raise AuthenticationError("Authentication failed.") from e
+            self._authenticated = True
+            logger.debug("Authenticated successfully.")
+            return
+
         try:
             self.subprocess(["immich", "login-key", self.url, self.api_key])
             self._authenticated = True
@@ -213,6 +245,37 @@ class ImmichInterface(FileManager, ABC):
         """
         raise NotImplementedError("upload method must be implemented in a subclass.")
 
+    def load_status_snapshot(self, directory: Path, *, recursive: bool = False) -> dict[Path, dict[str, StatusOptions]]:
+        """
+        Load the upload status of every file in a directory (or tree) at once, for was_successful to check.
+
+        Directories are added to the snapshots loaded before, and kept until release_status_snapshot is called, so
+        discovery can run ahead of the uploads that still need them. A snapshot doesn't see statuses recorded afterwards.
+
+        Returns:
+            The status of each file, keyed on its (absolute) directory and then its filename.
+        """
+        snapshot = FileStatus.get_snapshot(directory, recursive=recursive)
+        self._status_snapshot.update(snapshot)
+        return snapshot
+
+    def release_status_snapshot(self, directory: Path | None = None) -> None:
+        """
+        Forget the snapshot of a directory once nothing else will be checked in it, or every snapshot if None.
+        """
+        if directory is None:
+            self._status_snapshot.clear()
+        else:
+            self._status_snapshot.pop(directory.absolute(), None)
+
+    def was_successful(self, image_path: Path) -> bool:
+        """
+        Check if a file was uploaded (or found on the server) before, using the snapshot if it covers the file.
+        """
+        if (statuses := self._status_snapshot.get(image_path.parent.absolute())) is not None:
+            return statuses.get(image_path.name) in SUCCESSFUL_STATUSES
+        return FileStatus.was_successful(image_path)
+
     def should_ignore_file(self, image_path: Path, *, allow_hidden : bool = True, **kwargs : Any) -> bool:
         """
         Check if a file should be ignored based on the extension, size, and status.
@@ -253,7 +316,7 @@ class ImmichInterface(FileManager, ABC):
                 return True
 
         if self.skip:
-            if FileStatus.was_successful(image_path):
+            if self.was_successful(image_path):
                 logger.debug("Skipping already uploaded file %s", image_path)
                 return True
 
@@ -55,13 +55,15 @@ import sys
 import threading
 import time
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Protocol
+from dataclasses import dataclass
+from typing import Iterator, Protocol
 import argparse
+import requests
 from pydantic import PrivateAttr
 from alive_progress import alive_bar
 
+from scripts.lib.db.hashes import DEFAULT_HASH_INDEX_PATH
 from scripts.lib.db.images import ImagesDatabase
 from scripts.thumbnails.upload.meta import DEFAULT_DB_PATH
 
@@ -72,11 +74,13 @@ sys.path.append(PARENT_DIR.absolute().as_posix())
 from scripts import setup_logging
 from scripts.lib.types import ProgressBar, RED, CYAN, CYAN2, YELLOW, YELLOW2, BLUE, PURPLE, RESET
 from scripts.lib.utils import seconds_to_human
+from scripts.lib.io_scheduler import IOScheduler
 from scripts.exceptions import AppError
 from scripts.thumbnails.upload.meta import MAX_RETRIES, SECONDS_PER_RETRY
+from scripts.thumbnails.upload.client import UploadBackends
 from scripts.thumbnails.upload.exceptions import AuthenticationError, ConfigurationError
 from scripts.thumbnails.upload.interface import ImmichInterface
-from scripts.thumbnails.upload.status import FileStatus, DirectoryStatus, StatusOptions
+from scripts.thumbnails.upload.status import FileStatus, DirectoryStatus, DirectoryTotal, StatusOptions, SUCCESSFUL_STATUSES
 from scripts.thumbnails.upload.template import PixelFiles
 
 from threading import Event
@@ -84,9 +88,24 @@ from threading import Event
 
 logger = setup_logging()
 
+@dataclass(slots=True)
+class DirectoryProgress:
+    """
+    Files from a directory that are still being uploaded.
+    """
+    remaining: int
+    file_count: int
+    last_modified_time: float
+    # False once any upload fails in a way that should be retried next run
+    complete: bool = True
+
 class ImmichProgressiveUploader(ImmichInterface):
-    
+    upload_backend : UploadBackends = UploadBackends.HTTP
+    # Ask the server which files it already has (by SHA-1) before uploading each directory
+    precheck : bool = True
+
     _planned_total_files: int = PrivateAttr(default=0)
+    _previous_total_files: int | None = PrivateAttr(default=None)
     _plan_ready: Event = PrivateAttr(default_factory=Event)
     _plan_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
     
@@ -123,16 +142,19 @@ class ImmichProgressiveUploader(ImmichInterface):
         if self.check_dry_run('running immich upload'):
             return StatusOptions.UPLOADED
 
-        command = ["immich", "upload", image_path.as_posix()]
-        if self.album:
-            command.extend(['-A', self.album])
-
         # Timeout is a minimum of 60 seconds, plus 10 seconds per MB
         filesize = self.file_size(image_path)
         extra_timeout = filesize * 10 / (1024 * 1024)
         timeout = 60 + extra_timeout
         logger.debug("Setting upload timeout to %s", seconds_to_human(timeout))
-        
+
+        if self.upload_backend == UploadBackends.HTTP:
+            return self._upload_file_http(image_path, filesize, timeout, retries)
+
+        command = ["immich", "upload", image_path.as_posix()]
+        if self.album:
+            command.extend(['-A', self.album])
+
         attempt = 0
         while attempt <= retries:
             try:
@@ -191,6 +213,113 @@ class ImmichProgressiveUploader(ImmichInterface):
         logger.error('Max retries reached for %s.', image_path)
         return StatusOptions.ERROR
 
+    def _upload_file_http(self, image_path: Path, filesize: int, timeout: float, retries: int = 3) -> StatusOptions:
+        """
+        Upload a file to Immich through the asset API, on the shared connection pool.
+
+        Args:
+            image_path (Path): The file to upload.
+            filesize (int): The size of the file, in bytes.
+            timeout (float): Seconds to wait for the server to respond once the file has been sent.
+            retries (int): How many times to retry after a connection failure or server error.
+
+        Returns:
+            UploadStatus: The status of the upload operation.
+        """
+        attempt = 0
+        while attempt <= retries:
+            try:
+                result = self.client.upload_asset(image_path, timeout=timeout)
+                self.record_bytes_uploaded(filesize)
+
+                match result.status:
+                    case StatusOptions.DUPLICATE:
+                        logger.debug("%s already uploaded.", image_path)
+                    case StatusOptions.UPLOADED:
+                        logger.debug("Uploaded %s successfully.", image_path)
+                    case _:
+                        logger.error("Immich rejected %s: %s", image_path, result.message)
+                        return result.status
+
+                if self.album and result.asset_id:
+                    self.client.add_to_album(self.album, [result.asset_id])
+
+                return result.status
+
+            except requests.RequestException as e:
+                if isinstance(e, requests.Timeout):
+                    reason = 'Connection timed out'
+                elif isinstance(e, requests.ConnectionError):
+                    reason = 'Connection failed'
+                else:
+                    reason = str(e)
+
+                logger.error('%s - Failed to upload %s', reason, image_path.name)
+                attempt += 1
+                if attempt <= retries:
+                    logger.debug(f"Retrying upload in 10 seconds... (Attempt {attempt}/{retries})")
+                    time.sleep(10)
+
+        logger.error('Max retries reached for %s.', image_path)
+        return StatusOptions.ERROR
+
+    def precheck_files(self, files: list[Path], scheduler: IOScheduler) -> list[Path]:
+        """
+        Record files the server already has as duplicates, without uploading them.
+
+        Each file's SHA-1 is calculated (or read from the hash cache), and the checksums for the directory are sent to
+        Immich in bulk. If anything goes wrong, the files are simply uploaded as normal.
+
+        Args:
+            files (list[Path]): The files about to be uploaded.
+            scheduler (IOScheduler): Limits concurrent reads from each device.
+
+        Returns:
+            list[Path]: The files that still need to be uploaded.
+        """
+        if not self.precheck or not files or self.check_dry_run('checking for existing assets'):
+            return files
+
+        self.progress_message(f'Checking {len(files)} files')
+        checksums : dict[str, str] = {}
+        tasks = self.stream_tasks(
+            files,
+            lambda filepath: scheduler.read(filepath, self.hash_file, filepath, False, 'sha1'),
+            max_pending=scheduler.max_workers * 2,
+        )
+        for filepath, future in tasks:
+            try:
+                checksums[str(filepath)] = future.result()
+            except OSError as e:
+                logger.debug("Unable to checksum %s, it will be uploaded: %s", filepath, e)
+
+        try:
+            existing = self.client.bulk_upload_check(checksums)
+        except requests.RequestException as e:
+            logger.warning("Unable to check for existing assets, uploading all files: %s", e)
+            return files
+
+        if not existing:
+            return files
+
+        for filepath in files:
+            if str(filepath) not in existing:
+                continue
+            self.record_duplicate_file()
+            if self.db:
+                self.db.mark_uploaded(filepath)
+            FileStatus.update_status(filepath, StatusOptions.DUPLICATE)
+            self.progress_advance(f'/{str(filepath.parent)[-25:]}/')
+
+        if self.album and (asset_ids := [asset_id for asset_id in existing.values() if asset_id]):
+            try:
+                self.client.add_to_album(self.album, asset_ids)
+            except requests.RequestException as e:
+                logger.error("Unable to add existing assets to album %s: %s", self.album, e)
+
+        logger.info('Server already has %d of %d files', len(existing), len(files))
+        return [f for f in files if str(f) not in existing]
+
     def upload_file_threadsafe(self, image_path: Path) -> StatusOptions:
         """
         Upload a file to Immich in a thread-safe manner.
@@ -302,79 +431,125 @@ class ImmichProgressiveUploader(ImmichInterface):
         if not self.exists(directory):
             raise FileNotFoundError(f"Directory {directory} does not exist.")
 
-        # --- start background counter early; won't block uploads ---
-        try:
-            self._plan_ready.clear()
-            t = threading.Thread(
-                target=self._count_files_background, args=(directory,), daemon=True
-            )
-            t.start()
-        except Exception as e:
-            logger.debug("Unable to start background counter: %s", e)
-        # -----------------------------------------------------------
+        self.reset_discovery(directory)
 
         with alive_bar(
             title=f"{CYAN2}Uploading{RESET} {str(directory.absolute())[-25:]}/",
             unit='files',
             dual_line=True,
             unknown='waves'
-        ) as self._progress_bar:
+        ) as self._progress_bar, self.create_io_scheduler() as scheduler:
             self.progress_message('Searching...')
 
-            for subdir in self.yield_directories(directory, recursive=recursive):
-                self.progress_message(f'Counting files in {subdir.name}')
-                last_modified_time = self.get_last_modified_time(subdir)
-                files_to_upload = self.get_all_files(subdir, recursive=False)
-                file_count = len(files_to_upload)
+            # initialize the start time for calculating upload speed / ETA
+            self._start_ns = self._start_ns or time.time_ns()
 
-                if DirectoryStatus.has_directory_changed(
-                    subdir, file_count, last_modified_time, self.get_glob_patterns()
-                ):
-                    logger.debug('Skipping subdir because it has not changed since last upload: %s', subdir)
-                    continue
+            # Directories with uploads still in progress
+            directories : dict[Path, DirectoryProgress] = {}
 
-                self.progress_message(f'{file_count} files queued')
+            # Uploads mostly wait on the server, so they're held to the upload limit rather than the source disk's
+            tasks = self.stream_tasks(
+                self.discover_files(directory, directories, scheduler, recursive=recursive),
+                lambda filepath: scheduler.schedule(filepath, None, self.upload_file_threadsafe, filepath),
+                max_pending=scheduler.max_workers * 2,
+            )
+            for filepath, future in tasks:
+                progress = directories[filepath.parent]
+                try:
+                    future.result()
+                except OSError as ose:
+                    # Catch error 112 (host is down), or a timeout, and try the directory again next run
+                    if ose.errno == 112 or isinstance(ose, TimeoutError):
+                        progress.complete = False
+                        self._wait_retry(1, f"Upload of {filepath.name} failed: {ose}")
+                    else:
+                        raise
+                except Exception as e:
+                    # Catch, report, and re-raise
+                    self.record_error()
+                    logger.error("Exception during upload: %s", e)
+                    logger.exception(e)
+                    raise
+
+                progress.remaining -= 1
+                if progress.remaining <= 0:
+                    del directories[filepath.parent]
+                    self.release_status_snapshot(filepath.parent)
+                    # IFF every file finished without error, update the DirectoryStatus
+                    if progress.complete:
+                        DirectoryStatus.update(
+                            filepath.parent, progress.file_count, progress.last_modified_time, self.get_glob_patterns()
+                        )
+
+    def reset_discovery(self, root: Path) -> None:
+        """
+        Start a new running total of files to upload, seeded with the total from the last upload of root (if any).
+        """
+        with self._plan_lock:
+            self._planned_total_files = 0
+            self._previous_total_files = DirectoryTotal.get_total(root, self.get_glob_patterns())
+            self._plan_ready.clear()
+        self.release_status_snapshot()
 
-                # Remove previous uploads from the list
-                successful_uploads = FileStatus.get_all_status(subdir, StatusOptions.UPLOADED)
-                files_to_upload = [f for f in files_to_upload if f not in successful_uploads]
-                if (files_to_upload_count := len(files_to_upload)) < 1:
-                    logger.debug('Pruned all files from %s', subdir)
-                    continue
-                if (pruned_count := file_count - files_to_upload_count) > 0:
-                    logger.info('Pruned %d files from %s', pruned_count, subdir)
-
-                with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-                    # initialize the start time for calculating upload speed / ETA
-                    self._start_ns = time.time_ns()
-
-                    futures = []
-                    for filepath in files_to_upload:
-                        futures.append(executor.submit(self.upload_file_threadsafe, filepath))
-
-                    for future in as_completed(futures):
-                        for i in range(MAX_RETRIES):
-                            try:
-                                future.result()
-                            except OSError as ose:
-                                # Catch error 112 (host is down) and retry
-                                if ose.errno == 112:
-                                    self._wait_retry(i, "Host is down")
-                                    continue
-                                raise
-                            except Exception as e:
-                                # Catch, report, and re-raise
-                                self.record_error()
-                                logger.error("Exception during upload: %s", e)
-                                logger.exception(e)
-                                raise
-                                                    
-                            # Finished without an exception, so don't retry
-                            break
-
-                # IFF we finish looping without error, update the DirectoryStatus
+    def discover_files(self, root: Path, directories: dict[Path, DirectoryProgress], scheduler: IOScheduler, *, recursive: bool = True) -> Iterator[Path]:
+        """
+        Walk the tree once, yielding the files to upload as each directory is listed.
+
+        Unchanged directories and previous uploads are pruned, and files the server already has are recorded as
+        duplicates. The number of files queued is kept as a running total for the ETA, and saved when the walk is
+        finished, to seed the ETA next time.
+
+        Args:
+            root (Path): The directory to upload.
+            directories (dict): Filled with the progress of each directory that has files queued, so the caller can
+                update its DirectoryStatus once they're all uploaded.
+            scheduler (IOScheduler): Used to checksum files for the precheck.
+            recursive (bool): Whether to upload recursively.
+        """
+        for subdir in self.yield_directories(root, recursive=recursive):
+            self.progress_message(f'Counting files in {subdir.name}')
+            last_modified_time = self.get_last_modified_time(subdir)
+            files_to_upload = self.get_all_files(subdir, recursive=False)
+            file_count = len(files_to_upload)
+
+            if DirectoryStatus.has_directory_changed(
+                subdir, file_count, last_modified_time, self.get_glob_patterns()
+            ):
+                logger.debug('Skipping subdir because it has not changed since last upload: %s', subdir)
+                continue
+
+            # Remove previous uploads from the list (and duplicates, with --skip)
+            statuses = self.load_status_snapshot(subdir).get(subdir.absolute(), {})
+            prune = SUCCESSFUL_STATUSES if self.skip else (StatusOptions.UPLOADED,)
+            previous_uploads = {filename for filename, status in statuses.items() if status in prune}
+            files_to_upload = [f for f in files_to_upload if f.name not in previous_uploads]
+            if (pruned_count := file_count - len(files_to_upload)) > 0:
+                logger.info('Pruned %d files from %s', pruned_count, subdir)
+
+            with self._plan_lock:
+                self._planned_total_files += len(files_to_upload)
+            self.progress_message(f'{len(files_to_upload)} files queued')
+
+            # Files the server already has are recorded as duplicates, without sending them
+            files_to_upload = self.precheck_files(files_to_upload, scheduler)
+
+            if not files_to_upload:
+                # Every file is accounted for, so there's nothing to wait for
+                logger.debug('Pruned all files from %s', subdir)
                 DirectoryStatus.update(subdir, file_count, last_modified_time, self.get_glob_patterns())
-                
+                self.release_status_snapshot(subdir)
+                continue
+
+            # The snapshot is kept until the directory's uploads are finished, and released by upload()
+            directories[subdir] = DirectoryProgress(len(files_to_upload), file_count, last_modified_time)
+            yield from files_to_upload
+
+        with self._plan_lock:
+            total = self._planned_total_files
+            self._plan_ready.set()
+        DirectoryTotal.update(root, total, self.get_glob_patterns())
+        self.progress_message("ETA ready")
+
     def upload_from_db(self):
         """
         Upload files from a database to Immich.
@@ -390,18 +565,21 @@ class ImmichProgressiveUploader(ImmichInterface):
         with alive_bar(total=total, title=f"{CYAN2}Uploading from db{RESET}", unit='files', dual_line=True, unknown='waves') as self._progress_bar:
             self.progress_message('Searching DB...')
             
-            with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-                futures = []
-                for image_path in self.db.get_images(uploaded=False):
-                    # Ensure the image still exists
-                    if not self.exists(image_path):
-                        logger.warning("File %s no longer exists.", image_path)
-                        continue
-
-                    future = executor.submit(self.upload_file_threadsafe, image_path)
-                    futures.append(future)
+            with self.create_io_scheduler() as scheduler:
+                def existing_images() -> Iterator[Path]:
+                    for image_path in self.db.get_images(uploaded=False):
+                        # Ensure the image still exists
+                        if not self.exists(image_path):
+                            logger.warning("File %s no longer exists.", image_path)
+                            continue
+                        yield image_path
 
-                for future in as_completed(futures):
+                tasks = self.stream_tasks(
+                    existing_images(),
+                    lambda image_path: scheduler.schedule(image_path, None, self.upload_file_threadsafe, image_path),
+                    max_pending=scheduler.max_workers * 2,
+                )
+                for _image_path, future in tasks:
                     try:
                         future.result()
                     except Exception as e:
@@ -450,55 +628,9 @@ class ImmichProgressiveUploader(ImmichInterface):
         self.upload(sd_directory)
         return True
 
-    def _count_files_background(self, root: Path) -> None:
-        """
-        Count, in the background, how many files *will* be attempted for upload.
-        Respects templates, ignore rules, 'skip', and unchanged-directory pruning.
-        When finished, sets self._planned_total_files and flips self._plan_ready.
-        """
-        try:
-            total = 0
-            for subdir in self.yield_directories(root, recursive=True):
-                try:
-                    last_modified_time = self.get_last_modified_time(subdir)
-                    # List candidates quickly (non-recursive per your main loop)
-                    files = self.get_all_files(subdir, recursive=False)
-                    file_count = len(files)
-
-                    # Mimic main-loop pruning: skip unchanged dirs
-                    if DirectoryStatus.has_directory_changed(
-                        subdir, file_count, last_modified_time, self.get_glob_patterns()
-                    ):
-                        continue
-
-                    # Remove files that won't be processed (skip per status/templates/etc)
-                    # - honor per-file ignore rules and 'skip' of already-successful uploads
-                    pruned = 0
-                    for f in files:
-                        if self.should_ignore_file(f):
-                            pruned += 1
-                            continue
-                        if self.skip and FileStatus.was_successful(f):
-                            pruned += 1
-                            continue
-                        total += 1
-                except Exception as e:
-                    # Non-fatal: keep counting other dirs
-                    logger.debug("Background count error in %s -> %s", subdir, e)
-
-            with self._plan_lock:
-                self._planned_total_files = total
-                self._plan_ready.set()
-            # Nudge the UI once plan is ready; message kept short to avoid noise.
-            self.progress_message("ETA ready")
-        except Exception as e:
-            logger.error("Background counting failed: %s", e)
-            # Still flip the event so we don't wait forever; total stays 0.
-            self._plan_ready.set()
-
     def report(self, message_prefix: str | None = None) -> str:
         """
-        Create a report of the process so far (extended to include ETA once count is ready).
+        Create a report of the process so far (extended to include ETA once a total is known).
 
         Args:
             message_prefix: An optional message to prefix the report with.
@@ -538,33 +670,35 @@ class ImmichProgressiveUploader(ImmichInterface):
             speed_str = f"{BLUE}{upload_speed} MB/s{RESET}"
             buffer.append(f"{speed_str:10s}")
 
-        # --- ETA once background count finishes ---
-        if self._plan_ready.is_set():
-            with self._plan_lock:
-                planned = self._planned_total_files
-            processed = (
-                self.files_uploaded
-                + self.files_duplicated
-                + self.errors
-            )
+        # --- ETA, from the running total, or the last run's total until discovery finishes ---
+        with self._plan_lock:
+            planned = self._planned_total_files
+            if not self._plan_ready.is_set():
+                planned = max(planned, self._previous_total_files) if self._previous_total_files else 0
 
-            if planned > 0:
-                total = max(0, planned - self.files_skipped)
-                remaining = max(0, total - processed)
-                # time basis: elapsed seconds since first upload started
-                if self._start_ns and processed > 0:
-                    elapsed = max(1e-6, (time.time_ns() - self._start_ns) / 1e9)
-                    files_per_sec = processed / elapsed
-                    if files_per_sec > 0:
-                        eta_secs = int(remaining / files_per_sec)
-                        eta_str = seconds_to_human(eta_secs)
-                    else:
-                        eta_str = "--"
+        processed = (
+            self.files_uploaded
+            + self.files_duplicated
+            + self.errors
+        )
+
+        if planned > 0:
+            total = max(0, planned - self.files_skipped)
+            remaining = max(0, total - processed)
+            # time basis: elapsed seconds since first upload started
+            if self._start_ns and processed > 0:
+                elapsed = max(1e-6, (time.time_ns() - self._start_ns) / 1e9)
+                files_per_sec = processed / elapsed
+                if files_per_sec > 0:
+                    eta_secs = int(remaining / files_per_sec)
+                    eta_str = seconds_to_human(eta_secs)
                 else:
                     eta_str = "--"
+            else:
+                eta_str = "--"
 
-                eta_disp = f"{YELLOW}ETA:{RESET} {eta_str} {YELLOW2}({remaining} left/{total}){RESET}"
-                buffer.append(f"{eta_disp:28s}")
+            eta_disp = f"{YELLOW}ETA:{RESET} {eta_str} {YELLOW2}({remaining} left/{total}){RESET}"
+            buffer.append(f"{eta_disp:28s}")
 
         if file_buffer:
             files_str = f"{PURPLE}Files [{', '.join(file_buffer)}]{RESET}"
@@ -584,10 +718,13 @@ class ImmichProgressiveUploader(ImmichInterface):
         """
         Run the uploader.
         """
-        if self.db:
-            self.upload_from_db()
-        else:
-            self.upload()
+        try:
+            if self.db:
+                self.upload_from_db()
+            else:
+                self.upload()
+        finally:
+            self.close_client()
 
 class ArgNamespace(argparse.Namespace):
     """
@@ -608,6 +745,10 @@ class ArgNamespace(argparse.Namespace):
     album : str
     skip : bool
     move_after_upload : str | None = None
+    device_limit : list[str]
+    backend : str
+    no_precheck : bool = False
+    hash_index : str
     info : bool = False
     
 def validate_args(args: ArgNamespace) -> bool:
@@ -639,6 +780,9 @@ def main():
         thumbnails_dir = os.getenv("IMMICH_THUMBNAILS_DIR", '.')
         
         url = os.getenv("IMMICH_INSTANCE_URL")
+        # The same index as organize. The precheck's SHA-1s are kept separately from organize's hashes, so a file
+        # is only read once across runs, even if its directory is checked again (i.e. after a failed upload).
+        hash_index = os.getenv('IMAGEINN_HASH_INDEX', str(DEFAULT_HASH_INDEX_PATH))
         if home_network := ImmichProgressiveUploader.is_home_network():
             logger.info('Detected home network.')
             url = os.getenv("IMMICH_LOCAL_URL")
@@ -660,6 +804,10 @@ def main():
         parser.add_argument('--album', '-A', help='Immich album to upload files to')
         parser.add_argument('--skip', help='Skip assets that were previously uploaded.', action='store_true')
         parser.add_argument('--move-after-upload', help='Move files to this directory after uploading', default=None)
+        parser.add_argument('--device-limit', action='append', default=[], metavar='KIND=LIMIT', help='Concurrent reads allowed per source device of this kind (hdd, ssd, network, unknown), or concurrent uploads (upload). May be repeated')
+        parser.add_argument('--backend', choices=[b.value for b in UploadBackends], default=os.getenv('IMMICH_UPLOAD_BACKEND', UploadBackends.HTTP.value), help='Upload through the Immich API directly (http), or by running the immich CLI for each file (cli)')
+        parser.add_argument('--no-precheck', action='store_true', help='Upload every file, without first asking Immich which files it already has')
+        parser.add_argument('--hash-index', default=hash_index, help=f'SQLite file to persist file hashes between runs, so the precheck only reads new or changed files. Pass an empty string to disable. Defaults to env var IMAGEINN_HASH_INDEX, which is "{hash_index}"')
         parser.add_argument('--info', action='store_true', help='Show information about the script and exit')
         parser.add_argument("import_path", nargs='?', default=thumbnails_dir, help="Path to import files from")
         args = parser.parse_args(namespace=ArgNamespace())
@@ -727,7 +875,11 @@ def main():
             # ...On the local network, disable skipping large files.
             # ...Everywhere else, use the default large file size of 100MB.
             large_file_size = 0 if home_network else (1024 * 1024 * 100),
-            move_after_upload=args.move_after_upload
+            move_after_upload=args.move_after_upload,
+            device_limits=args.device_limit,
+            upload_backend=args.backend,
+            precheck=not args.no_precheck,
+            hash_index_path=args.hash_index,
         )
                 
         try:
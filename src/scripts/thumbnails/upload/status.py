@@ -23,8 +23,12 @@
 *                                                                                                                      *
 *********************************************************************************************************************"""
 from __future__ import annotations
+import atexit
 import os
+import queue
 import sys
+import threading
+import time
 
 # Add the root directory of the project to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
@@ -34,7 +38,8 @@ from pathlib import Path
 from typing import Iterator, Self
 
 import sqlalchemy.exc
-from sqlalchemy import create_engine, Column, String, Float, Integer, Enum as SQLEnum
+from sqlalchemy import and_, or_, create_engine, event, text, Column, String, Float, Integer, Engine, Enum as SQLEnum
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, Query
 
@@ -45,19 +50,81 @@ logger = setup_logging()
 # When version increases, directories will be reprocessed even if their last modified time hasn't changed.
 VERSION = 3
 
+# File statuses are written in batches of up to this many rows...
+STATUS_BATCH_SIZE = 500
+# ...or after waiting this many seconds for a batch to fill
+STATUS_FLUSH_INTERVAL = 0.25
+
 class StatusOptions(Enum):
     UPLOADED = 'uploaded'
     SKIPPED = 'skipped'
     DUPLICATE = 'duplicate'
     ERROR = 'error'
 
+# Statuses that never replace one already recorded for a file
+WEAK_STATUSES = (StatusOptions.SKIPPED, StatusOptions.DUPLICATE)
+
+# Statuses that mean the server has the file
+SUCCESSFUL_STATUSES = (StatusOptions.UPLOADED, StatusOptions.DUPLICATE)
+
 Base = declarative_base()
 
+FILE_STATUS_INDEX = 'ix_upload_status_directory_filename'
+
 class DbManager:
     """
     A class to manage the database connection and session.
     """
     _sessionmaker: sessionmaker | None = None
+    _status_writer: StatusWriter | None = None
+    _writer_lock = threading.Lock()
+
+    @classmethod
+    def create_engine(cls, db_path: Path) -> Engine:
+        """
+        Open the database, creating and migrating tables as necessary.
+
+        WAL lets the status writer commit while other threads read, and synchronous=NORMAL means a commit doesn't
+        wait for an fsync (the last few commits can be lost in a power cut, but the database can't be corrupted).
+        """
+        engine = create_engine(f'sqlite:///{db_path}', pool_size=10, max_overflow=20)
+
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, _connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.close()
+
+        Base.metadata.create_all(engine)
+        cls._create_unique_index(engine)
+        return engine
+
+    @classmethod
+    def _create_unique_index(cls, engine: Engine) -> None:
+        """
+        Add the unique index on upload_status (directory, filename), which the status writer upserts against.
+
+        Older databases can hold several rows for the same file. The first was the one kept up to date, so the others
+        are removed before the index is created.
+        """
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"),
+                {'name': FILE_STATUS_INDEX},
+            ).first()
+            if exists:
+                return
+
+            deleted = connection.execute(text(
+                'DELETE FROM upload_status WHERE id NOT IN '
+                '(SELECT MIN(id) FROM upload_status GROUP BY directory, filename)'
+            )).rowcount
+            if deleted:
+                logger.info('Removed %d duplicate file status records.', deleted)
+            connection.execute(text(
+                f'CREATE UNIQUE INDEX {FILE_STATUS_INDEX} ON upload_status (directory, filename)'
+            ))
 
     @classmethod
     def initialize_db(cls):
@@ -66,8 +133,7 @@ class DbManager:
         """
         project_root = Path(__file__).parent.parent.parent.parent
         db_path = project_root / 'file_status.db'
-        engine = create_engine(f'sqlite:///{db_path}', pool_size=10, max_overflow=20)
-        Base.metadata.create_all(engine)
+        engine = cls.create_engine(db_path)
         cls._sessionmaker = sessionmaker(bind=engine)
 
         file_records = FileStatus.count_records()
@@ -80,6 +146,169 @@ class DbManager:
             raise ValueError("Database not initialized.")
         return cls._sessionmaker()
 
+    @classmethod
+    def get_status_writer(cls) -> StatusWriter:
+        with cls._writer_lock:
+            if cls._status_writer is None:
+                if cls._sessionmaker is None:
+                    raise ValueError("Database not initialized.")
+                cls._status_writer = StatusWriter(cls._sessionmaker)
+            return cls._status_writer
+
+    @classmethod
+    def flush(cls) -> None:
+        """
+        Wait until every queued status has been written.
+        """
+        with cls._writer_lock:
+            writer = cls._status_writer
+        if writer:
+            writer.flush()
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        Write any queued statuses and stop the writer thread. Later status updates are written immediately.
+        """
+        with cls._writer_lock:
+            writer = cls._status_writer
+        if writer:
+            writer.close()
+
+class StatusWriter:
+    """
+    Writes file statuses on a background thread.
+
+    Workers queue a row and carry on. The writer thread collects rows until it has STATUS_BATCH_SIZE of them, or
+    STATUS_FLUSH_INTERVAL seconds have passed, then upserts the whole batch in a single transaction. Rows that are
+    queued, but not yet written, are kept in memory so reads still see them.
+    """
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, session_factory: sessionmaker, *, batch_size: int = STATUS_BATCH_SIZE, flush_interval: float = STATUS_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._sessionmaker = session_factory
+        self._queue : queue.Queue = queue.Queue()
+        self._pending : dict[tuple[str, str], dict] = {}
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='status-writer', daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def merge_status(current: StatusOptions | None, status: StatusOptions) -> StatusOptions:
+        """
+        The status a file ends up with when status is recorded over current. SKIPPED and DUPLICATE never overwrite.
+        """
+        if current is None or status not in WEAK_STATUSES:
+            return status
+        return current
+
+    def put(self, directory: str, filename: str, status: StatusOptions, last_processed_time: float) -> None:
+        """
+        Queue a file's status to be written.
+        """
+        row = {
+            'directory': directory,
+            'filename': filename,
+            'status': status,
+            'last_processed_time': last_processed_time,
+            'version': VERSION,
+        }
+
+        if self._closed:
+            self._write([row])
+            return
+
+        key = (directory, filename)
+        with self._pending_lock:
+            current = self._pending.get(key)
+            if current is None or self.merge_status(current['status'], status) is status:
+                self._pending[key] = row
+        self._queue.put(row)
+
+    def get_pending(self, directory: str, filename: str) -> StatusOptions | None:
+        """
+        The status queued for a file, if it hasn't been written yet.
+        """
+        with self._pending_lock:
+            row = self._pending.get((directory, filename))
+        return row['status'] if row else None
+
+    def flush(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch : list[dict] = []
+            received = 0
+            deadline = None
+            while len(batch) < self.batch_size:
+                try:
+                    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                received += 1
+                if item is self._STOP:
+                    stop = True
+                    break
+                if item is self._FLUSH:
+                    break
+                batch.append(item)
+                deadline = deadline or time.monotonic() + self.flush_interval
+
+            try:
+                if batch:
+                    self._write(batch)
+            finally:
+                for _ in range(received):
+                    self._queue.task_done()
+
+    def _write(self, batch: list[dict]) -> None:
+        """
+        Upsert a batch of rows in one transaction.
+        """
+        statement = insert(FileStatus)
+        statement = statement.on_conflict_do_update(
+            index_elements=['directory', 'filename'],
+            set_={
+                'status': statement.excluded.status,
+                'last_processed_time': statement.excluded.last_processed_time,
+                'version': statement.excluded.version,
+            },
+            # NOT IN can't be used in an executemany, so compare against each status in turn
+            where=and_(*(statement.excluded.status != status for status in WEAK_STATUSES)),
+        )
+
+        session = self._sessionmaker()
+        try:
+            session.execute(statement, batch)
+            session.commit()
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            logger.error("Error updating status: %s", e)
+            session.rollback()
+        finally:
+            session.close()
+            with self._pending_lock:
+                for row in batch:
+                    key = (row['directory'], row['filename'])
+                    if self._pending.get(key) is row:
+                        del self._pending[key]
+
 class FileStatus(Base):
     __tablename__ = 'upload_status'
     
@@ -95,55 +324,39 @@ class FileStatus(Base):
     def get_status(cls, file_path : Path) -> StatusOptions | None:
         directory = file_path.parent
         filename = file_path.name
-        
+        pending = DbManager.get_status_writer().get_pending(str(directory), filename)
+
+        # Nothing queued can replace an uploaded or failed status, so the db doesn't need to be checked
+        if pending is not None and pending not in WEAK_STATUSES:
+            return pending
+
         session = DbManager.get_session()
         try:
             record = (session.query(FileStatus)
                              .filter_by(directory=str(directory), filename=filename)
                              .first())
+            if pending is not None:
+                return StatusWriter.merge_status(record.status if record else None, pending)
             return record.status if record else None
         finally:
             session.close()
 
     @classmethod
     def update_status(cls, file_path : Path, status: StatusOptions):
+        """
+        Record the status of a file. The status is written in the background, with others, by the StatusWriter.
+
+        If the file already has a status, SKIPPED and DUPLICATE do not overwrite it.
+        """
         directory = file_path.parent.absolute()
-        filename = file_path.name
 
         # We need directory to exist and be a directory
-        if not directory.exists():
-            raise FileNotFoundError(f"Directory {directory} does not exist.")
-
-        session = DbManager.get_session()
         try:
-            record = (session.query(FileStatus)
-                             .filter_by(directory=str(directory), filename=filename)
-                             .first())
-
             last_processed_time = directory.stat().st_mtime
-            if record is None:
-                record = FileStatus(
-                    directory=str(directory),
-                    filename=filename,
-                    status=status,
-                    last_processed_time=last_processed_time,
-                    version=VERSION
-                )
-                session.add(record)
-            else:
-                # If updating to SKIPPED, do not overwrite an existing status
-                if status in [StatusOptions.SKIPPED, StatusOptions.DUPLICATE]:
-                    return
-                
-                record.status = status
-                record.last_processed_time = last_processed_time
-                record.version = VERSION
-            session.commit()
-        except sqlalchemy.exc.SQLAlchemyError as e:
-            logger.error("Error updating status: %s", e)
-            session.rollback()
-        finally:
-            session.close()
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"Directory {directory} does not exist.") from e
+
+        DbManager.get_status_writer().put(str(directory), file_path.name, status, last_processed_time)
 
     @classmethod
     def upload_success(cls, file_path : Path):
@@ -160,7 +373,7 @@ class FileStatus(Base):
     @classmethod
     def was_successful(cls, file_path : Path) -> bool:
         s = cls.get_status(file_path)
-        return s in [StatusOptions.DUPLICATE, StatusOptions.UPLOADED]
+        return s in SUCCESSFUL_STATUSES
 
     @classmethod
     def was_failed(cls, file_path : Path) -> bool:
@@ -175,6 +388,7 @@ class FileStatus(Base):
         """
         Iterate over all files and their status for a given directory.
         """
+        DbManager.flush()
         session = DbManager.get_session()
         try:
             records = (session.query(FileStatus)
@@ -190,6 +404,7 @@ class FileStatus(Base):
         """
         Iterate over all files with a given status in the specified directory.
         """
+        DbManager.flush()
         session = DbManager.get_session()
         try:
             records = (session.query(FileStatus)
@@ -200,6 +415,42 @@ class FileStatus(Base):
         finally:
             session.close()
 
+    @classmethod
+    def get_snapshot(cls, directory: Path, *, recursive: bool = False) -> dict[Path, dict[str, StatusOptions]]:
+        """
+        Load the status of every file in a directory, or a whole tree, with a single query.
+
+        Args:
+            directory: The directory to load.
+            recursive: Whether to include every directory below it.
+
+        Returns:
+            The status of each file, keyed on its (absolute) directory and then its filename, so files can be looked up
+            as a directory's entries are listed.
+        """
+        DbManager.flush()
+        directory = directory.absolute()
+        session = DbManager.get_session()
+        try:
+            query = session.query(FileStatus.directory, FileStatus.filename, FileStatus.status)
+            if recursive:
+                # Every path below the directory sorts between "directory/" and "directory0" ('0' follows '/'), so
+                # the (directory, filename) index can be used, unlike LIKE
+                prefix = str(directory).rstrip('/')
+                query = query.filter(or_(
+                    FileStatus.directory == str(directory),
+                    and_(FileStatus.directory > f'{prefix}/', FileStatus.directory < f'{prefix}0'),
+                ))
+            else:
+                query = query.filter(FileStatus.directory == str(directory))
+
+            snapshot : dict[Path, dict[str, StatusOptions]] = {directory: {}}
+            for record_directory, filename, status in query:
+                snapshot.setdefault(Path(record_directory), {})[filename] = status
+            return snapshot
+        finally:
+            session.close()
+
     @classmethod
     def delete_status(cls, file_path : Path):
         """
@@ -207,7 +458,8 @@ class FileStatus(Base):
         """
         directory = file_path.parent
         filename = file_path.name
-        
+
+        DbManager.flush()
         session = DbManager.get_session()
         try:
             session.query(FileStatus).filter_by(
@@ -226,6 +478,7 @@ class FileStatus(Base):
         """
         Get the number of files tracked in the specified directory.
         """
+        DbManager.flush()
         session = DbManager.get_session()
         try:
             return (session.query(FileStatus)
@@ -239,6 +492,7 @@ class FileStatus(Base):
         """
         Get the number of records in the database.
         """
+        DbManager.flush()
         session = DbManager.get_session()
         try:
             return session.query(FileStatus).count()
@@ -292,6 +546,9 @@ class DirectoryStatus(Base):
         the directory's last modified time, and the current VERSION.
         """
         directory = directory.absolute()
+
+        # The directory is only marked as done once the status of every file in it has been written
+        DbManager.flush()
         session = DbManager.get_session()
 
         # Convert list of globs into a str
@@ -384,5 +641,53 @@ class DirectoryStatus(Base):
         finally:
             session.close()
 
+class DirectoryTotal(Base):
+    """
+    How many files an upload of a directory tree queued last time, used to estimate the ETA before the tree has been
+    walked.
+    """
+    __tablename__ = 'directory_totals'
+
+    id = Column(Integer, primary_key=True)
+    directory = Column(String, nullable=False)
+    globs = Column(String, nullable=True)
+    file_count = Column(Integer, nullable=False, default=0)
+
+    @classmethod
+    def get_total(cls, directory: Path, globs: str | list[str] | None = None) -> int | None:
+        if globs and isinstance(globs, list):
+            globs = ",".join(globs)
+
+        session = DbManager.get_session()
+        try:
+            record = (session.query(DirectoryTotal)
+                             .filter_by(directory=str(directory.absolute()), globs=globs)
+                             .first())
+            return record.file_count if record else None
+        finally:
+            session.close()
+
+    @classmethod
+    def update(cls, directory: Path, file_count: int, globs: str | list[str] | None = None):
+        if globs and isinstance(globs, list):
+            globs = ",".join(globs)
+
+        session = DbManager.get_session()
+        try:
+            record = (session.query(DirectoryTotal)
+                             .filter_by(directory=str(directory.absolute()), globs=globs)
+                             .first())
+            if record is None:
+                session.add(DirectoryTotal(directory=str(directory.absolute()), globs=globs, file_count=file_count))
+            else:
+                record.file_count = file_count
+            session.commit()
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            logger.error("Error updating directory total: %s", e)
+            session.rollback()
+        finally:
+            session.close()
+
 # Initialize the database at app start
-DbManager.initialize_db()
\ No newline at end of file
+DbManager.initialize_db()
+atexit.register(DbManager.close)
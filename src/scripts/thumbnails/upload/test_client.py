@@ -0,0 +1,215 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    test_client.py                                                                                       *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from scripts.thumbnails.upload.client import ImmichClient, MultipartBody
+from scripts.thumbnails.upload.exceptions import AuthenticationError
+from scripts.thumbnails.upload.status import StatusOptions
+
+API_KEY = 'test-key'
+
+
+class MockImmich(ThreadingHTTPServer):
+    """
+    Just enough of the Immich API to upload assets and add them to albums.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), MockImmichHandler)
+        self.lock = threading.Lock()
+        self.assets: dict[str, str] = {}
+        self.albums: dict[str, tuple[str, set[str]]] = {}
+        self.connections: set[tuple[str, int]] = set()
+        self.bulk_checks = 0
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class MockImmichHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: MockImmich
+
+    def log_message(self, *_args) -> None:
+        pass
+
+    def _reply(self, code: int, payload: object) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _handle(self) -> None:
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+
+        body = self._body()
+        if self.headers.get('x-api-key') != API_KEY:
+            return self._reply(401, {'message': 'Invalid API key', 'statusCode': 401})
+
+        match self.command, self.path:
+            case 'GET', '/api/users/me':
+                return self._reply(200, {'id': 'user'})
+            case 'POST', '/api/assets':
+                return self._upload(body)
+            case 'POST', '/api/assets/bulk-upload-check':
+                results = []
+                for asset in json.loads(body)['assets']:
+                    if asset_id := self.server.assets.get(asset['checksum']):
+                        results.append({'id': asset['id'], 'action': 'reject', 'reason': 'duplicate', 'assetId': asset_id})
+                    else:
+                        results.append({'id': asset['id'], 'action': 'accept'})
+                with self.server.lock:
+                    self.server.bulk_checks += 1
+                return self._reply(200, {'results': results})
+            case 'GET', '/api/albums':
+                return self._reply(200, [{'id': id, 'albumName': name} for name, (id, _) in self.server.albums.items()])
+            case 'POST', '/api/albums':
+                name = json.loads(body)['albumName']
+                with self.server.lock:
+                    self.server.albums[name] = (f'album-{len(self.server.albums)}', set())
+                return self._reply(201, {'id': self.server.albums[name][0]})
+            case 'PUT', path if path.startswith('/api/albums/'):
+                album_id = path.split('/')[3]
+                for album, assets in self.server.albums.values():
+                    if album == album_id:
+                        assets.update(json.loads(body)['ids'])
+                return self._reply(200, [])
+        self._reply(404, {'message': 'Not found'})
+
+    def _upload(self, body: bytes) -> None:
+        assert self.headers['Content-Type'].startswith('multipart/form-data')
+        assert b'name="deviceAssetId"' in body and b'name="fileCreatedAt"' in body
+        if b'filename="notes.txt"' in body:
+            return self._reply(400, {'message': ['Unsupported file type'], 'statusCode': 400})
+
+        data = body.split(b'\r\n\r\n')[-1].rsplit(b'\r\n--', 1)[0]
+        checksum = hashlib.sha1(data).hexdigest()
+        with self.server.lock:
+            if checksum in self.server.assets:
+                return self._reply(200, {'id': self.server.assets[checksum], 'status': 'duplicate'})
+            self.server.assets[checksum] = f'asset-{len(self.server.assets)}'
+        self._reply(201, {'id': self.server.assets[checksum], 'status': 'created'})
+
+    do_GET = do_POST = do_PUT = _handle
+
+
+@pytest.fixture
+def immich():
+    server = MockImmich()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_multipart_body_streams_file(tmp_path: Path) -> None:
+    file = tmp_path / 'photo.jpg'
+    file.write_bytes(b'x' * 5000)
+
+    with MultipartBody({'deviceId': 'test'}, 'assetData', file) as body:
+        chunks = [body.read(1024) for _ in range(10)]
+        data = b''.join(chunks)
+
+    assert len(data) == len(body)
+    assert max(len(chunk) for chunk in chunks) <= 1024
+    assert data.startswith(f'--{body.boundary}\r\n'.encode())
+    assert b'\r\n\r\n' + b'x' * 5000 + f'\r\n--{body.boundary}--\r\n'.encode() in data
+
+
+def test_upload_statuses(immich: MockImmich, tmp_path: Path) -> None:
+    photo = tmp_path / 'photo.jpg'
+    photo.write_bytes(b'photo data')
+    notes = tmp_path / 'notes.txt'
+    notes.write_bytes(b'notes')
+
+    client = ImmichClient(immich.url, API_KEY)
+    client.authenticate()
+
+    created = client.upload_asset(photo)
+    assert created.status == StatusOptions.UPLOADED and created.asset_id == 'asset-0'
+
+    duplicate = client.upload_asset(photo)
+    assert duplicate.status == StatusOptions.DUPLICATE and duplicate.asset_id == 'asset-0'
+
+    rejected = client.upload_asset(notes)
+    assert rejected.status == StatusOptions.ERROR and rejected.message == 'Unsupported file type'
+
+    client.add_to_album('Trip', [created.asset_id])
+    client.add_to_album('Trip', [created.asset_id])
+    assert immich.albums == {'Trip': ('album-0', {'asset-0'})}
+    client.close()
+
+    with pytest.raises(AuthenticationError):
+        ImmichClient(immich.url, 'wrong').authenticate()
+
+
+def test_bulk_upload_check(immich: MockImmich, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr('scripts.thumbnails.upload.client.BULK_CHECK_BATCH_SIZE', 2)
+    client = ImmichClient(immich.url, API_KEY)
+    for i in range(3):
+        file = tmp_path / f'{i}.jpg'
+        file.write_bytes(f'photo {i}'.encode())
+        client.upload_asset(file)
+
+    checksums = {f'file-{i}': hashlib.sha1(f'photo {i}'.encode()).hexdigest() for i in range(5)}
+    existing = client.bulk_upload_check(checksums)
+    client.close()
+
+    assert existing == {'file-0': 'asset-0', 'file-1': 'asset-1', 'file-2': 'asset-2'}
+    assert immich.bulk_checks == 3
+
+
+def test_connections_are_pooled(immich: MockImmich, tmp_path: Path) -> None:
+    files = []
+    for i in range(40):
+        file = tmp_path / f'{i}.jpg'
+        file.write_bytes(f'photo {i}'.encode())
+        files.append(file)
+
+    client = ImmichClient(immich.url, API_KEY, pool_size=4)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(client.upload_asset, files))
+    client.close()
+
+    assert all(result.status == StatusOptions.UPLOADED for result in results)
+    # Each thread kept its connection open, rather than connecting once per file
+    assert len(immich.connections) <= 4
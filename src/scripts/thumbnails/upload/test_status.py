@@ -0,0 +1,173 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    test_status.py                                                                                       *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from scripts.thumbnails.upload.progressive import ImmichProgressiveUploader
+from scripts.thumbnails.upload.status import (
+    Base, DbManager, DirectoryTotal, FileStatus, StatusOptions, StatusWriter, FILE_STATUS_INDEX
+)
+
+
+def _statuses(factory: sessionmaker) -> dict[str, StatusOptions]:
+    session = factory()
+    try:
+        return {r.filename: r.status for r in session.query(FileStatus).all()}
+    finally:
+        session.close()
+
+
+def test_create_engine_migrates(tmp_path: Path) -> None:
+    db_path = tmp_path / 'status.db'
+    old = create_engine(f'sqlite:///{db_path}')
+    Base.metadata.create_all(old)
+    with old.begin() as connection:
+        for status in ('UPLOADED', 'ERROR'):
+            connection.execute(text(
+                "INSERT INTO upload_status (directory, filename, status, last_processed_time, version) "
+                "VALUES ('/photos', 'a.jpg', :status, 0, 3)"
+            ), {'status': status})
+    old.dispose()
+
+    engine = DbManager.create_engine(db_path)
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+        ), {'name': FILE_STATUS_INDEX}).scalar() == 1
+
+    # The first record was the one kept up to date, so it's the one that survives
+    assert _statuses(sessionmaker(bind=engine)) == {'a.jpg': StatusOptions.UPLOADED}
+    engine.dispose()
+
+
+def test_status_writer(tmp_path: Path) -> None:
+    engine = DbManager.create_engine(tmp_path / 'status.db')
+    factory = sessionmaker(bind=engine)
+    writer = StatusWriter(factory, batch_size=10, flush_interval=60)
+
+    writer.put('/photos', 'a.jpg', StatusOptions.UPLOADED, 1.0)
+    writer.put('/photos', 'a.jpg', StatusOptions.DUPLICATE, 1.0)
+    # Queued statuses are visible before they're written, and DUPLICATE doesn't replace UPLOADED
+    assert writer.get_pending('/photos', 'a.jpg') == StatusOptions.UPLOADED
+
+    for i in range(25):
+        writer.put('/photos', f'{i}.jpg', StatusOptions.ERROR, 1.0)
+    writer.flush()
+    assert writer.get_pending('/photos', 'a.jpg') is None
+
+    statuses = _statuses(factory)
+    assert len(statuses) == 26
+    assert statuses['a.jpg'] == StatusOptions.UPLOADED
+
+    writer.put('/photos', '0.jpg', StatusOptions.SKIPPED, 2.0)
+    writer.put('/photos', '1.jpg', StatusOptions.UPLOADED, 2.0)
+    writer.close()
+
+    # After closing, statuses are written straight away
+    writer.put('/photos', '2.jpg', StatusOptions.UPLOADED, 3.0)
+
+    statuses = _statuses(factory)
+    assert statuses['0.jpg'] == StatusOptions.ERROR
+    assert statuses['1.jpg'] == StatusOptions.UPLOADED
+    assert statuses['2.jpg'] == StatusOptions.UPLOADED
+    engine.dispose()
+
+
+def test_get_snapshot(tmp_path: Path, monkeypatch) -> None:
+    engine = DbManager.create_engine(tmp_path / 'status.db')
+    monkeypatch.setattr(DbManager, '_sessionmaker', sessionmaker(bind=engine))
+    monkeypatch.setattr(DbManager, '_status_writer', None)
+
+    root = tmp_path / 'photos'
+    for directory, filename, status in [
+        (root, 'a.jpg', StatusOptions.UPLOADED),
+        (root / 'sub', 'b.jpg', StatusOptions.DUPLICATE),
+        (root / 'sub' / 'deeper', 'c.jpg', StatusOptions.ERROR),
+        (tmp_path / 'photos2', 'd.jpg', StatusOptions.UPLOADED),
+    ]:
+        directory.mkdir(parents=True, exist_ok=True)
+        FileStatus.update_status(directory / filename, status)
+
+    assert FileStatus.get_snapshot(root) == {root: {'a.jpg': StatusOptions.UPLOADED}}
+    # Sibling directories that share a prefix aren't part of the tree
+    assert FileStatus.get_snapshot(root, recursive=True) == {
+        root: {'a.jpg': StatusOptions.UPLOADED},
+        root / 'sub': {'b.jpg': StatusOptions.DUPLICATE},
+        root / 'sub' / 'deeper': {'c.jpg': StatusOptions.ERROR},
+    }
+    assert FileStatus.get_snapshot(root / 'empty') == {root / 'empty': {}}
+
+    DbManager.close()
+    engine.dispose()
+
+
+def test_status_snapshots_are_kept_per_directory(tmp_path: Path, monkeypatch) -> None:
+    engine = DbManager.create_engine(tmp_path / 'status.db')
+    monkeypatch.setattr(DbManager, '_sessionmaker', sessionmaker(bind=engine))
+    monkeypatch.setattr(DbManager, '_status_writer', None)
+
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    for directory in (first, second):
+        directory.mkdir()
+        FileStatus.update_status(directory / 'a.jpg', StatusOptions.UPLOADED)
+
+    uploader = ImmichProgressiveUploader(directory=tmp_path, url='http://localhost', api_key='key')
+    uploader.load_status_snapshot(first)
+    # Discovery runs ahead of the uploads, so the first directory is still needed after the second is loaded
+    uploader.load_status_snapshot(second)
+
+    def query(file_path: Path) -> bool:
+        raise AssertionError(f'{file_path} should be found in the snapshot')
+
+    monkeypatch.setattr(FileStatus, 'was_successful', query)
+    assert uploader.was_successful(first / 'a.jpg')
+    assert not uploader.was_successful(first / 'b.jpg')
+    assert uploader.was_successful(second / 'a.jpg')
+
+    # Released once the first directory's uploads drain
+    uploader.release_status_snapshot(first)
+    assert uploader._status_snapshot.keys() == {second.absolute()}
+    uploader.release_status_snapshot()
+    assert not uploader._status_snapshot
+
+    DbManager.close()
+    engine.dispose()
+
+
+def test_directory_total(tmp_path: Path, monkeypatch) -> None:
+    engine = DbManager.create_engine(tmp_path / 'status.db')
+    monkeypatch.setattr(DbManager, '_sessionmaker', sessionmaker(bind=engine))
+
+    assert DirectoryTotal.get_total(tmp_path, ['*.jpg']) is None
+    DirectoryTotal.update(tmp_path, 10, ['*.jpg'])
+    DirectoryTotal.update(tmp_path, 12, ['*.jpg'])
+    assert DirectoryTotal.get_total(tmp_path, ['*.jpg']) == 12
+    # Totals are kept separately for each set of globs
+    assert DirectoryTotal.get_total(tmp_path) is None
+    engine.dispose()
@@ -0,0 +1,100 @@
+"""*********************************************************************************************************************
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    METADATA:                                                                                                         *
+*                                                                                                                      *
+*        File:    benchmark_hash.py                                                                                    *
+*        Project: imageinn                                                                                             *
+*        Version: 0.1.0                                                                                                *
+*        Created: 2026-10-16                                                                                           *
+*        Author:  Jess Mann                                                                                            *
+*        Email:   jess.a.mann@gmail.com                                                                                *
+*        Copyright (c) 2026 Jess Mann                                                                                  *
+*                                                                                                                      *
+* -------------------------------------------------------------------------------------------------------------------- *
+*                                                                                                                      *
+*    LAST MODIFIED:                                                                                                    *
+*                                                                                                                      *
+*        2026-10-16     By Jess Mann                                                                                   *
+*                                                                                                                      *
+*********************************************************************************************************************"""
+from __future__ import annotations
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from scripts.lib.file_manager import FileManager, ReadStrategies
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ['xxhash', 'md5', 'sha256']
+STRATEGIES = [ReadStrategies.BUFFERED, ReadStrategies.MMAP]
+
+def benchmark_directory(directory : Path, algorithms : list[str], limit : int, chunk_size : int) -> None:
+    """
+    Hash the same set of files with every algorithm and read strategy, and print the throughput of each.
+
+    The hash cache and index are bypassed, so every run reads the files from disk. Results after the first run
+    will include the effect of the OS page cache; run against a network mount to see the uncached numbers.
+
+    Args:
+        directory (Path): The directory to sample files from.
+        algorithms (list[str]): The hashing algorithms to compare.
+        limit (int): The maximum number of files to hash per run.
+        chunk_size (int): The read size to use, in bytes.
+    """
+    manager = FileManager(directory=directory, read_chunk_size=chunk_size)
+    files = []
+    for file in directory.rglob('*'):
+        if not file.is_file() or '.trash' in file.parts:
+            continue
+        files.append(file)
+        if len(files) >= limit:
+            break
+
+    if not files:
+        logger.error(f"No files found in {directory}")
+        return
+
+    total_bytes = sum(file.stat().st_size for file in files)
+    fs_type = manager.get_filesystem_type(directory) or 'unknown'
+    print(f"\n{directory} ({fs_type}): {len(files)} files, {total_bytes / 1024 / 1024:.1f} MB")
+
+    for algorithm in algorithms:
+        for strategy in STRATEGIES:
+            manager.read_strategy = strategy
+            start = time.perf_counter()
+            for file in files:
+                manager.hash_file(file, partial=False, hashing_algorithm=algorithm, use_cache=False)
+            elapsed = time.perf_counter() - start
+            throughput = total_bytes / 1024 / 1024 / elapsed if elapsed else 0
+            print(f"    {algorithm:<8} {strategy.value:<10} {elapsed:8.2f}s {throughput:10.1f} MB/s")
+
+    manager.read_strategy = ReadStrategies.AUTO
+    print(f"    auto resolves to: {manager.get_read_strategy(files[0]).value}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare hashing throughput across algorithms and read strategies.')
+    parser.add_argument('directories', nargs='+', type=Path, help='Directories to benchmark (i.e. one local, one network mount).')
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS + ['sha1'])
+    parser.add_argument('--limit', type=int, default=200, help='Maximum number of files to hash per directory.')
+    parser.add_argument('--chunk-size', type=int, default=8, help='Read size in MB.')
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        if not directory.is_dir():
+            logger.error(f"{directory} is not a valid directory.")
+            sys.exit(1)
+
+    for directory in args.directories:
+        benchmark_directory(directory, args.algorithms, args.limit, args.chunk_size * 1024 * 1024)
+
+if __name__ == "__main__":
+    main()